@@ -8,6 +8,8 @@ from datetime import datetime, timedelta
 history_bp = Blueprint("history", __name__)
 db = get_db()
 histories_collection = db["histories"]  # Collection MongoDB
+# Unique (sparse) để 2 request trùng idempotency_key đến cùng lúc vẫn chỉ tạo 1 history
+histories_collection.create_index("idempotency_key", unique=True, sparse=True)
 parking_collection = db["parkings"]
 
 @history_bp.route("/", methods=["POST"])
@@ -50,6 +52,18 @@ def add_history():
             "total_price": float(data["total_price"])
         }
 
+        # Idempotency: local server gửi lại history khi mất response → không tạo bản ghi trùng
+        idempotency_key = request.headers.get("Idempotency-Key") or data.get("idempotency_key")
+        if idempotency_key:
+            history["idempotency_key"] = idempotency_key
+            result = histories_collection.update_one(
+                {"idempotency_key": idempotency_key}, {"$setOnInsert": history}, upsert=True
+            )
+            if result.upserted_id is None:
+                existing = histories_collection.find_one({"idempotency_key": idempotency_key}, {"_id": 1})
+                return jsonify({"message": "History already exists", "id": str(existing["_id"])}), 200
+            return jsonify({"message": "History added successfully", "id": str(result.upserted_id)}), 201
+
         # Thêm vào MongoDB
         result = histories_collection.insert_one(history)
 
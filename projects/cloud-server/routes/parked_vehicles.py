@@ -121,16 +121,101 @@ def update_vehicle_list():
     if parking_id is None or new_list is None:
         return jsonify({'error': 'parking_id and list are required'}), 400
 
+    update = {'list': new_list}
+    # Full resync của delta sync: đặt lại sequence đã áp dụng
+    if data.get('seq') is not None:
+        update['seq'] = int(data['seq'])
+
     try:
         result = parked_vehicle_collection.update_one(
             {'parking_id': parking_id},
-            {'$set': {'list': new_list}}
+            {'$set': update}
         )
 
         if result.matched_count == 0:
             return jsonify({'error': 'Parking ID not found'}), 404
 
-        return jsonify({'message': 'List updated successfully'}), 200
+        return jsonify({'message': 'List updated successfully', 'seq': update.get('seq')}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+def _apply_delta_op(parking_id, op):
+    """
+    Áp dụng 1 op với điều kiện seq hiện tại == op['seq'] - 1 (chống 2 request xen kẽ nhau).
+    Trả về False nếu seq không khớp.
+    """
+    seq = int(op['seq'])
+    guard = {'parking_id': parking_id, 'seq': seq - 1}
+    bump = {'seq': seq}
+    kind = op.get('op')
+
+    if kind == 'add':
+        vehicle = op['vehicle']
+        # Biển số đã có trong list → thay phần tử đó, chưa có → $push
+        result = parked_vehicle_collection.update_one(
+            dict(guard, **{'list.license_plate': vehicle['license_plate']}),
+            {'$set': dict(bump, **{'list.$': vehicle})}
+        )
+        if result.matched_count == 0:
+            result = parked_vehicle_collection.update_one(guard, {'$push': {'list': vehicle}, '$set': bump})
+        return result.matched_count > 0
+
+    if kind == 'remove':
+        result = parked_vehicle_collection.update_one(
+            guard, {'$pull': {'list': {'license_plate': op['license_plate']}}, '$set': bump}
+        )
+        return result.matched_count > 0
+
+    if kind == 'patch':
+        fields = {f'list.$.{k}': v for k, v in (op.get('fields') or {}).items() if k in ('slot_name', 'num_slot')}
+        result = parked_vehicle_collection.update_one(
+            dict(guard, **{'list.license_plate': op['license_plate']}),
+            {'$set': dict(bump, **fields)}
+        )
+        if result.matched_count == 0:
+            # Xe không còn trong list: op thành no-op nhưng vẫn tăng seq
+            result = parked_vehicle_collection.update_one(guard, {'$set': bump})
+        return result.matched_count > 0
+
+    raise ValueError(f"Unknown op: {kind}")
+
+
+# apply add/remove/patch operations (delta sync)
+@parked_vehicle_bp.route('/apply_delta', methods=['PUT'])
+def apply_delta():
+    """
+    Body: {'parking_id', 'ops': [{'seq', 'op': 'add'|'remove'|'patch', ...}]}, seq tăng liên tục từng 1.
+    - Op có seq <= seq hiện tại: đã áp dụng (request gửi lại) → bỏ qua.
+    - Op đầu tiên chưa áp dụng không nối tiếp seq hiện tại → 409 kèm seq hiện tại,
+      local server phải full resync qua update_vehicle_list.
+    """
+    data = request.get_json()
+    parking_id = data.get('parking_id')
+    ops = data.get('ops')
+
+    if not parking_id or ops is None:
+        return jsonify({'error': 'parking_id and ops are required'}), 400
+
+    try:
+        doc = parked_vehicle_collection.find_one({'parking_id': parking_id}, {'seq': 1, '_id': 0})
+        if not doc:
+            return jsonify({'error': 'Parking ID not found'}), 404
+        current = doc.get('seq')
+        if current is None:
+            return jsonify({'error': 'Sequence not initialized', 'seq': None}), 409
+
+        for op in sorted(ops, key=lambda o: int(o['seq'])):
+            if int(op['seq']) <= current:
+                continue
+            if int(op['seq']) != current + 1 or not _apply_delta_op(parking_id, op):
+                doc = parked_vehicle_collection.find_one({'parking_id': parking_id}, {'seq': 1, '_id': 0})
+                return jsonify({'error': 'Sequence mismatch', 'seq': doc.get('seq')}), 409
+            current = int(op['seq'])
+
+        return jsonify({'message': 'Delta applied successfully', 'seq': current}), 200
+    except (KeyError, ValueError) as e:
+        return jsonify({'error': f'Invalid op: {e}'}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
     
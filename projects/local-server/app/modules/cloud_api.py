@@ -1,83 +1,110 @@
 from dotenv import load_dotenv
 import os
-import requests
-import urllib.request
 import json
+import uuid
+import threading
+from app.modules.cloud_client import CloudClient
+from app.modules.cloud_outbox import DurableOutbox
 load_dotenv()
 
 CLOUD_SERVER_URL = os.getenv("CLOUD_SERVER_URL")    
 
+# Client dùng chung: keep-alive, timeout, retry, thống kê theo endpoint
+cloud_client = CloudClient(CLOUD_SERVER_URL)
+
+# Outbox ghi đĩa: mọi lệnh ghi trạng thái / history đi qua đây, tự gửi lại khi có mạng
+_durable_outbox = None
+_durable_outbox_lock = threading.Lock()
+
+def get_durable_outbox():
+    """Outbox dùng chung trong 1 process (chỉ tạo khi có lệnh ghi đầu tiên)."""
+    global _durable_outbox
+    if _durable_outbox is None:
+        with _durable_outbox_lock:
+            if _durable_outbox is None:
+                _durable_outbox = DurableOutbox(cloud_client)
+    return _durable_outbox
+
+def start_durable_outbox():
+    """Gọi lúc khởi động: gửi nốt backlog còn lại từ lần chạy trước."""
+    outbox = get_durable_outbox()
+    outbox.start()
+    outbox.log_backlog()
+
 # coordinates APIs
 def get_coordinates(parking_id, camera_id):
-    url = f'{CLOUD_SERVER_URL+"coordinates/"}{parking_id}/{camera_id}'
-    response = requests.get(url)
-    if response.status_code == 200:
+    response = cloud_client.request("GET", f"coordinates/{parking_id}/{camera_id}", endpoint="coordinates/get")
+    if response is not None and response.status_code == 200:
         return response.json()[0]
     else:
         return None
 
 def update_coordinates(parking_id, camera_id, data):
-    url = f'{CLOUD_SERVER_URL+"coordinates/"}update/{parking_id}/{camera_id}'
-    response = requests.put(url, json=data)
-    return response.status_code == 200
+    response = cloud_client.request("PUT", f"coordinates/update/{parking_id}/{camera_id}", endpoint="coordinates/update", json=data)
+    return response is not None and response.status_code == 200
 
 def insert_coordinates(data):
-    url = f'{CLOUD_SERVER_URL+"coordinates/"}add'
-    response = requests.post(url, json=data)
-    return response.status_code == 201
+    response = cloud_client.request("POST", "coordinates/add", json=data)
+    return response is not None and response.status_code == 201
 
 # parked vehicle APIs
 def insert_parked_vehicle(data):
-    url = f'{CLOUD_SERVER_URL+"parked_vehicles/"}add_vehicle'
-    response = requests.post(url, json=data)
-    return response.status_code == 200
+    response = cloud_client.request("POST", "parked_vehicles/add_vehicle", json=data)
+    return response is not None and response.status_code == 200
 
 def remove_parked_vehicle(data):
-    url = f'{CLOUD_SERVER_URL+"parked_vehicles/"}remove_vehicle'
-    response = requests.delete(url, json=data)
-    if response != 200:
+    response = cloud_client.request("DELETE", "parked_vehicles/remove_vehicle", json=data)
+    if response is not None and response.status_code != 200:
         print(response)
-    return response.status_code == 200
+    return response is not None and response.status_code == 200
 
 def update_parked_vehicle(data):
-    url = f'{CLOUD_SERVER_URL+"parked_vehicles/"}update_vehicle'
-    response = requests.put(url, json=data)
-    return response.status_code == 200
+    response = cloud_client.request("PUT", "parked_vehicles/update_vehicle", json=data)
+    return response is not None and response.status_code == 200
 
+# Các lệnh ghi dưới đây chỉ xếp vào outbox ghi đĩa (không chờ WAN), trả về True khi đã xếp hàng.
+# Dữ liệu dạng "trạng thái mới nhất" dùng coalesce_key: bản mới thay bản cũ chưa gửi.
 def update_parked_vehicle_list(data):
-    url = f'{CLOUD_SERVER_URL+"parked_vehicles/"}update_vehicle_list'
-    response = requests.put(url, json=data)
-    if response.status_code == 200:
-        print(f"[CLOUD] Đã cập nhật danh sách xe đậu lên Cloud Server")
-        return True
-    else:
-        print(f"[CLOUD] Lỗi khi cập nhật danh sách xe đậu lên Cloud Server")
-        print(response.json())
-        return False
+    get_durable_outbox().enqueue("PUT", "parked_vehicles/update_vehicle_list", data,
+                                 coalesce_key=f"parked_vehicles/{data.get('parking_id')}")
+    return True
 
 # parking lot, environment, history APIs
 def update_parking_lot(data):
-    url = f'{CLOUD_SERVER_URL+"parking_slots/"}update_parking_slots'
-    response = requests.post(url, json=data)
-    if response.status_code == 200:
-        print(f"[CLOUD] Đã cập nhật trạng thái bãi xe lên Cloud Server")
-        return True
-    else:
-        print(f"[CLOUD] Lỗi khi cập nhật trạng thái bãi xe lên Cloud Server")
-        return False
+    get_durable_outbox().enqueue("POST", "parking_slots/update_parking_slots", data,
+                                 coalesce_key=f"parking_slots/{data.get('parking_id')}")
+    return True
 
 def update_environment(data):
-    url = f'{CLOUD_SERVER_URL+"environments/"}update_environment'
-    response = requests.post(url, json=data)
-    return response.status_code == 200
+    get_durable_outbox().enqueue("POST", "environments/update_environment", data,
+                                 coalesce_key=f"environments/{data.get('parking_id')}")
+    return True
 
 def insert_history(data):
-    url = f'{CLOUD_SERVER_URL+"histories/"}'
-    response = requests.post(url, json=data)
-    return response.status_code == 201
+    # History tính tiền: không gộp, ưu tiên giữ lại khi outbox đầy; cloud bỏ bản trùng theo idempotency_key
+    idempotency_key = uuid.uuid4().hex
+    get_durable_outbox().enqueue("POST", "histories/", dict(data, idempotency_key=idempotency_key),
+                                 priority=1, idempotency_key=idempotency_key)
+    return True
+
+def push_parking_lot(data):
+    """Xếp hàng cập nhật trạng thái bãi xe: outbox ghi đĩa gộp theo parking_id, chỉ bản mới nhất được gửi."""
+    return update_parking_lot(dict(data, parking_id=data.get('parking_id') or os.getenv("PARKING_ID")))
+
+def flush_outboxes(timeout=5.0):
+    """Gửi nốt backlog của outbox ghi đĩa (gọi khi tắt chương trình). Trả về True nếu đã gửi hết."""
+    if _durable_outbox is None:
+        return True
+    return _durable_outbox.flush(timeout)
+
+# Delta sync danh sách xe đậu (ParkedVehicleSync): trả về Response (None nếu lỗi mạng) để phân biệt 409
+def apply_parked_vehicle_delta(data):
+    return cloud_client.request("PUT", "parked_vehicles/apply_delta", json=data)
+
+def replace_parked_vehicle_list(data):
+    return cloud_client.request("PUT", "parked_vehicles/update_vehicle_list", endpoint="parked_vehicles/resync", json=data)
 
 def get_registered_vehicles():
-    url = f'{CLOUD_SERVER_URL}registers/get_register_list'  # Đúng endpoint: registers/get_register_list
     payload = {
         "parking_id": os.getenv("PARKING_ID", "parking_001")
     }
@@ -86,12 +113,15 @@ def get_registered_vehicles():
     # print(f"[DEBUG] Payload: {payload}")
     
     try:
-        # Dùng requests thay vì urllib cho đơn giản
-        response = requests.post(url, json=payload, timeout=10)
+        # Đúng endpoint: registers/get_register_list (timeout/retry do cloud_client quản lý)
+        response = cloud_client.request("POST", "registers/get_register_list", json=payload)
         
     #    print(f"[DEBUG] Response status: {response.status_code}")
         
-        if response.status_code == 200:
+        if response is None:
+            # Timeout / không kết nối được server (cloud_client đã log lỗi)
+            pass
+        elif response.status_code == 200:
             result = response.json()
             if result.get('status') == 'success':
                 data = result.get('data', [])
@@ -115,10 +145,6 @@ def get_registered_vehicles():
             print(f"[ERROR] HTTP {response.status_code}: {response.text}")
             return []
             
-    except requests.exceptions.Timeout:
-        print("[ERROR] Request timeout - server took too long to respond")
-    except requests.exceptions.ConnectionError:
-        print("[ERROR] Connection error - cannot reach server")
     except Exception as e:
         print(f"[ERROR] Unexpected error: {e}")
     
@@ -0,0 +1,123 @@
+import os
+import time
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from dotenv import load_dotenv
+load_dotenv()
+
+CLOUD_CONNECT_TIMEOUT = float(os.getenv("CLOUD_CONNECT_TIMEOUT", "3"))
+CLOUD_READ_TIMEOUT = float(os.getenv("CLOUD_READ_TIMEOUT", "10"))
+CLOUD_RETRIES = int(os.getenv("CLOUD_RETRIES", "3"))
+CLOUD_WORKERS = int(os.getenv("CLOUD_WORKERS", "4"))  # số kết nối keep-alive tối đa tới cloud
+CLOUD_STATS_INTERVAL = float(os.getenv("CLOUD_STATS_INTERVAL", "300"))  # 0 = không in thống kê định kỳ
+
+
+class EndpointStats:
+    __slots__ = ("calls", "errors", "total_ms", "max_ms", "last_error")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.last_error = ""
+
+    def as_dict(self):
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "avg_ms": round(self.total_ms / self.calls, 1) if self.calls else 0.0,
+            "max_ms": round(self.max_ms, 1),
+            "last_error": self.last_error,
+        }
+
+
+class CloudClient:
+    """
+    HTTP client dùng chung cho tất cả API cloud server.
+
+    - 1 requests.Session: giữ kết nối keep-alive (pool), không bắt tay TCP/TLS lại mỗi request.
+    - Timeout (connect, read) cho mọi request → không còn treo vô hạn.
+    - Retry backoff lũy thừa: lỗi kết nối retry cho mọi method; lỗi 429/5xx chỉ retry method idempotent
+      (GET/PUT/DELETE) để POST không bị gửi trùng.
+    - Đếm số lần gọi / lỗi / latency theo từng endpoint (`stats()`), in định kỳ mỗi
+      CLOUD_STATS_INTERVAL giây kể từ request đầu tiên.
+    """
+
+    def __init__(self, base_url, connect_timeout=CLOUD_CONNECT_TIMEOUT, read_timeout=CLOUD_READ_TIMEOUT,
+                 retries=CLOUD_RETRIES, workers=CLOUD_WORKERS):
+        self.base_url = base_url or ""
+        self.timeout = (connect_timeout, read_timeout)
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=0.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset({"GET", "PUT", "DELETE", "HEAD", "OPTIONS"}),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(workers, 4), max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+        self._stats_thread = None
+
+    def _record(self, endpoint, elapsed_ms, error=None):
+        with self._stats_lock:
+            stats = self._stats.get(endpoint)
+            if stats is None:
+                stats = self._stats[endpoint] = EndpointStats()
+            stats.calls += 1
+            stats.total_ms += elapsed_ms
+            stats.max_ms = max(stats.max_ms, elapsed_ms)
+            if error is not None:
+                stats.errors += 1
+                stats.last_error = error
+
+    def request(self, method, path, endpoint=None, **kwargs):
+        """
+        Gửi request tới `base_url + path`. Trả về Response, hoặc None nếu lỗi mạng/timeout
+        (đã retry hết số lần cho phép).
+        """
+        self._ensure_stats_logger()
+        endpoint = endpoint or path
+        kwargs.setdefault("timeout", self.timeout)
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, self.base_url + path, **kwargs)
+        except requests.exceptions.RequestException as e:
+            self._record(endpoint, (time.perf_counter() - start) * 1000, type(e).__name__)
+            print(f"[CLOUD] {method} {endpoint} failed: {e}")
+            return None
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self._record(endpoint, elapsed_ms, None if response.status_code < 400 else f"HTTP {response.status_code}")
+        return response
+
+    def stats(self):
+        with self._stats_lock:
+            return {endpoint: s.as_dict() for endpoint, s in self._stats.items()}
+
+    def log_stats(self):
+        for endpoint, s in sorted(self.stats().items()):
+            print(f"[CLOUD] {endpoint}: {s['calls']} calls, {s['errors']} errors, "
+                  f"avg {s['avg_ms']}ms, max {s['max_ms']}ms")
+
+    def _ensure_stats_logger(self):
+        if CLOUD_STATS_INTERVAL <= 0 or self._stats_thread is not None:
+            return
+        with self._stats_lock:
+            if self._stats_thread is not None:
+                return
+            self._stats_thread = threading.Thread(target=self._stats_loop, name="cloud-stats", daemon=True)
+        self._stats_thread.start()
+
+    def _stats_loop(self):
+        while True:
+            time.sleep(CLOUD_STATS_INTERVAL)
+            self.log_stats()
@@ -0,0 +1,233 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from dotenv import load_dotenv
+load_dotenv()
+
+CLOUD_FLUSH_INTERVAL = float(os.getenv("CLOUD_FLUSH_INTERVAL", "2"))  # giây tối thiểu giữa 2 lần gửi cùng 1 trạng thái
+CLOUD_RETRY_BACKOFF_MAX = 30.0
+CLOUD_OUTBOX_DB = "app/resources/database/cloud_outbox.db"
+CLOUD_OUTBOX_MAX_ROWS = int(os.getenv("CLOUD_OUTBOX_MAX_ROWS", "20000"))
+CLOUD_OUTBOX_LOG_INTERVAL = float(os.getenv("CLOUD_STATS_INTERVAL", "300"))
+
+
+class DurableOutbox:
+    """
+    Outbox ghi đĩa (SQLite WAL) cho mọi lệnh ghi lên cloud.
+
+    - enqueue(): chỉ là 1 INSERT local → cổng / tracking không bao giờ phải chờ WAN.
+    - 1 thread replay gửi lần lượt theo thứ tự id (FIFO toàn cục, tối đa 1 request in-flight).
+      Mất mạng / 5xx / 408 / 429 → giữ nguyên dòng đầu, chờ backoff rồi gửi lại; 4xx khác → bỏ dòng
+      (dữ liệu sai, gửi lại cũng không được) và ghi log.
+    - Mỗi dòng có idempotency_key (header Idempotency-Key) sinh 1 lần lúc enqueue → cloud bỏ qua
+      bản trùng khi request đã tới server nhưng mất response.
+    - coalesce_key (vd. "parking_lot/<parking_id>"): dòng mới ghi đè tại chỗ dòng cũ chưa gửi cùng key
+      (giữ vị trí trong hàng đợi) → dữ liệu dạng "trạng thái mới nhất" không làm backlog phình ra khi mất mạng lâu.
+    - Giãn nhịp theo coalesce_key: dòng có key chỉ được gửi khi đã qua `coalesce_interval` giây kể từ
+      lần gửi trước cùng key (trong lúc chờ, bản mới thay bản cũ) → số request trạng thái theo thời gian,
+      không theo số sự kiện slot. Dòng không có key (history) vẫn gửi ngay, vượt lên trước dòng đang chờ nhịp.
+    - Giới hạn `max_rows`: vượt quá thì bỏ dòng cũ nhất có priority thấp trước (trạng thái), dòng
+      priority cao (history tính tiền) chỉ bị bỏ khi không còn gì khác.
+    - backlog(): số dòng chờ, tuổi dòng cũ nhất, số dòng đã bỏ.
+    """
+
+    def __init__(self, client, db_path=CLOUD_OUTBOX_DB, max_rows=CLOUD_OUTBOX_MAX_ROWS,
+                 max_backoff=CLOUD_RETRY_BACKOFF_MAX, log_interval=CLOUD_OUTBOX_LOG_INTERVAL,
+                 coalesce_interval=CLOUD_FLUSH_INTERVAL):
+        self.client = client
+        self.db_path = db_path
+        self.max_rows = max_rows
+        self.coalesce_interval = coalesce_interval
+        self._last_sent = {}  # coalesce_key -> thời điểm gửi gần nhất (chỉ thread replay đọc / ghi)
+        self._flushing = False
+        self.max_backoff = max_backoff
+        self.log_interval = log_interval
+        self._local = threading.local()
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stopped = False
+        self.dropped = 0
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        with self._conn() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    method TEXT NOT NULL,
+                    path TEXT NOT NULL,
+                    endpoint TEXT,
+                    body TEXT,
+                    idempotency_key TEXT NOT NULL,
+                    coalesce_key TEXT,
+                    priority INTEGER DEFAULT 0,
+                    created REAL NOT NULL,
+                    attempts INTEGER DEFAULT 0
+                )""")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_coalesce ON outbox(coalesce_key)")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # ---------- ghi ----------
+    def enqueue(self, method, path, data=None, endpoint=None, coalesce_key=None, priority=0, idempotency_key=None):
+        """Xếp 1 lệnh ghi vào outbox. Trả về idempotency_key của dòng."""
+        idempotency_key = idempotency_key or uuid.uuid4().hex
+        body = None if data is None else json.dumps(data, ensure_ascii=False, default=str)
+        with self._lock, self._conn() as conn:
+            updated = 0
+            if coalesce_key is not None:
+                # Ghi đè dòng cũ tại chỗ (giữ id → giữ vị trí trong FIFO), idempotency_key mới vì body đã khác
+                updated = conn.execute("""
+                    UPDATE outbox SET method = ?, path = ?, endpoint = ?, body = ?, idempotency_key = ?, priority = ?
+                    WHERE coalesce_key = ?
+                """, (method, path, endpoint or path, body, idempotency_key, priority, coalesce_key)).rowcount
+            if not updated:
+                conn.execute("""
+                    INSERT INTO outbox (method, path, endpoint, body, idempotency_key, coalesce_key, priority, created)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """, (method, path, endpoint or path, body, idempotency_key, coalesce_key, priority, time.time()))
+                self._trim(conn)
+        self.start()
+        self._wake.set()
+        return idempotency_key
+
+    def _trim(self, conn):
+        over = conn.execute("SELECT COUNT(*) FROM outbox").fetchone()[0] - self.max_rows
+        if over <= 0:
+            return
+        # Bỏ dòng cũ nhất, priority thấp trước
+        cur = conn.execute("""
+            DELETE FROM outbox WHERE id IN (SELECT id FROM outbox ORDER BY priority, id LIMIT ?)
+        """, (over,))
+        self.dropped += cur.rowcount
+        print(f"[OUTBOX] Backlog vượt {self.max_rows} dòng, đã bỏ {cur.rowcount} dòng cũ nhất")
+
+    # ---------- replay ----------
+    def start(self):
+        """Chạy thread replay (gọi lúc khởi động để gửi nốt backlog của lần chạy trước)."""
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="outbox-replay", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped = True
+        self._wake.set()
+
+    def _head(self):
+        """
+        (dòng gửi tiếp theo, giây chờ): dòng id nhỏ nhất không phải chờ nhịp coalesce_key.
+        Chỉ còn dòng đang chờ nhịp → (None, giây tới lúc dòng sớm nhất được gửi); outbox rỗng → (None, None).
+        """
+        now = time.time()
+        paced = {} if self._flushing else {key: ts + self.coalesce_interval for key, ts in self._last_sent.items()
+                                           if ts + self.coalesce_interval > now}
+        conn = self._conn()
+        if not paced:
+            return conn.execute("SELECT * FROM outbox ORDER BY id LIMIT 1").fetchone(), None
+        marks = ",".join("?" * len(paced))
+        row = conn.execute(f"""
+            SELECT * FROM outbox WHERE coalesce_key IS NULL OR coalesce_key NOT IN ({marks}) ORDER BY id LIMIT 1
+        """, list(paced)).fetchone()
+        if row is not None:
+            return row, None
+        waiting = [r['coalesce_key'] for r in conn.execute(
+            f"SELECT coalesce_key FROM outbox WHERE coalesce_key IN ({marks})", list(paced))]
+        if not waiting:
+            return None, None
+        return None, max(0.0, min(paced[key] for key in waiting) - now)
+
+    def _delete(self, row):
+        # Khớp cả idempotency_key: dòng vừa được coalesce ghi đè trong lúc gửi thì giữ lại để gửi bản mới
+        with self._lock, self._conn() as conn:
+            conn.execute("DELETE FROM outbox WHERE id = ? AND idempotency_key = ?", (row['id'], row['idempotency_key']))
+
+    def _send(self, row):
+        """Gửi 1 dòng. Trả về 'ok', 'retry' hoặc 'drop'."""
+        kwargs = {"headers": {"Idempotency-Key": row['idempotency_key']}}
+        if row['body'] is not None:
+            kwargs["json"] = json.loads(row['body'])
+        response = self.client.request(row['method'], row['path'], endpoint=row['endpoint'], **kwargs)
+        if response is None or response.status_code >= 500 or response.status_code in (408, 429):
+            return "retry"
+        if response.status_code >= 400:
+            print(f"[OUTBOX] Bỏ {row['method']} {row['endpoint']}: HTTP {response.status_code} {response.text[:200]}")
+            return "drop"
+        return "ok"
+
+    def _run(self):
+        failures = 0
+        last_log = time.time()
+        while not self._stopped:
+            row, delay = self._head()
+            if row is None:
+                if delay is None:
+                    failures = 0
+                    delay = self.log_interval if self.log_interval > 0 else None
+                self._wake.wait(delay)
+                self._wake.clear()
+                continue
+            result = self._send(row)
+            if result == "retry":
+                failures += 1
+                with self._lock, self._conn() as conn:
+                    conn.execute("UPDATE outbox SET attempts = attempts + 1 WHERE id = ?", (row['id'],))
+                if failures == 1:
+                    print(f"[OUTBOX] Không gửi được {row['endpoint']}, giữ lại trong outbox và thử lại sau")
+                time.sleep(min(self.max_backoff, 0.5 * (2 ** min(failures, 10))))
+            else:
+                if result == "drop":
+                    with self._lock:
+                        self.dropped += 1
+                elif failures:
+                    print(f"[OUTBOX] Đã kết nối lại cloud, đang gửi backlog ({self.backlog()['rows']} dòng)")
+                failures = 0
+                self._delete(row)
+                if row['coalesce_key'] is not None:
+                    self._last_sent[row['coalesce_key']] = time.time()
+            if self.log_interval > 0 and time.time() - last_log >= self.log_interval:
+                last_log = time.time()
+                self.log_backlog()
+
+    def flush(self, timeout=5.0):
+        """
+        Chờ thread replay gửi hết backlog (gọi khi tắt chương trình, bỏ giãn nhịp coalesce_key). Trả về True
+        nếu outbox đã rỗng; còn dòng chưa gửi được thì vẫn nằm trên đĩa và được gửi ở lần chạy sau.
+        """
+        deadline = time.time() + timeout
+        self._flushing = True
+        self.start()
+        self._wake.set()
+        while self.backlog()['rows']:
+            if time.time() >= deadline:
+                print(f"[OUTBOX] Còn {self.backlog()['rows']} dòng chưa gửi, sẽ gửi tiếp ở lần chạy sau")
+                return False
+            time.sleep(0.1)
+        return True
+
+    # ---------- metric ----------
+    def backlog(self):
+        row = self._conn().execute("SELECT COUNT(*) AS n, MIN(created) AS oldest FROM outbox").fetchone()
+        return {
+            "rows": row['n'],
+            "oldest_age": round(time.time() - row['oldest'], 1) if row['oldest'] is not None else 0.0,
+            "dropped": self.dropped,
+        }
+
+    def log_backlog(self):
+        b = self.backlog()
+        if b['rows'] or b['dropped']:
+            print(f"[OUTBOX] backlog: {b['rows']} rows, oldest {b['oldest_age']}s, dropped {b['dropped']}")
@@ -0,0 +1,220 @@
+import os
+import time
+import threading
+import yaml
+import numpy as np
+from dotenv import load_dotenv
+from app.modules.cloud_api import get_coordinates
+from app.modules.slot_geometry import GridIndex, box_overlap_area, polygon_area, polygon_bounds, polygon_centroid
+load_dotenv()
+
+REID_COORDS_PATH = "app/resources/coordinates/reid-data/"
+SLOT_COORDS_PATH = "app/resources/coordinates/slot-data/"
+SLOT_OVERLAP_RATIO = float(os.getenv("SLOT_OVERLAP_RATIO", "0.5"))  # tỉ lệ diện tích polygon slot bị bbox che để tính là có xe
+SLOT_GRID_CELL = int(os.getenv("SLOT_GRID_CELL", "64"))              # kích thước ô lưới index polygon (pixel)
+
+
+class CoordinateSet:
+    """
+    Tập điểm / polygon trong 1 file YAML tọa độ (slot hoặc điểm giao ReID), giữ sẵn trong RAM.
+
+    - ids      : list id theo thứ tự trong file
+    - points   : (N, 2) int32 tọa độ ('coordinate'; slot polygon không có thì lấy trọng tâm)
+    - polygons : list (N,) - đa giác [(x, y), ...] nếu item có 'polygon' (vẽ bằng CoordinatesGenerator
+      của windows-app), None nếu slot chỉ là 1 điểm
+    File chỉ được đọc lại khi (mtime, size) thay đổi. File chưa tồn tại → tập rỗng
+    (không tạo file rỗng như `read_yaml`).
+
+    match(): slot điểm dùng point-in-box (broadcast NumPy, rẻ kể cả 1000 điểm); slot polygon dùng
+    GridIndex dựng sẵn lúc load → mỗi bbox chỉ tính diện tích giao với polygon ở gần, slot có xe khi
+    phần polygon bị bbox che >= `overlap_ratio`.
+    """
+
+    def __init__(self, file_path, overlap_ratio=SLOT_OVERLAP_RATIO, grid_cell=SLOT_GRID_CELL):
+        self.file_path = file_path
+        self.overlap_ratio = overlap_ratio
+        self.grid_cell = grid_cell
+        self.ids = []
+        self.points = np.empty((0, 2), dtype=np.int32)
+        self.polygons = []
+        self._stamp = None
+        self.refresh()
+
+    def refresh(self):
+        try:
+            st = os.stat(self.file_path)
+            stamp = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            stamp = None
+        if stamp == self._stamp:
+            return False
+        self._stamp = stamp
+        data = []
+        if stamp is not None:
+            with open(self.file_path, 'r') as file:
+                data = yaml.safe_load(file) or []
+        self.load(data)
+        return True
+
+    def load(self, data):
+        """Dựng lại điểm / polygon / index từ list item YAML."""
+        self.ids = [item['id'] for item in data]
+        self.polygons = [[tuple(p) for p in item['polygon']] if len(item.get('polygon') or []) >= 3 else None
+                         for item in data]
+        self.points = np.array([item['coordinate'] if item.get('coordinate') is not None else polygon_centroid(poly)
+                                for item, poly in zip(data, self.polygons)], dtype=np.int32).reshape(-1, 2)
+        self._point_idx = np.array([i for i, poly in enumerate(self.polygons) if poly is None], dtype=np.int64)
+        self._poly_idx = [i for i, poly in enumerate(self.polygons) if poly is not None]
+        self._poly_area = [polygon_area(self.polygons[i]) for i in self._poly_idx]
+        self._poly_bounds = [polygon_bounds(self.polygons[i]) for i in self._poly_idx]
+        self._grid = GridIndex(self._poly_bounds, self.grid_cell) if self._poly_idx else None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def match(self, boxes):
+        """
+        Trả về mảng (N,) index bbox chiếm slot, -1 nếu slot không bị che.
+        Slot điểm: bbox đầu tiên chứa điểm. Slot polygon: bbox che nhiều nhất (tỉ lệ >= overlap_ratio).
+        """
+        boxes = np.asarray(boxes).reshape(-1, 4)
+        result = np.full(len(self.ids), -1, dtype=np.int64)
+        if len(self.ids) == 0 or len(boxes) == 0:
+            return result
+        if len(self._point_idx):
+            points = self.points[self._point_idx]
+            px = points[:, 0:1]
+            py = points[:, 1:2]
+            inside = ((boxes[:, 0] <= px) & (px <= boxes[:, 2]) &
+                      (boxes[:, 1] <= py) & (py <= boxes[:, 3]))
+            result[self._point_idx] = np.where(inside.any(axis=1), inside.argmax(axis=1), -1)
+        if self._grid is not None:
+            best = {}
+            for b, box in enumerate(boxes.tolist()):
+                x1, y1, x2, y2 = box
+                for k in self._grid.query(box):
+                    px1, py1, px2, py2 = self._poly_bounds[k]
+                    area = self._poly_area[k]
+                    # Cận trên: diện tích giao của bbox với khung bao polygon
+                    upper = max(0, min(x2, px2) - max(x1, px1)) * max(0, min(y2, py2) - max(y1, py1))
+                    if area <= 0 or upper < self.overlap_ratio * area:
+                        continue
+                    if x1 <= px1 and px2 <= x2 and y1 <= py1 and py2 <= y2:
+                        ratio = 1.0  # polygon nằm trọn trong bbox, không cần cắt
+                    else:
+                        ratio = box_overlap_area(self.polygons[self._poly_idx[k]], box) / area
+                    if ratio >= self.overlap_ratio and ratio > best.get(k, (0.0,))[0]:
+                        best[k] = (ratio, b)
+            for k, (_, b) in best.items():
+                result[self._poly_idx[k]] = b
+        return result
+
+    def inside(self, box):
+        """Danh sách id các điểm nằm trong 1 bbox (x1, y1, x2, y2)."""
+        if len(self.ids) == 0:
+            return []
+        x1, y1, x2, y2 = box
+        px = self.points[:, 0]
+        py = self.points[:, 1]
+        mask = (x1 <= px) & (px <= x2) & (y1 <= py) & (py <= y2)
+        return [self.ids[i] for i in np.flatnonzero(mask)]
+
+
+class CoordinateStore:
+    """
+    Tọa độ của 1 camera: điểm giao ReID + slot đỗ, dùng chung cho process_video,
+    check_occupied_slots và load_cam.
+
+    `refresh()` gọi được trong vòng lặp frame: chỉ stat file tối đa 1 lần mỗi `check_interval` giây,
+    YAML chỉ được parse lại khi file đổi. Listener (hot-reload hook) được gọi sau mỗi lần reload.
+    """
+
+    def __init__(self, reid_file, slot_file, check_interval=1.0):
+        self.reid = CoordinateSet(reid_file)
+        self.slots = CoordinateSet(slot_file)
+        self.check_interval = check_interval
+        self._last_check = time.time()
+        self._listeners = []
+
+    @classmethod
+    def for_camera(cls, cam_idx, check_interval=1.0):
+        return cls(f"{REID_COORDS_PATH}{cam_idx}.yml", f"{SLOT_COORDS_PATH}{cam_idx}.yml", check_interval)
+
+    def add_listener(self, callback):
+        """callback(store) được gọi mỗi khi tọa độ reid/slot được load lại."""
+        self._listeners.append(callback)
+
+    def refresh(self, force=False):
+        now = time.time()
+        if not force and now - self._last_check < self.check_interval:
+            return False
+        self._last_check = now
+        changed = self.reid.refresh()
+        changed = self.slots.refresh() or changed
+        if changed:
+            for callback in self._listeners:
+                callback(self)
+        return changed
+
+
+def _write_yaml_atomic(file_path, data):
+    # Ghi file tạm rồi replace để process khác không bao giờ đọc phải file ghi dở
+    tmp_path = file_path + ".tmp"
+    with open(tmp_path, 'w') as file:
+        yaml.dump(data, file)
+    os.replace(tmp_path, file_path)
+
+
+def save_coordinates(cam_idx, slot_data=None, reid_data=None):
+    """
+    Lưu tọa độ 1 camera xuống YAML. Các CoordinateStore đang chạy (kể cả ở process khác)
+    sẽ tự reload ở lần refresh kế tiếp. Trả về True nếu có file thay đổi.
+    """
+    changed = False
+    for path, data in ((f"{SLOT_COORDS_PATH}{cam_idx}.yml", slot_data), (f"{REID_COORDS_PATH}{cam_idx}.yml", reid_data)):
+        if data is None:
+            continue
+        try:
+            with open(path, 'r') as file:
+                if (yaml.safe_load(file) or []) == data:
+                    continue
+        except OSError:
+            pass
+        _write_yaml_atomic(path, data)
+        print(f'YAML file {path} written successfully.')
+        changed = True
+    return changed
+
+
+def sync_from_cloud(parking_id, cam_idx):
+    """
+    Tải tọa độ camera từ cloud server và lưu xuống YAML nếu khác bản local.
+    Trả về dữ liệu camera từ cloud (None nếu lỗi).
+    """
+    cam = get_coordinates(parking_id, str(cam_idx))
+    if cam is not None:
+        if save_coordinates(cam_idx, cam.get('coordinates_list'), cam.get('coordinates_reid_list')):
+            print(f"[COORDS] Camera {cam_idx} coordinates updated from cloud")
+    return cam
+
+
+def watch_cloud_coordinates(parking_id, cam_indexes, interval):
+    """
+    Thread nền: định kỳ kiểm tra tọa độ trên cloud, có thay đổi thì ghi YAML
+    → các camera process hot-reload mà không cần khởi động lại.
+    """
+    while True:
+        time.sleep(interval)
+        for cam_idx in cam_indexes:
+            try:
+                sync_from_cloud(parking_id, cam_idx)
+            except Exception as e:
+                print(f"[WARNING] Failed to sync camera {cam_idx} coordinates: {e}")
+
+
+def start_watch_cloud_coordinates(parking_id, cam_indexes, interval):
+    if interval <= 0:
+        return None
+    t = threading.Thread(target=watch_cloud_coordinates, args=(parking_id, list(cam_indexes), interval), daemon=True)
+    t.start()
+    return t
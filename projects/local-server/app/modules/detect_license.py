@@ -1,30 +1,31 @@
 
 import os
 import cv2
-import torch
+import json
 import time
 import threading
 from dotenv import load_dotenv
 from app.modules import globals
-from app.modules.utils import play_sound, save_new_license_plate_to_file, get_parked_vehicles_from_file
-import app.resources.license_plate_recognition.function.helper as helper
-import app.resources.license_plate_recognition.function.utils_rotate as utils_rotate
+from app.modules.utils import play_sound
+from app.modules.entry_events import entry_channel
+from app.modules.frame_grabber import FrameGrabber
+from app.modules.parked_vehicle_store import get_parked_vehicle_store
+from app.modules.lpr_engine import LprEngine
+from app.modules.plate_consensus import PlateConsensus
 load_dotenv()
 def start_detect_license():
-    # Load model YOLO tùy chỉnh để phát hiện biển số xe
-    yolov5_path = "app/resources/license_plate_recognition/yolov5"
-    license_plate_detection_path = "app/resources/license_plate_recognition/model/LP_detector_nano_61.pt"
-    license_plate_ocr_path ="app/resources/license_plate_recognition/model/LP_ocr_nano_62.pt"
-
-    yolo_LP_detect = torch.hub.load(yolov5_path, 'custom', path=license_plate_detection_path, force_reload=True, source='local')
-    # Load model YOLO tùy chỉnh để nhận diện chữ trên biển số xe
-    yolo_license_plate = torch.hub.load(yolov5_path, 'custom', path=license_plate_ocr_path, force_reload=True, source='local')
-    # Đặt ngưỡng độ tự tin (confidence threshold) để nhận diện biển số xe
-    yolo_license_plate.conf = 0.4
-    cap = cv2.VideoCapture(int(os.getenv("LICENSE_CAMERA")), cv2.CAP_DSHOW)
+    # Load model YOLO phát hiện biển số + nhận diện ký tự (ngưỡng độ tự tin OCR 0.4)
+    lpr = LprEngine.load(ocr_conf=0.4)
+    # Thread grab riêng: QR / biển số luôn đọc trên frame mới nhất, không phải frame tồn trong buffer driver
+    grabber = FrameGrabber(int(os.getenv("LICENSE_CAMERA")), cv2.CAP_DSHOW, name="License camera")
+    if not grabber.start():
+        print("[ERROR] License camera failed to open")
+        return
     lp_temp = ""
-    delay = 0
-    authen_threshold = 5
+    # Xác nhận biển số bằng bỏ phiếu từng ký tự qua các frame gần đây (thay cho 5 lần đọc giống hệt liên tiếp)
+    consensus = PlateConsensus()
+    # Ghi kết quả OCR từng frame ra file JSONL để chạy lại bằng benchmarks/bench_plate_consensus
+    record_path = os.getenv("LPR_RECORD", "")
     qr_decoder = cv2.QRCodeDetector()
     while(True):
         if not globals.start_detect_license:
@@ -32,7 +33,7 @@ def start_detect_license():
             continue
         else:
             if globals.qr_code == "":
-                ret, frame = cap.read()
+                ret, frame, _ = grabber.read()
                 if not ret or frame is None:
                     print("[WARNING] Failed to read QR frame")
                     time.sleep(0.1)
@@ -61,7 +62,7 @@ def start_detect_license():
                                 time.sleep(3)
                         # Nếu xe ra kiểm tra xe đã có trong bãi không
                         elif globals.car_out:
-                            exists = any(item["user_id"] == qr_code for item in get_parked_vehicles_from_file()["list"])
+                            exists = get_parked_vehicle_store().exists_user_id(qr_code)
                             if exists:
                                 globals.qr_code = qr_code
                             else:
@@ -69,80 +70,68 @@ def start_detect_license():
                                 threading.Thread(target=play_sound, args=('qr-not-registered.mp3',)).start()
                                 time.sleep(3)
             elif globals.license_plate == "":
-                ret, frame = cap.read()
+                ret, frame, frame_ts = grabber.read()
                 if frame is None:
                     print("License frame is none!")
                     time.sleep(1)
                     continue
                 print("License Detecting...")
-                plates = yolo_LP_detect(frame, size=640)
-                # Lấy danh sách các biển số xe được phát hiện (tọa độ bounding box)
-                list_plates = plates.pandas().xyxy[0].values.tolist()
-                # Tạo một tập hợp để lưu các biển số xe đã đọc
-                list_read_plates = []
-                # Lặp qua tất cả các biển số xe được phát hiện
-                for plate in list_plates:
-                    x = int(plate[0]) # Lấy tọa độ xmin của bounding box
-                    y = int(plate[1]) # Lấy tọa độ ymin của bounding box
-                    w = int(plate[2] - plate[0]) # Tính toán chiều rộng của bounding box
-                    h = int(plate[3] - plate[1]) # Tính toán chiều cao của bounding box
-                    # Cắt hình ảnh của biển số xe từ khung hình
-                    crop_img = frame[y:y+h, x:x+w]
-                    lp = helper.read_plate(yolo_license_plate, utils_rotate.deskew(crop_img, 0, 0))
-                    # Nếu biển số được nhận diện không phải "unknown"
-                    if lp != "unknown":
-                        # Thêm biển số đã nhận diện vào danh sách
-                        list_read_plates.append(lp)
-                # Xác nhận biển số xe có chính xác không bằng cách kiểm tra giá trị trong 3 lần detect có giống nhau không
-                if len(list_read_plates) == 1: # chỉ lấy 1 biển số xe, trường hợp có nhiều hơn 1 biến số xe hoặc không có cái nào thì bỏ qua
-                    if list_read_plates[0] == lp_temp:
-                        delay += 1
-                    else:
-                        delay = 0
-                        lp_temp = list_read_plates[0]
-                    if delay >= authen_threshold:   
-                        delay = 0
-                        print("Detected License Plate:", lp_temp)
-                        threading.Thread(target=play_sound, args=('scan.mp3',)).start()
-                        # Nếu xe vào kiểm tra biển số có đăng ký không và xe đã có trong bãi chưa
-                        if globals.car_in:
-                            # Kiểm tra biển số có trong danh sách đăng ký và user_id trùng với qr_code không
-                            condition_1 = False
-                            condition_2 = False
-                            for item in globals.registered_vehicles:
-                                if item["license_plate"] == lp_temp and item["user_id"] == globals.qr_code:
-                                    condition_1 = True
-                                    break
-                            condition_2 = any(item["license_plate"] == lp_temp for item in get_parked_vehicles_from_file()["list"])
-                            if condition_1 and not condition_2:
-                                globals.license_plate = lp_temp
-                                save_new_license_plate_to_file(lp_temp, globals.qr_code)
-                                globals.start_detect_license = False
-                                if globals.car_in:
-                                    globals.open_in = True
-                                    globals.car_in = False
-                                if globals.car_out:
-                                    globals.open_out = True
-                                    globals.car_out = False
-                            else:
-                                print("License Plate not registered:", lp_temp)
-                                threading.Thread(target=play_sound, args=('bien-so-khong-dung.mp3',)).start()
-                                time.sleep(3)
-                        # Nếu xe ra kiểm tra biển số có trong bãi không
-                        elif globals.car_out:
-                            exists = any(item["license_plate"] == lp_temp for item in get_parked_vehicles_from_file()["list"])
-                            if exists:
-                                globals.license_plate = lp_temp
-                                globals.start_detect_license = False
-                                if globals.car_in:
-                                    globals.open_in = True
-                                    globals.car_in = False
-                                if globals.car_out:
-                                    globals.open_out = True
-                                    globals.car_out = False
-                            else:
-                                print("License Plate not in parked vehicles:", lp_temp)
-                                threading.Thread(target=play_sound, args=('bien-so-khong-dung.mp3',)).start()
-                                time.sleep(3)
+                # Phát hiện + đọc biển số trên tensor (không đổi sang DataFrame)
+                list_read_plates = [r for r in lpr.read(frame) if r.plate != "unknown"]
+                if record_path:
+                    with open(record_path, "a", encoding="utf-8") as f:
+                        f.write(json.dumps({"ts": frame_ts, "plates": [{"plate": r.plate, "confs": [round(float(q), 4) for q in r.confs]}
+                                                                       for r in list_read_plates]}) + "\n")
+                # chỉ bỏ phiếu khi có đúng 1 biển số xe, nhiều hơn 1 hoặc không có thì chỉ để các lần đọc cũ hết hạn
+                if len(list_read_plates) == 1:
+                    confirmed = consensus.update(list_read_plates[0].plate, list_read_plates[0].confs, now=frame_ts)
+                else:
+                    confirmed = consensus.update(None, now=frame_ts)
+                if confirmed:
+                    lp_temp = confirmed
+                    consensus.reset()
+                    print("Detected License Plate:", lp_temp)
+                    threading.Thread(target=play_sound, args=('scan.mp3',)).start()
+                    # Nếu xe vào kiểm tra biển số có đăng ký không và xe đã có trong bãi chưa
+                    if globals.car_in:
+                        # Kiểm tra biển số có trong danh sách đăng ký và user_id trùng với qr_code không
+                        condition_1 = False
+                        condition_2 = False
+                        for item in globals.registered_vehicles:
+                            if item["license_plate"] == lp_temp and item["user_id"] == globals.qr_code:
+                                condition_1 = True
+                                break
+                        condition_2 = get_parked_vehicle_store().exists_license_plate(lp_temp)
+                        if condition_1 and not condition_2:
+                            globals.license_plate = lp_temp
+                            # Báo cho tracking: xe vừa qua cổng (biển số + user_id + thời điểm)
+                            entry_channel.publish(lp_temp, globals.qr_code)
+                            globals.start_detect_license = False
+                            if globals.car_in:
+                                globals.open_in = True
+                                globals.car_in = False
+                            if globals.car_out:
+                                globals.open_out = True
+                                globals.car_out = False
+                        else:
+                            print("License Plate not registered:", lp_temp)
+                            threading.Thread(target=play_sound, args=('bien-so-khong-dung.mp3',)).start()
+                            time.sleep(3)
+                    # Nếu xe ra kiểm tra biển số có trong bãi không
+                    elif globals.car_out:
+                        exists = get_parked_vehicle_store().exists_license_plate(lp_temp)
+                        if exists:
+                            globals.license_plate = lp_temp
+                            globals.start_detect_license = False
+                            if globals.car_in:
+                                globals.open_in = True
+                                globals.car_in = False
+                            if globals.car_out:
+                                globals.open_out = True
+                                globals.car_out = False
+                        else:
+                            print("License Plate not in parked vehicles:", lp_temp)
+                            threading.Thread(target=play_sound, args=('bien-so-khong-dung.mp3',)).start()
+                            time.sleep(3)
             else:
                 time.sleep(1)
\ No newline at end of file
@@ -0,0 +1,143 @@
+import time
+import numpy as np
+from multiprocessing import shared_memory
+
+# Số slot trong ring và số bbox tối đa mỗi frame
+RING_SIZE = 8
+MAX_BOXES = 64
+TRUNCATE_LOG_INTERVAL = 60.0  # giây giữa 2 lần cảnh báo frame có quá MAX_BOXES bbox
+
+# Layout cố định của 1 slot trong shared memory
+#   lock  : bộ đếm seqlock (lẻ = writer đang ghi, chẵn = ổn định)
+#   seqno : số thứ tự frame đã ghi vào slot
+#   ts    : thời điểm detect (time.time())
+#   count : số bbox hợp lệ trong `boxes`
+#   boxes : [track_id, x1, y1, x2, y2]
+SLOT_DTYPE = np.dtype([
+    ('lock', np.uint64),
+    ('seqno', np.uint64),
+    ('ts', np.float64),
+    ('count', np.uint32),
+    ('pad', np.uint32),
+    ('boxes', np.int32, (MAX_BOXES, 5)),
+])
+HEADER_DTYPE = np.dtype([
+    ('head', np.uint64),  # seqno của frame mới nhất đã publish xong
+])
+
+
+class DetectionRing:
+    """
+    Ring buffer detection của 1 camera trên `multiprocessing.shared_memory`.
+
+    - 1 writer (process camera), nhiều reader (main process) - không dùng lock.
+    - Writer ghi frame mới vào slot kế tiếp, bọc bởi seqlock; reader copy slot rồi
+      kiểm tra lại bộ đếm, nếu writer vừa ghi đè thì đọc lại.
+    - Process con chỉ cần nhận `ring.name` (string) và gọi `DetectionRing.attach(name)`.
+    - Frame có quá MAX_BOXES bbox chỉ ghi MAX_BOXES bbox đầu; writer đếm vào `truncated_frames` /
+      `truncated_boxes` và cảnh báo tối đa 1 lần mỗi TRUNCATE_LOG_INTERVAL giây.
+    """
+
+    def __init__(self, shm, owner=False):
+        self._shm = shm
+        self._owner = owner
+        self._header = np.ndarray((1,), dtype=HEADER_DTYPE, buffer=shm.buf, offset=0)
+        self._slots = np.ndarray((RING_SIZE,), dtype=SLOT_DTYPE, buffer=shm.buf,
+                                 offset=HEADER_DTYPE.itemsize)
+        self._seqno = int(self._header['head'][0])
+        self.truncated_frames = 0
+        self.truncated_boxes = 0
+        self._truncate_logged = 0.0
+        self._truncate_pending = 0
+
+    @classmethod
+    def create(cls):
+        size = HEADER_DTYPE.itemsize + RING_SIZE * SLOT_DTYPE.itemsize
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        shm.buf[:size] = bytes(size)
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name):
+        return cls(shared_memory.SharedMemory(name=name))
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    # ------------------------------------------------------------------ writer
+    def write(self, ids, boxes, ts=None):
+        """
+        Publish detection của 1 frame. `ids` là list/array track id, `boxes` là (N, 4) xyxy.
+        Chỉ được gọi từ đúng 1 process (camera sở hữu ring).
+        """
+        ts = time.time() if ts is None else ts
+        n = min(len(ids), MAX_BOXES)
+        if n < len(ids):
+            self._count_truncated(len(ids) - n)
+
+        self._seqno += 1
+        slot = self._slots[self._seqno % RING_SIZE]
+        lock = int(slot['lock'])
+        slot['lock'] = lock + 1  # lẻ → reader sẽ bỏ qua slot này
+        slot['seqno'] = self._seqno
+        slot['ts'] = ts
+        slot['count'] = n
+        if n:
+            slot['boxes'][:n, 0] = np.asarray(ids[:n], dtype=np.int32)
+            slot['boxes'][:n, 1:] = np.asarray(boxes[:n], dtype=np.int32)
+        slot['lock'] = lock + 2
+        self._header['head'] = self._seqno
+
+    def _count_truncated(self, extra):
+        self.truncated_frames += 1
+        self.truncated_boxes += extra
+        self._truncate_pending += 1
+        now = time.time()
+        if now - self._truncate_logged >= TRUNCATE_LOG_INTERVAL:
+            print(f"[WARNING] DetectionRing {self.name}: {self._truncate_pending} frame(s) had more than "
+                  f"{MAX_BOXES} boxes, extra boxes dropped ({self.truncated_boxes} boxes in total)")
+            self._truncate_logged = now
+            self._truncate_pending = 0
+
+    # ------------------------------------------------------------------ reader
+    def read(self, retries=10):
+        """
+        Đọc frame mới nhất. Trả về (seqno, ts, ids (N,), boxes (N, 4)) - đều là bản copy.
+        Ring chưa có dữ liệu → (0, 0.0, [], []).
+        """
+        for _ in range(retries):
+            head = int(self._header['head'][0])
+            if head == 0:
+                break
+            slot = self._slots[head % RING_SIZE]
+            lock = int(slot['lock'])
+            if lock & 1:
+                continue
+            seqno = int(slot['seqno'])
+            ts = float(slot['ts'])
+            n = int(slot['count'])
+            data = slot['boxes'][:n].copy()
+            if int(slot['lock']) == lock and seqno == head:
+                return seqno, ts, data[:, 0], data[:, 1:]
+        return 0, 0.0, np.empty((0,), dtype=np.int32), np.empty((0, 4), dtype=np.int32)
+
+    def read_bboxes(self, max_age=None):
+        """
+        Đọc frame mới nhất theo format cũ của `bbox_by_cam`: [(obj_id, [x1, y1, x2, y2], ts), ...].
+        Nếu `max_age` (giây) được truyền và frame quá cũ → [] (camera đã dừng).
+        """
+        seqno, ts, ids, boxes = self.read()
+        if seqno == 0 or (max_age is not None and time.time() - ts > max_age):
+            return []
+        return [(int(i), b.tolist(), ts) for i, b in zip(ids, boxes)]
+
+    def close(self):
+        self._header = None
+        self._slots = None
+        self._shm.close()
+        if self._owner:
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
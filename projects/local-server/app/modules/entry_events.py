@@ -0,0 +1,67 @@
+import os
+import time
+import threading
+from collections import deque
+from dotenv import load_dotenv
+load_dotenv()
+
+ENTRY_MATCH_WINDOW = float(os.getenv("ENTRY_MATCH_WINDOW", "60"))  # giây từ lúc qua cổng tới khi camera anchor thấy xe
+ENTRY_EARLY_TOLERANCE = 2.0  # track có thể xuất hiện trước thời điểm đọc xong biển số một chút
+
+
+class EntryEventChannel:
+    """
+    Kênh sự kiện xe vào bãi: cổng LPR (detect_license) → tracking (IdMerger / register_new_vehicle).
+
+    Thay cho new_license.json: không còn đọc/ghi file mỗi lần có canonical mới, và không còn race
+    khi cổng ghi đè biển số trước khi camera anchor kịp đọc (các sự kiện được xếp hàng FIFO).
+    Track mới ở camera anchor chỉ nhận biển số của sự kiện cổng trong cửa sổ thời gian `window`;
+    sự kiện quá hạn bị bỏ (xe qua cổng nhưng không vào vùng camera).
+    """
+
+    def __init__(self, window=ENTRY_MATCH_WINDOW, early_tolerance=ENTRY_EARLY_TOLERANCE):
+        self.window = window
+        self.early_tolerance = early_tolerance
+        self._events = deque()  # (gate_ts, plate, user_id)
+        self._lock = threading.Lock()
+
+    def publish(self, plate, user_id="", gate_ts=None):
+        """Cổng đã xác nhận biển số xe vào."""
+        gate_ts = time.time() if gate_ts is None else gate_ts
+        with self._lock:
+            # Cùng biển số đọc lại nhiều lần → chỉ giữ sự kiện mới nhất
+            self._events = deque(e for e in self._events if e[1] != plate)
+            self._events.append((gate_ts, plate, user_id))
+        print(f"[ENTRY] Gate event: {plate} (user_id={user_id})")
+
+    def _expire(self, now):
+        while self._events and now - self._events[0][0] > self.window:
+            gate_ts, plate, _ = self._events.popleft()
+            print(f"[ENTRY] Drop expired gate event: {plate} ({now - gate_ts:.1f}s)")
+
+    def match(self, track_ts=None):
+        """
+        Lấy sự kiện cổng cũ nhất khớp với track mới xuất hiện lúc `track_ts`.
+        Trả về (plate, user_id) hoặc None.
+        """
+        track_ts = time.time() if track_ts is None else track_ts
+        with self._lock:
+            self._expire(track_ts)
+            for event in self._events:
+                gate_ts, plate, user_id = event
+                if gate_ts - self.early_tolerance <= track_ts <= gate_ts + self.window:
+                    self._events.remove(event)
+                    return plate, user_id
+        return None
+
+    def pending(self):
+        with self._lock:
+            return [(plate, user_id) for _, plate, user_id in self._events]
+
+    def clear(self):
+        with self._lock:
+            self._events.clear()
+
+
+# Dùng chung trong main process (detect_license và tracking_car đều chạy thread ở main process)
+entry_channel = EntryEventChannel()
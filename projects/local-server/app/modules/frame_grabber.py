@@ -0,0 +1,185 @@
+import os
+import time
+import threading
+import cv2
+from dotenv import load_dotenv
+load_dotenv()
+
+FRAME_STATS_INTERVAL = float(os.getenv("FRAME_STATS_INTERVAL", "60"))  # giây giữa 2 lần in thống kê, 0 = tắt
+FRAME_REOPEN_AFTER = int(os.getenv("FRAME_REOPEN_AFTER", "30"))  # số lần đọc lỗi liên tiếp trước khi mở lại camera
+FRAME_RETRY_DELAY = 0.1  # giây chờ giữa 2 lần đọc lỗi
+
+
+class FrameGrabber:
+    """
+    Đọc camera trong thread riêng, chỉ giữ frame mới nhất (drop-oldest).
+
+    - Thread grab gọi cap.read() liên tục → buffer driver không bao giờ đầy, vòng lặp inference
+      luôn nhận frame mới nhất thay vì frame cũ cách đây vài giây.
+    - Frame được gắn timestamp lúc grab (dùng cho DetectionRing / merge ID thay cho thời điểm
+      inference xong).
+    - read() chỉ trả frame chưa từng được trả (chờ frame mới) → không xử lý lại cùng 1 frame.
+    - stats(): số frame grab / giao / bị bỏ, FPS grab, tuổi frame lúc giao (trung bình, lớn nhất).
+    - Camera thật (live): cap.read() lỗi chỉ là trục trặc tạm thời → đọc lại, lỗi liên tiếp
+      `reopen_after` lần thì mở lại camera. Chỉ file video mới coi read() lỗi là hết stream.
+    - File video (không live): không bỏ frame - thread grab chờ frame trước được read() lấy rồi mới
+      giao frame tiếp theo, nên tốc độ đọc file theo tốc độ inference (giống đọc tuần tự).
+    """
+
+    def __init__(self, source, api_preference=None, name="Camera", stats_interval=FRAME_STATS_INTERVAL,
+                 live=None, reopen_after=FRAME_REOPEN_AFTER):
+        self.source = source
+        self.api_preference = api_preference
+        self.name = name
+        self.stats_interval = stats_interval
+        # Mặc định: chỉ đường dẫn tới file có sẵn là file video, còn lại (index camera, URL stream) là live
+        self.live = live if live is not None else not (isinstance(source, str) and os.path.isfile(source))
+        self.reopen_after = reopen_after
+        self._cap = None
+        self._cond = threading.Condition()
+        self._frame = None
+        self._ts = 0.0
+        self._seq = 0
+        self._read_seq = 0
+        self._eof = False
+        self._stopped = False
+        self._thread = None
+        self.grabbed = 0
+        self.delivered = 0
+        self.dropped = 0
+        self._age_sum = 0.0
+        self._age_max = 0.0
+        self._started_at = 0.0
+
+    @classmethod
+    def from_capture(cls, cap, name="Camera", stats_interval=FRAME_STATS_INTERVAL, live=True):
+        """
+        Dùng VideoCapture đã mở sẵn (vd. pipeline GStreamer / V4L2 đã set thông số).
+        Không có source để mở lại nên khi lỗi chỉ đọc lại trên cùng capture.
+        """
+        grabber = cls(None, name=name, stats_interval=stats_interval, live=live)
+        grabber._cap = cap
+        return grabber
+
+    def _open(self):
+        if self.api_preference is None:
+            return cv2.VideoCapture(self.source)
+        return cv2.VideoCapture(self.source, self.api_preference)
+
+    def start(self):
+        """Mở camera và chạy thread grab. Trả về False nếu không mở được."""
+        if self._cap is None:
+            self._cap = self._open()
+        if not self._cap.isOpened():
+            return False
+        self._started_at = time.time()
+        self._thread = threading.Thread(target=self._run, name=f"grab-{self.name}", daemon=True)
+        self._thread.start()
+        return True
+
+    def _reopen(self):
+        print(f"[WARNING] {self.name}: {self.reopen_after} failed reads, reopening camera...")
+        self._cap.release()
+        time.sleep(1.0)
+        self._cap = self._open()
+        print(f"[GRAB] {self.name}: reopen {'OK' if self._cap.isOpened() else 'failed, will retry'}")
+
+    def _run(self):
+        last_log = time.time()
+        failures = 0
+        while not self._stopped:
+            ret, frame = self._cap.read()
+            ts = time.time()
+            if not ret or frame is None:
+                if not self.live:
+                    with self._cond:
+                        self._eof = True
+                        self._cond.notify_all()
+                    break
+                failures += 1
+                if failures == 1:
+                    print(f"[WARNING] {self.name}: failed to read frame, retrying...")
+                if failures % self.reopen_after == 0 and self.source is not None:
+                    self._reopen()
+                else:
+                    time.sleep(FRAME_RETRY_DELAY)
+                continue
+            if failures:
+                print(f"[GRAB] {self.name}: recovered after {failures} failed reads")
+                failures = 0
+            with self._cond:
+                # File video: chờ frame trước được đọc xong thay vì bỏ nó
+                while not self.live and self._seq > self._read_seq and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    break
+                if self._seq > self._read_seq:
+                    self.dropped += 1  # frame trước chưa ai đọc đã bị thay
+                self._frame = frame
+                self._ts = ts
+                self._seq += 1
+                self.grabbed += 1
+                self._cond.notify_all()
+            if self.stats_interval > 0 and ts - last_log >= self.stats_interval:
+                last_log = ts
+                self.log_stats()
+        self._cap.release()
+
+    def read(self, timeout=5.0):
+        """
+        Chờ frame mới hơn frame đã trả lần trước. Trả về (ret, frame, ts):
+        ret = False khi hết stream (file video) hoặc quá `timeout` giây không có frame mới
+        (camera live đang đọc lại / mở lại: gọi lại read(), kiểm tra `ended` để biết đã hết hẳn).
+        """
+        deadline = time.time() + timeout
+        with self._cond:
+            while self._seq <= self._read_seq and not self._eof and not self._stopped:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False, None, 0.0
+                self._cond.wait(remaining)
+            if self._seq <= self._read_seq:
+                return False, None, 0.0
+            self._read_seq = self._seq
+            self._cond.notify_all()  # thread grab file video đang chờ frame này được đọc
+            age = time.time() - self._ts
+            self.delivered += 1
+            self._age_sum += age
+            self._age_max = max(self._age_max, age)
+            return True, self._frame, self._ts
+
+    @property
+    def ended(self):
+        """True khi không còn frame nào nữa: hết file video hoặc đã release()."""
+        return self._eof or self._stopped
+
+    def latest_age(self):
+        """Tuổi (giây) của frame mới nhất đã grab."""
+        with self._cond:
+            return time.time() - self._ts if self._seq else float("inf")
+
+    def stats(self):
+        with self._cond:
+            elapsed = max(time.time() - self._started_at, 1e-6)
+            return {
+                "grabbed": self.grabbed,
+                "delivered": self.delivered,
+                "dropped": self.dropped,
+                "grab_fps": round(self.grabbed / elapsed, 1),
+                "avg_age_ms": round(self._age_sum / self.delivered * 1000, 1) if self.delivered else 0.0,
+                "max_age_ms": round(self._age_max * 1000, 1),
+            }
+
+    def log_stats(self):
+        s = self.stats()
+        print(f"[GRAB] {self.name}: grab {s['grab_fps']} fps, delivered {s['delivered']}, dropped {s['dropped']}, "
+              f"frame age avg {s['avg_age_ms']}ms / max {s['max_age_ms']}ms")
+
+    def release(self):
+        self._stopped = True
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+        elif self._cap is not None:
+            self._cap.release()
@@ -0,0 +1,168 @@
+import os
+import numpy as np
+from dotenv import load_dotenv
+load_dotenv()
+
+# Cấu hình ROI (đọc từ .env)
+ROI_CROP = os.getenv("ROI_CROP", "0") == "1"
+ROI_PADDING = int(os.getenv("ROI_PADDING", "160"))           # pixel quanh mỗi điểm slot / ReID (phải đủ chứa cả xe)
+ROI_GAP = 16                                                 # khoảng trống giữa các tile trong mosaic
+ROI_TILE_GAIN = float(os.getenv("ROI_TILE_GAIN", "0.7"))     # tổng diện tích tile < gain × vùng bao → ghép mosaic
+ROI_FULL_RATIO = 0.9                                         # vùng bao > 90% khung hình → chạy cả frame
+ROI_FILL = 114                                               # màu nền giống letterbox của YOLO
+
+
+def _merge_rects(rects):
+    """Gộp các hình chữ nhật chồng lên nhau tới khi không còn cặp nào chồng nhau."""
+    rects = [list(r) for r in rects]
+    merged = True
+    while merged:
+        merged = False
+        out = []
+        for r in rects:
+            for o in out:
+                if r[0] < o[2] and o[0] < r[2] and r[1] < o[3] and o[1] < r[3]:
+                    o[0], o[1] = min(o[0], r[0]), min(o[1], r[1])
+                    o[2], o[3] = max(o[2], r[2]), max(o[3], r[3])
+                    merged = True
+                    break
+            else:
+                out.append(r)
+        rects = out
+    return rects
+
+
+class FrameRoi:
+    """
+    Chỉ đưa vào model vùng quanh slot / điểm giao ReID của camera thay vì cả frame.
+
+    - Vùng quan tâm: mỗi điểm slot / ReID ± `padding`, polygon slot lấy bounds ± `padding`; các vùng
+      chồng nhau được gộp lại thành tile.
+    - Chế độ (chọn lại mỗi khi tọa độ hoặc kích thước frame đổi):
+        full   : vùng bao gần hết khung hình (hoặc chưa có tọa độ) → chạy cả frame như cũ
+        crop   : cắt đúng hình chữ nhật bao các tile (view, không copy)
+        mosaic : các tile rời nhau, tổng diện tích nhỏ hơn nhiều so với vùng bao → xếp các tile vào
+                 1 ảnh nhỏ (shelf packing, cách nhau ROI_GAP pixel) và chạy 1 lần. Chỉ khi `mosaic=True`:
+                 xe đi qua làn giữa 2 tile bị mất rồi xuất hiện ở tile khác với track id mới, nên camera
+                 anchor (cấp global_id theo track id) chỉ dùng crop
+    - to_frame(ids, xyxy): đổi bbox từ tọa độ ảnh đưa vào model về tọa độ frame gốc (bbox thuộc tile
+      chứa tâm của nó, cắt theo biên tile); bbox rơi vào khoảng trống giữa các tile bị bỏ.
+    - Tracker chạy trên ảnh ROI: layout cố định nên track id vẫn ổn định giữa các frame.
+    """
+
+    def __init__(self, padding=ROI_PADDING, gap=ROI_GAP, tile_gain=ROI_TILE_GAIN, name="Camera", mosaic=True):
+        self.padding = padding
+        self.mosaic = mosaic
+        self.gap = gap
+        self.tile_gain = tile_gain
+        self.name = name
+        self.mode = "full"
+        self.tiles = np.empty((0, 4), dtype=np.int32)    # tile trong frame gốc (x1, y1, x2, y2)
+        self.origins = np.empty((0, 2), dtype=np.int32)  # góc trên trái của tile trong ảnh đưa vào model
+        self.pixel_ratio = 1.0
+        self._points = []
+        self._rects = []
+        self._shape = None
+        self._canvas = None
+        self._canvas_shape = None
+
+    def set_coordinates(self, coords):
+        """coords: CoordinateStore của camera (gọi lại trong listener khi tọa độ hot-reload)."""
+        self._points = coords.slots.points.tolist() + coords.reid.points.tolist()
+        self._rects = [[min(x for x, _ in poly), min(y for _, y in poly), max(x for x, _ in poly), max(y for _, y in poly)]
+                       for poly in coords.slots.polygons if poly is not None]
+        self._shape = None  # tính lại ở frame tiếp theo
+
+    def _plan(self, shape):
+        h, w = shape[:2]
+        self._shape = shape
+        self._canvas = None
+        pad = self.padding
+        rects = [[x - pad, y - pad, x + pad, y + pad] for x, y in self._points]
+        rects += [[x1 - pad, y1 - pad, x2 + pad, y2 + pad] for x1, y1, x2, y2 in self._rects]
+        rects = [[max(0, int(x1)), max(0, int(y1)), min(w, int(x2)), min(h, int(y2))] for x1, y1, x2, y2 in rects]
+        rects = _merge_rects([r for r in rects if r[2] > r[0] and r[3] > r[1]])
+        if not rects:
+            self._set_full(w, h)
+            return
+        tiles = np.array(rects, dtype=np.int32)
+        union = [tiles[:, 0].min(), tiles[:, 1].min(), tiles[:, 2].max(), tiles[:, 3].max()]
+        union_area = (union[2] - union[0]) * (union[3] - union[1])
+        tiles_area = int(((tiles[:, 2] - tiles[:, 0]) * (tiles[:, 3] - tiles[:, 1])).sum())
+
+        if self.mosaic and len(tiles) > 1 and tiles_area < self.tile_gain * union_area:
+            self._pack(tiles)
+        elif union_area < ROI_FULL_RATIO * w * h:
+            self.mode = "crop"
+            self.tiles = np.array([union], dtype=np.int32)
+            self.origins = np.zeros((1, 2), dtype=np.int32)
+            self.pixel_ratio = union_area / (w * h)
+        else:
+            self._set_full(w, h)
+            return
+        print(f"[ROI] {self.name}: {self.mode}, {len(self.tiles)} tile(s), "
+              f"{self.pixel_ratio * 100:.0f}% pixel so với cả frame {w}x{h}")
+
+    def _set_full(self, w, h):
+        self.mode = "full"
+        self.tiles = np.array([[0, 0, w, h]], dtype=np.int32)
+        self.origins = np.zeros((1, 2), dtype=np.int32)
+        self.pixel_ratio = 1.0
+
+    def _pack(self, tiles):
+        # Shelf packing: tile cao nhất trước, xếp trái → phải, hết chiều rộng thì xuống hàng
+        sizes = np.stack([tiles[:, 2] - tiles[:, 0], tiles[:, 3] - tiles[:, 1]], axis=1)
+        area = int((sizes[:, 0] * sizes[:, 1]).sum())
+        width = max(int(sizes[:, 0].max()), int(np.sqrt(area)))
+        origins = np.zeros_like(sizes)
+        x = y = row_h = 0
+        for i in np.argsort(-sizes[:, 1], kind="stable"):
+            tw, th = sizes[i]
+            if x > 0 and x + tw > width:
+                x, y, row_h = 0, y + row_h + self.gap, 0
+            origins[i] = (x, y)
+            x += tw + self.gap
+            row_h = max(row_h, th)
+        canvas_w = int((origins[:, 0] + sizes[:, 0]).max())
+        canvas_h = int((origins[:, 1] + sizes[:, 1]).max())
+        self.mode = "mosaic"
+        self.tiles = tiles
+        self.origins = origins.astype(np.int32)
+        self._canvas_shape = (canvas_h, canvas_w)
+        self.pixel_ratio = canvas_w * canvas_h / float(self._shape[0] * self._shape[1])
+
+    def apply(self, frame):
+        """Trả về ảnh đưa vào model (view / mosaic dùng lại buffer, chỉ hợp lệ tới lần apply tiếp theo)."""
+        if self._shape != frame.shape:
+            self._plan(frame.shape)
+        if self.mode == "full":
+            return frame
+        if self.mode == "crop":
+            x1, y1, x2, y2 = self.tiles[0]
+            return frame[y1:y2, x1:x2]
+        if self._canvas is None:
+            self._canvas = np.full(self._canvas_shape + frame.shape[2:], ROI_FILL, dtype=frame.dtype)
+        for (x1, y1, x2, y2), (ox, oy) in zip(self.tiles, self.origins):
+            self._canvas[oy:oy + y2 - y1, ox:ox + x2 - x1] = frame[y1:y2, x1:x2]
+        return self._canvas
+
+    def to_frame(self, ids, xyxy):
+        """Đổi bbox (tọa độ ảnh ROI) về tọa độ frame gốc. Trả về (ids, xyxy) dạng list như model.track."""
+        if self.mode == "full" or not ids:
+            return ids, xyxy
+        boxes = np.asarray(xyxy, dtype=np.float32).reshape(-1, 4)
+        if self.mode == "crop":
+            boxes += np.tile(self.tiles[0, :2], 2)
+            return ids, boxes.tolist()
+        cx = (boxes[:, 0] + boxes[:, 2]) / 2
+        cy = (boxes[:, 1] + boxes[:, 3]) / 2
+        sizes = self.tiles[:, 2:] - self.tiles[:, :2]
+        ends = self.origins + sizes
+        # (N, T): tâm bbox nằm trong tile nào của mosaic
+        inside = ((cx[:, None] >= self.origins[:, 0]) & (cx[:, None] < ends[:, 0]) &
+                  (cy[:, None] >= self.origins[:, 1]) & (cy[:, None] < ends[:, 1]))
+        keep = inside.any(axis=1)
+        tile = inside.argmax(axis=1)[keep]
+        boxes = boxes[keep] + np.tile(self.tiles[tile, :2] - self.origins[tile], 2)
+        boxes = np.clip(boxes, np.tile(self.tiles[tile, :2], 2), np.tile(self.tiles[tile, 2:], 2))
+        return [i for i, k in zip(ids, keep) if k], boxes.tolist()
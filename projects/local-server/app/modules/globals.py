@@ -32,8 +32,11 @@ qr_code = ""
 give_way = False
 give_way_shared = None  # Will be set to Manager.Value from main process
 canonical_map = None  # Will be set from tracking_car.py for external access
+identity_store = None  # IdentityStore (union-find canonical ID) - set from tracking_car.py
 global_id_license_plate_map = {}
-bbox_by_cam = None
+plate_index = None  # PlateIndex (biển số <-> global_id) - set from tracking_car.py
+detection_rings = None  # {cam_idx: DetectionRing} - set from tracking_car.py
+occupancy_bitmaps = None  # {cam_idx: OccupancyBitmap} - set from tracking_car.py
 occupied_list = []
 available_list = []
 license_occupied_list = []
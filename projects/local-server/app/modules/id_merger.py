@@ -0,0 +1,132 @@
+import time
+import queue
+import threading
+
+
+class CrossingReporter:
+    """
+    Phía camera process: gửi sự kiện cho IdMerger qua Queue (không lock, không đọc Manager dict).
+
+    - cross(cid, tid, ts): track `tid` đang đè lên điểm giao `cid`. Chỉ gửi khi cặp (cid, tid) mới
+      hoặc lần gửi trước đã cũ hơn `min_interval` → không spam queue mỗi frame.
+    - new_track(tid): camera anchor thấy track mới → merger cấp canonical id + gán biển số.
+    """
+
+    ANCHOR_TTL = 60.0  # track không còn thấy sau 60s thì quên (để set không phình mãi)
+
+    def __init__(self, cam_id, event_queue, min_interval=0.25):
+        self.cam_id = cam_id
+        self.event_queue = event_queue
+        self.min_interval = min_interval
+        self._last_cross = {}  # cid -> (tid, ts đã gửi)
+        self._anchored = {}    # tid -> ts thấy gần nhất
+        self._last_prune = time.time()
+
+    def cross(self, cid, tid, ts):
+        last = self._last_cross.get(cid)
+        if last is not None and last[0] == tid and ts - last[1] < self.min_interval:
+            return
+        self._last_cross[cid] = (tid, ts)
+        self.event_queue.put(("cross", self.cam_id, cid, tid, ts))
+
+    def new_track(self, tid, ts=None):
+        now = time.time() if ts is None else ts
+        is_new = tid not in self._anchored
+        self._anchored[tid] = now
+        if is_new:
+            self.event_queue.put(("anchor", self.cam_id, tid, now))
+        if now - self._last_prune > self.ANCHOR_TTL:
+            self._last_prune = now
+            self._anchored = {t: ts for t, ts in self._anchored.items() if now - ts <= self.ANCHOR_TTL}
+
+
+class IdMerger:
+    """
+    MERGE ID giữa nhiều camera → canonical ID toàn cục, chạy 1 thread duy nhất ở main process.
+
+    Thay cho update_mappings_atomic (mỗi camera mỗi frame copy toàn bộ coords_by_cam + giữ lock chung):
+    - Camera chỉ đẩy sự kiện (CrossingReporter), merger xử lý tuần tự nên không cần lock.
+    - Index theo coord id: cid -> {cam: (tid, ts)}; mỗi sự kiện chỉ merge lại đúng cid đó.
+    - Bucket theo thời gian (ts // stale) để dọn quan sát cũ mà không quét toàn bộ index.
+    Luật merge giữ nguyên: ≥ 2 camera thấy cùng cid trong `time_tol` quanh median → dùng canonical
+    nhỏ nhất đã có, chưa có thì cấp mới. Canonical ID được lưu trong IdentityStore (union-find).
+    """
+
+    def __init__(self, event_queue, identity, time_tol=0.5, stale=1.0, on_new_canonical=None):
+        self.event_queue = event_queue
+        self.identity = identity
+        self.time_tol = time_tol
+        self.stale = stale
+        self.on_new_canonical = on_new_canonical  # callback(global_id, ts) khi anchor cấp canonical mới
+        self._index = {}    # cid -> {cam: (tid, ts)}
+        self._buckets = {}  # bucket -> set(cid)
+
+    def start(self):
+        t = threading.Thread(target=self.run, daemon=True)
+        t.start()
+        return t
+
+    def run(self):
+        while True:
+            try:
+                event = self.event_queue.get(timeout=self.stale)
+            except queue.Empty:
+                self._evict(time.time())
+                continue
+            if event is None:
+                break
+            try:
+                self.handle(event)
+            except Exception as e:
+                print(f"[MERGE] Error handling event {event}: {e}")
+            self._evict(time.time())
+
+    def handle(self, event):
+        kind = event[0]
+        if kind == "cross":
+            _, cam, cid, tid, ts = event
+            self._on_cross(cam, cid, int(tid), ts)
+        elif kind == "anchor":
+            _, cam, tid, ts = event
+            self._on_anchor(cam, int(tid), ts)
+
+    def _on_anchor(self, cam, tid, ts):
+        key = f"c{cam}_{tid}"
+        if self.identity.lookup(key) is not None:
+            return
+        global_id = self.identity.assign(key)
+        if self.on_new_canonical is not None:
+            self.on_new_canonical(global_id, ts)
+
+    def _on_cross(self, cam, cid, tid, ts):
+        self._index.setdefault(cid, {})[cam] = (tid, ts)
+        self._buckets.setdefault(int(ts // self.stale), set()).add(cid)
+        self._merge(cid, time.time())
+
+    def _merge(self, cid, now):
+        # Gom tất cả (camera, track_id, timestamp) còn mới đang thấy coord_id này
+        obs = [(cam, tid, ts) for cam, (tid, ts) in self._index.get(cid, {}).items() if now - ts <= self.stale]
+        if len(obs) < 2:
+            return  # Chỉ 1 camera thấy → không merge được
+
+        # Lọc theo thời gian (camera phải thấy gần cùng thời điểm)
+        times = sorted(ts for (_, _, ts) in obs)
+        median_ts = times[len(times) // 2]
+        close = [f"c{cam}_{tid}" for (cam, tid, ts) in obs if abs(ts - median_ts) <= self.time_tol]
+        if len(close) < 2:
+            return
+
+        # Gán chung canonical id cho tất cả track liên quan (IdentityStore chỉ publish key thay đổi)
+        self.identity.merge(close)
+
+    def _evict(self, now):
+        expired = [b for b in self._buckets if (b + 1) * self.stale < now - self.stale]
+        for b in expired:
+            for cid in self._buckets.pop(b):
+                obs = self._index.get(cid)
+                if obs is None:
+                    continue
+                for cam in [cam for cam, (_, ts) in obs.items() if now - ts > self.stale]:
+                    del obs[cam]
+                if not obs:
+                    del self._index[cid]
@@ -0,0 +1,223 @@
+import time
+import threading
+
+
+class IdentityStore:
+    """
+    Canonical ID toàn cục của xe, dạng union-find (chỉ sống ở main process).
+
+    - Key local: "c{cam}_{tid}" (track id của 1 camera). Mỗi key gắn với 1 node canonical.
+    - merge: union 2 cây (union by size + path compression, O(α(n))), label của cây = canonical nhỏ nhất
+      → giữ luật "ưu tiên canonical nhỏ nhất" như update_mappings_atomic cũ, nhưng mọi key đã gắn với
+      canonical lớn hơn cũng được trỏ lại (bản cũ chỉ ghi đè các key đang thấy lúc merge).
+    - members: root -> set(key) để xóa / kiểm tra xe theo global_id không phải quét cả map.
+    - evict: key không còn xuất hiện trong detection quá `ttl` giây (track đã chết) bị xóa.
+    - Mirror (tùy chọn): Manager dict key -> canonical + version (multiprocessing.Value) cho camera process
+      đọc qua IdentityMirror.
+      Mirror được ghi ngay trong lock: 2 thao tác chạy song song không thể ghi mirror ngược thứ tự.
+    - on_relabel(old_id, new_id): gọi khi 1 canonical bị gộp vào canonical khác (để chuyển biển số theo).
+    - on_drop(global_id): gọi khi evict xóa hết key của 1 global_id (để gỡ biển số của global_id đó).
+    """
+
+    def __init__(self, mirror=None, version=None, ttl=120.0, on_relabel=None, on_drop=None):
+        self.mirror = mirror
+        self.version = version
+        self.ttl = ttl
+        self.on_relabel = on_relabel
+        self.on_drop = on_drop
+        self._lock = threading.RLock()
+        self._next = 1
+        self._parent = {}     # canonical -> canonical cha
+        self._size = {}       # root -> số node trong cây
+        self._label = {}      # root -> canonical nhỏ nhất của cây (global_id trả ra ngoài)
+        self._nodes = {}      # root -> set(canonical) trong cây
+        self._members = {}    # root -> set(key)
+        self._key_node = {}   # key -> canonical gốc của key
+        self._last_seen = {}  # key -> ts
+
+    # ---------- union-find ----------
+    def _find(self, node):
+        root = node
+        while self._parent[root] != root:
+            root = self._parent[root]
+        while self._parent[node] != root:
+            self._parent[node], node = root, self._parent[node]
+        return root
+
+    def _new_node(self, canonical=None):
+        if canonical is None:
+            canonical = self._next
+        self._next = max(self._next, canonical + 1)
+        self._parent[canonical] = canonical
+        self._size[canonical] = 1
+        self._label[canonical] = canonical
+        self._nodes[canonical] = {canonical}
+        self._members[canonical] = set()
+        return canonical
+
+    def _union(self, a, b):
+        ra, rb = self._find(a), self._find(b)
+        if ra == rb:
+            return ra, [], None
+        if self._size[ra] < self._size[rb]:
+            ra, rb = rb, ra
+        new_label = min(self._label[ra], self._label[rb])
+        old_label = max(self._label[ra], self._label[rb])
+        # Key có label đổi cần ghi lại mirror
+        changed = list(self._members[rb] if new_label == self._label[ra] else self._members[ra])
+        self._parent[rb] = ra
+        self._size[ra] += self._size.pop(rb)
+        self._label[ra] = new_label
+        self._label.pop(rb)
+        self._nodes[ra] |= self._nodes.pop(rb)
+        self._members[ra] |= self._members.pop(rb)
+        return ra, changed, old_label
+
+    def _drop_tree(self, root):
+        for node in self._nodes.pop(root):
+            self._parent.pop(node, None)
+        self._size.pop(root)
+        self._label.pop(root)
+        return self._members.pop(root)
+
+    def _bind(self, key, node, now):
+        self._key_node[key] = node
+        self._last_seen[key] = now
+        self._members[self._find(node)].add(key)
+
+    def _unbind(self, key):
+        self._key_node.pop(key, None)
+        self._last_seen.pop(key, None)
+
+    # ---------- mirror cho camera process ----------
+    def _publish(self, updates=(), removed=()):
+        """Ghi thay đổi xuống mirror; luôn gọi khi đang giữ self._lock."""
+        if self.mirror is None or (not updates and not removed):
+            return
+        if updates:
+            self.mirror.update(updates)
+        for key in removed:
+            self.mirror.pop(key, None)
+        if self.version is not None:
+            self.version.value += 1
+
+    # ---------- API ----------
+    def lookup(self, key):
+        """Canonical (global_id) của key local, None nếu chưa gán."""
+        with self._lock:
+            node = self._key_node.get(key)
+            return None if node is None else self._label[self._find(node)]
+
+    def members(self, global_id):
+        """Tập key local ("c{cam}_{tid}") đang thuộc global_id."""
+        with self._lock:
+            if global_id not in self._parent:
+                return set()
+            root = self._find(global_id)
+            if self._label[root] != global_id:
+                return set()
+            return set(self._members[root])
+
+    def assign(self, key):
+        """Cấp canonical mới cho key (camera anchor thấy track mới). Key đã có canonical → trả lại cái cũ."""
+        with self._lock:
+            node = self._key_node.get(key)
+            if node is not None:
+                return self._label[self._find(node)]
+            node = self._new_node()
+            self._bind(key, node, time.time())
+            self._publish({key: node})
+        return node
+
+    def merge(self, keys):
+        """Gộp các key local về cùng 1 canonical (canonical nhỏ nhất đang có, chưa có thì cấp mới)."""
+        now = time.time()
+        updates = {}
+        relabeled = []
+        with self._lock:
+            nodes = [self._key_node[k] for k in keys if k in self._key_node]
+            root = self._find(nodes[0]) if nodes else self._find(self._new_node())
+            for node in nodes[1:]:
+                root, changed, old_label = self._union(root, node)
+                if old_label is not None:
+                    relabeled.append(old_label)
+                for key in changed:
+                    updates[key] = None
+            for key in keys:
+                if key not in self._key_node:
+                    self._bind(key, root, now)
+                    updates[key] = None
+            label = self._label[root]
+            self._publish({key: label for key in updates})
+        if self.on_relabel is not None:
+            for old_label in relabeled:
+                self.on_relabel(old_label, label)
+        return label
+
+    def remove(self, global_id):
+        """Xóa toàn bộ key của global_id (xe đã ra khỏi bãi). Trả về danh sách key đã xóa."""
+        with self._lock:
+            if global_id not in self._parent or self._label[self._find(global_id)] != global_id:
+                return []
+            keys = self._drop_tree(self._find(global_id))
+            for key in keys:
+                self._unbind(key)
+            self._publish(removed=keys)
+        return sorted(keys)
+
+    def evict(self, live_keys, now=None):
+        """
+        Cập nhật last_seen cho các key đang được detect, xóa key không thấy quá `ttl` giây.
+        Cây không còn key nào cũng bị dọn (compaction), global_id của cây được báo qua on_drop.
+        """
+        now = time.time() if now is None else now
+        removed, dropped = [], []
+        with self._lock:
+            for key in live_keys:
+                if key in self._last_seen:
+                    self._last_seen[key] = now
+            for key in [k for k, ts in self._last_seen.items() if now - ts > self.ttl]:
+                root = self._find(self._key_node[key])
+                self._members[root].discard(key)
+                self._unbind(key)
+                removed.append(key)
+                if not self._members[root]:
+                    dropped.append(self._label[root])
+                    self._drop_tree(root)
+            self._publish(removed=removed)
+        if self.on_drop is not None:
+            for global_id in dropped:
+                self.on_drop(global_id)
+        return removed
+
+    def snapshot(self):
+        """{key: global_id} - dùng để debug / benchmark."""
+        with self._lock:
+            return {key: self._label[self._find(node)] for key, node in self._key_node.items()}
+
+    def __len__(self):
+        return len(self._key_node)
+
+
+class IdentityMirror:
+    """
+    Phía camera process: bản copy local của mirror (key -> canonical).
+    Chỉ đọc 1 số version (shared memory) mỗi frame, copy lại Manager dict khi version đổi
+    → `get(key)` mỗi bbox là đọc dict local, không round-trip IPC.
+    """
+
+    def __init__(self, mirror, version):
+        self.mirror = mirror
+        self.version = version
+        self._version = None
+        self._cache = {}
+
+    def refresh(self):
+        v = self.version.value
+        if v != self._version:
+            # Đọc version trước rồi mới copy: bản copy luôn mới ít nhất bằng version đã ghi nhận
+            self._cache = dict(self.mirror)
+            self._version = v
+
+    def get(self, key, default=None):
+        return self._cache.get(key, default)
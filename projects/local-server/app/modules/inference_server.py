@@ -0,0 +1,161 @@
+import os
+import time
+import queue
+import numpy as np
+from multiprocessing import shared_memory
+from ultralytics import YOLO
+
+# Cấu hình inference server (đọc từ .env)
+INFERENCE_MAX_BATCH = int(os.getenv("INFERENCE_MAX_BATCH", "4"))
+INFERENCE_MAX_WAIT_MS = float(os.getenv("INFERENCE_MAX_WAIT_MS", "15"))
+RESULT_TIMEOUT = 30.0  # lần đầu server còn đang load model nên để timeout dài
+
+
+def load_detect_model(model_path, tag):
+    """
+    Load YOLO, ưu tiên CUDA, fallback CPU (giữ nguyên cách load của process_video).
+    File đã export (.onnx / *_openvino_model) chạy thẳng trên backend CPU của nó (ONNX Runtime / OpenVINO).
+    """
+    print(f"[{tag}] Loading YOLO model...")
+    if not model_path.endswith(".pt"):
+        model = YOLO(model_path, task="detect", verbose=False)
+        print(f"[{tag}] Model loaded: {model_path}")
+        return model
+    try:
+        model = YOLO(model_path, verbose=False).to("cuda")
+        print(f"[{tag}] Model loaded on CUDA")
+    except Exception as e:
+        print(f"[{tag}] CUDA not available, using CPU: {e}")
+        model = YOLO(model_path, verbose=False)
+    return model
+
+
+def start_inference_server(model_path, request_queue, result_queues, conf=0.5,
+                           max_batch=INFERENCE_MAX_BATCH, max_wait_ms=INFERENCE_MAX_WAIT_MS):
+    """
+    Process inference dùng chung cho tất cả camera.
+
+    - Chỉ load 1 bản model cho cả fleet camera.
+    - Mỗi tick: lấy request đầu tiên (block), gom thêm tới `max_batch` frame hoặc hết `max_wait_ms`,
+      chạy 1 lần `model.predict` cho cả batch rồi trả detection thô (x1, y1, x2, y2, conf, cls)
+      về result queue của từng camera. Tracking (BoT-SORT/ByteTrack) vẫn chạy trong camera process.
+    - Request: (cam_id, frame_seq, shm_name, shape); None = dừng server.
+    """
+    model = load_detect_model(model_path, "Inference Server")
+    frames_shm = {}  # cam_id -> SharedMemory đang attach
+    print(f"[Inference Server] Ready (max_batch={max_batch}, max_wait={max_wait_ms}ms)")
+
+    while True:
+        request = request_queue.get()
+        if request is None:
+            break
+        batch = [request]
+        deadline = time.perf_counter() + max_wait_ms / 1000.0
+        while len(batch) < max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                request = request_queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if request is None:
+                batch.append(None)
+                break
+        stop = batch[-1] is None
+        batch = [r for r in batch if r is not None]
+
+        frames = []
+        for cam_id, frame_seq, shm_name, shape in batch:
+            shm = frames_shm.get(cam_id)
+            if shm is None or shm.name != shm_name:
+                # Camera đổi kích thước frame → tạo shm mới, bỏ shm cũ
+                if shm is not None:
+                    shm.close()
+                shm = shared_memory.SharedMemory(name=shm_name)
+                frames_shm[cam_id] = shm
+            frames.append(np.ndarray(shape, dtype=np.uint8, buffer=shm.buf))
+
+        if frames:
+            results = model.predict(frames, conf=conf, verbose=False)
+            for (cam_id, frame_seq, _, _), result in zip(batch, results):
+                det = result.boxes.data.cpu().numpy()
+                result_queues[cam_id].put((frame_seq, det))
+        frames = None
+
+        if stop:
+            break
+
+    for shm in frames_shm.values():
+        shm.close()
+    print("[Inference Server] Stopped")
+
+
+class InferenceClient:
+    """
+    Phía camera process: gửi frame cho inference server qua shared memory,
+    nhận detection thô và tự chạy tracker (BoT-SORT/ByteTrack) cục bộ.
+
+    `track(frame)` trả về (ids, xyxy) giống `results[0].boxes.id/.xyxy` của `model.track`.
+    """
+
+    def __init__(self, cam_id, request_queue, result_queue, tracker_path, frame_rate=30):
+        from ultralytics.trackers.track import TRACKER_MAP
+        from ultralytics.utils import IterableSimpleNamespace, yaml_load
+        from ultralytics.utils.checks import check_yaml
+
+        self.cam_id = cam_id
+        self.request_queue = request_queue
+        self.result_queue = result_queue
+        cfg = IterableSimpleNamespace(**yaml_load(check_yaml(tracker_path)))
+        self.tracker = TRACKER_MAP[cfg.tracker_type](args=cfg, frame_rate=frame_rate)
+        self._shm = None
+        self._frame = None
+        self._seq = 0
+
+    def _ensure_buffer(self, frame):
+        if self._frame is not None and self._frame.shape == frame.shape:
+            return
+        self._release_buffer()
+        self._shm = shared_memory.SharedMemory(create=True, size=frame.nbytes)
+        self._frame = np.ndarray(frame.shape, dtype=np.uint8, buffer=self._shm.buf)
+
+    def _release_buffer(self):
+        if self._shm is not None:
+            self._frame = None
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    def detect(self, frame):
+        """Gửi 1 frame lên server và chờ detection (N, 6) của đúng frame đó."""
+        from ultralytics.engine.results import Boxes
+
+        self._ensure_buffer(frame)
+        np.copyto(self._frame, frame)
+        self._seq += 1
+        self.request_queue.put((self.cam_id, self._seq, self._shm.name, frame.shape))
+        deadline = time.time() + RESULT_TIMEOUT
+        while True:
+            try:
+                frame_seq, det = self.result_queue.get(timeout=max(deadline - time.time(), 0.001))
+            except queue.Empty:
+                print(f"[Camera {self.cam_id}] Inference server timeout, skip frame")
+                det = np.empty((0, 6), dtype=np.float32)
+                break
+            if frame_seq == self._seq:
+                break
+            # Kết quả của frame cũ (đã timeout) → bỏ qua
+        return Boxes(det, frame.shape[:2])
+
+    def track(self, frame):
+        # Tracker vẫn phải update cả khi không có detection để các track cũ được đánh dấu lost
+        tracks = self.tracker.update(self.detect(frame), frame)
+        if len(tracks) == 0:
+            return [], []
+        ids = tracks[:, 4].astype(int).tolist()
+        xyxy = tracks[:, :4].tolist()
+        return ids, xyxy
+
+    def close(self):
+        self._release_buffer()
@@ -0,0 +1,245 @@
+import os
+import sys
+import time
+from collections import namedtuple
+import numpy as np
+import torch
+from dotenv import load_dotenv
+from app.modules.model_export import quantize_onnx
+from app.modules.plate_grammar import LPR_GRAMMAR, correct_plate
+import app.resources.license_plate_recognition.function.helper as helper
+import app.resources.license_plate_recognition.function.utils_rotate as utils_rotate
+load_dotenv()
+
+YOLOV5_PATH = "app/resources/license_plate_recognition/yolov5"
+LP_DETECTOR_PATH = "app/resources/license_plate_recognition/model/LP_detector_nano_61.pt"
+LP_OCR_PATH = "app/resources/license_plate_recognition/model/LP_ocr_nano_62.pt"
+
+# Định dạng model khi load: pt (PyTorch eager, đã fuse), torchscript, onnx (ONNX Runtime), openvino.
+# Khác pt: lần đầu export từ file .pt bằng export.py của yolov5, các lần sau load thẳng file đã export.
+# LPR_INT8=1 (chỉ với onnx): dùng bản lượng tử hóa int8 <stem>_int8.onnx.
+LPR_MODEL_FORMAT = os.getenv("LPR_MODEL_FORMAT", "pt")
+LPR_INT8 = os.getenv("LPR_INT8", "0") == "1"
+LPR_WARMUP = int(os.getenv("LPR_WARMUP", "2"))  # số lần chạy thử lúc khởi động
+# OCR mọi biển số của frame trong 1 batch: auto = chỉ khi model chạy trên GPU. Trên CPU batch chậm hơn chạy
+# từng ảnh (mọi ảnh bị letterbox + pad theo ảnh lớn nhất), xem benchmarks.bench_lpr dòng "ocr seq"
+LPR_BATCH_OCR = os.getenv("LPR_BATCH_OCR", "auto")
+LPR_IMGSZ = 640
+MODEL_SUFFIX = {"pt": ".pt", "torchscript": ".torchscript", "onnx": ".onnx", "openvino": "_openvino_model"}
+
+STAGES = ("detect", "crop", "deskew", "ocr", "decode")
+# 1 biển số đọc được: chuỗi ("unknown" nếu không đọc được), độ tự tin từng ký tự, box biển số (6,) trong frame,
+# score (trung bình nhân xác suất ký tự), candidates [(chuỗi, confs, score), ...] các cách đọc hợp lệ theo plate_grammar
+PlateRead = namedtuple("PlateRead", ["plate", "confs", "box", "score", "candidates"])
+UNKNOWN_READ = PlateRead("unknown", [], None, 0.0, [])
+# Biến thể deskew (change_cons, center_thres) theo thứ tự thử của detectLicense
+DESKEW_VARIANTS = ((0, 0), (0, 1), (1, 0), (1, 1))
+
+
+def _yolov5_path(yolov5_path=YOLOV5_PATH):
+    # yolov5 vendored import theo tên top-level (models, utils, export) như khi chạy trong thư mục của nó
+    path = os.path.abspath(yolov5_path)
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+
+def export_model(weights, fmt, imgsz=LPR_IMGSZ, yolov5_path=YOLOV5_PATH):
+    """
+    Export file .pt sang `fmt` bằng export.py vendored. ONNX / OpenVINO có batch + H, W động: OCR chạy batch được
+    và AutoShape letterbox ảnh biển số theo đúng shape như pt (pad vuông 640 làm OCR đọc lệch bản pt).
+    OpenVINO được chuyển (openvino.convert_model) từ 1 file ONNX tạm, không ghi đè bản ONNX đã có.
+    """
+    _yolov5_path(yolov5_path)
+    from export import run as export_run
+
+    print(f"[LPR] Exporting {weights} → {fmt}...")
+    stem = os.path.splitext(weights)[0]
+    if fmt == "openvino":
+        onnx_path = stem + ".onnx"
+        backup = onnx_path + ".dynamic"
+        if os.path.exists(onnx_path):
+            os.replace(onnx_path, backup)
+        try:
+            export_run(weights=weights, include=("openvino",), imgsz=(imgsz, imgsz), device='cpu', dynamic=True)
+        finally:
+            if os.path.exists(backup):
+                os.replace(backup, onnx_path)
+            elif os.path.exists(onnx_path):
+                os.remove(onnx_path)
+    else:
+        export_run(weights=weights, include=(fmt,), imgsz=(imgsz, imgsz), device='cpu', dynamic=(fmt == "onnx"))
+    return stem + MODEL_SUFFIX[fmt]
+
+
+def artifact_path(weights, fmt=LPR_MODEL_FORMAT, int8=LPR_INT8, yolov5_path=YOLOV5_PATH):
+    """File model cho backend `fmt`, export / lượng tử hóa lần đầu nếu chưa có."""
+    stem = os.path.splitext(weights)[0]
+    path = stem + MODEL_SUFFIX[fmt]
+    if not os.path.exists(path):
+        path = export_model(weights, fmt, yolov5_path=yolov5_path)
+    if int8 and fmt == "onnx":
+        int8_path = stem + "_int8.onnx"
+        path = int8_path if os.path.exists(int8_path) else quantize_onnx(path, int8_path)
+    elif int8:
+        print(f"[LPR] LPR_INT8 chỉ hỗ trợ onnx, {fmt} chạy FP32")
+    return path
+
+
+def supports_batch(model, mode=LPR_BATCH_OCR):
+    """
+    AutoShape có chạy batch > 1 không: pt luôn được, ONNX / OpenVINO khi export động, còn lại batch 1.
+    mode: "1" batch khi được, "0" không bao giờ, "auto" chỉ khi model ở trên GPU.
+    """
+    backend = model.model
+    if mode == "0" or (mode == "auto" and backend.device.type == 'cpu'):
+        return False
+    if getattr(backend, 'pt', True):
+        return True
+    if getattr(backend, 'onnx', False):
+        return not isinstance(backend.session.get_inputs()[0].shape[0], int)
+    if getattr(backend, 'xml', False):
+        return backend.network.input(0).get_partial_shape()[0].is_dynamic
+    return False
+
+
+def load_yolov5(weights, fmt=LPR_MODEL_FORMAT, int8=LPR_INT8, yolov5_path=YOLOV5_PATH):
+    """
+    Load model yolov5 vendored không qua torch.hub: DetectMultiBackend (pt được fuse Conv+BN khi load)
+    bọc AutoShape (letterbox + NMS, nhận ảnh NumPy / list ảnh) - giống hubconf.custom nhưng không
+    import lại hubconf và không dựng lại model mỗi lần khởi động.
+    """
+    _yolov5_path(yolov5_path)
+    from models.common import AutoShape, DetectMultiBackend
+    from utils.torch_utils import select_device
+
+    path = artifact_path(weights, fmt, int8, yolov5_path)
+    device = select_device('0' if torch.cuda.is_available() else 'cpu')
+    return AutoShape(DetectMultiBackend(path, device=device)).to(device)
+
+
+class LprEngine:
+    """
+    Nhận diện biển số trên tensor / NumPy từ đầu tới cuối (không đổi kết quả sang pandas DataFrame).
+
+    - detect: LP_detector → results.xyxy[0] (N, 6) x1, y1, x2, y2, conf, cls
+    - crop  : cắt biển số từ frame (view NumPy, bbox được kẹp trong khung hình)
+    - deskew: utils_rotate.deskew
+    - ocr   : LP_ocr → box ký tự (M, 6); mọi biển số (và biến thể deskew) của frame chạy chung 1 batch (batch_ocr, xem LPR_BATCH_OCR)
+    - decode: helper.decode_plate (sắp ký tự, tách biển 2 dòng, giữ độ tự tin từng ký tự) rồi
+              plate_grammar.correct_plate (sửa ký tự nhầm chữ / số theo cấu trúc biển số VN)
+    - timings: thời gian (ms) từng stage của lần read() gần nhất, cộng dồn qua các biển trong frame.
+    """
+
+    def __init__(self, detector, ocr, detect_size=640, grammar=LPR_GRAMMAR):
+        self.detector = detector
+        self.ocr = ocr
+        self.names = ocr.names
+        self.detect_size = detect_size
+        self.grammar = grammar
+        self.timings = dict.fromkeys(STAGES, 0.0)
+        self.batch_ocr = supports_batch(ocr)
+
+    @classmethod
+    def load(cls, yolov5_path=YOLOV5_PATH, detector_path=LP_DETECTOR_PATH, ocr_path=LP_OCR_PATH, ocr_conf=0.4,
+             fmt=LPR_MODEL_FORMAT, int8=LPR_INT8, warmup=LPR_WARMUP):
+        """Load 2 model + warm-up, in thời gian khởi động từng bước."""
+        if int8 and fmt == "onnx":
+            # Lượng tử hóa int8 (dynamic, cả static có calibration) làm OCR đọc lệch bản pt ở ~1/3 số ảnh (bench_backends)
+            print("[LPR] Cảnh báo: LPR_INT8 đọc lệch nhiều so với FP32, chỉ dùng khi bench_backends --int8 đạt trên ảnh của cổng")
+        t0 = time.perf_counter()
+        detector = load_yolov5(detector_path, fmt, int8, yolov5_path)
+        t1 = time.perf_counter()
+        ocr = load_yolov5(ocr_path, fmt, int8, yolov5_path)
+        # Ngưỡng độ tự tin khi nhận diện ký tự
+        ocr.conf = ocr_conf
+        t2 = time.perf_counter()
+        engine = cls(detector, ocr)
+        engine.warmup(warmup)
+        t3 = time.perf_counter()
+        print(f"[LPR] Models ready ({fmt}{' int8' if int8 and fmt == 'onnx' else ''}): detector {t1 - t0:.2f}s, OCR {t2 - t1:.2f}s, "
+              f"warm-up {warmup}x {t3 - t2:.2f}s, total {t3 - t0:.2f}s")
+        return engine
+
+    def warmup(self, n=LPR_WARMUP):
+        """Chạy thử cả pipeline trên ảnh rỗng để lần đọc đầu tiên (xe đang chờ ở barrier) không chịu chi phí khởi tạo."""
+        frame = np.zeros((480, 640, 3), dtype=np.uint8)
+        crops = [np.zeros((60, 200, 3), dtype=np.uint8), np.zeros((120, 160, 3), dtype=np.uint8)]
+        for _ in range(n):
+            self.detect_plates(frame)
+            self.read_chars(crops)
+        self.timings = dict.fromkeys(STAGES, 0.0)
+
+    def _tick(self, stage, start):
+        now = time.perf_counter()
+        self.timings[stage] += (now - start) * 1000
+        return now
+
+    def detect_plates(self, frame):
+        """Box biển số (N, 6) trong frame."""
+        return self.detector(frame, size=self.detect_size).xyxy[0].cpu().numpy()
+
+    @staticmethod
+    def crop(frame, box):
+        # Cắt như detect_license cũ (x, y, w, h làm tròn riêng): lệch 1 px là OCR đã có thể đọc khác
+        h, w = frame.shape[:2]
+        x1, y1 = int(box[0]), int(box[1])
+        x2, y2 = min(x1 + int(box[2] - box[0]), w), min(y1 + int(box[3] - box[1]), h)
+        return frame[max(y1, 0):y2, max(x1, 0):x2]
+
+    def read_chars(self, plate_imgs):
+        """Box ký tự (M, 6) của từng ảnh biển số: cả list letterbox thành 1 batch nếu batch_ocr, không thì từng ảnh một."""
+        if len(plate_imgs) == 0:
+            return []
+        if not self.batch_ocr:
+            # Backend batch cố định 1 (TorchScript trace, ONNX / OpenVINO tĩnh) hoặc LPR_BATCH_OCR tắt batch → từng ảnh một
+            return [self.ocr(im).xyxy[0].cpu().numpy() for im in plate_imgs]
+        return [det.cpu().numpy() for det in self.ocr(list(plate_imgs)).xyxy]
+
+    def read_crops(self, crops, variants=((0, 0),)):
+        """
+        Đọc nhiều ảnh biển số đã cắt trong 1 lần OCR. Mỗi crop được deskew theo từng biến thể
+        (change_cons, center_thres) trong `variants`; kết quả của crop là PlateRead (box = None) của
+        biến thể tốt nhất: hợp lệ theo cấu trúc biển số trước, rồi score cao nhất. Candidates gộp từ mọi biến thể.
+        """
+        t = time.perf_counter()
+        plate_imgs = [utils_rotate.deskew(crop_img, cc, ct) for crop_img in crops for cc, ct in variants]
+        t = self._tick("deskew", t)
+        chars = self.read_chars(plate_imgs)
+        t = self._tick("ocr", t)
+        plates = [correct_plate(*helper.decode_plate(det, self.names), enabled=self.grammar) for det in chars]
+        out = []
+        for i in range(len(crops)):
+            reads = [p for p in plates[i * len(variants):(i + 1) * len(variants)] if p[0] != "unknown"]
+            if not reads:
+                out.append(UNKNOWN_READ)
+                continue
+            plate, confs, score, _, _ = max(reads, key=lambda p: (p[3], p[2]))
+            candidates = {}
+            for c in (c for p in reads for c in p[4]):
+                if c[0] not in candidates or candidates[c[0]][2] < c[2]:
+                    candidates[c[0]] = c
+            out.append(PlateRead(plate, confs, None, score, sorted(candidates.values(), key=lambda c: -c[2])))
+        self._tick("decode", t)
+        return out
+
+    def read_crop(self, crop_img, change_cons=0, center_thres=0):
+        """Đọc 1 ảnh biển số đã cắt, trả về chuỗi biển số hoặc "unknown"."""
+        return self.read_crops([crop_img], ((change_cons, center_thres),))[0].plate
+
+    def read(self, frame, variants=((0, 0),)):
+        """
+        Đọc mọi biển số trong frame (OCR tất cả biển + biến thể deskew trong 1 batch).
+        Trả về [PlateRead, ...], biển không đọc được có plate = "unknown".
+        """
+        self.timings = dict.fromkeys(STAGES, 0.0)
+        t = time.perf_counter()
+        plates = self.detect_plates(frame)
+        t = self._tick("detect", t)
+        crops, boxes = [], []
+        for box in plates:
+            crop_img = self.crop(frame, box)
+            if crop_img.size:
+                crops.append(crop_img)
+                boxes.append(box)
+        self._tick("crop", t)
+        return [read._replace(box=box) for read, box in zip(self.read_crops(crops, variants), boxes)]
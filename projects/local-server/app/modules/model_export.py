@@ -0,0 +1,50 @@
+import os
+from dotenv import load_dotenv
+load_dotenv()
+
+# Backend CPU cho model tracking (ultralytics): pt | onnx | openvino, TRACK_MODEL_INT8=1 → lượng tử hóa int8
+TRACK_MODEL_FORMAT = os.getenv("TRACK_MODEL_FORMAT", "pt")
+TRACK_MODEL_INT8 = os.getenv("TRACK_MODEL_INT8", "0") == "1"
+TRACK_IMGSZ = 640
+
+
+def quantize_onnx(src, dst):
+    """
+    Lượng tử hóa int8 file ONNX bằng ONNX Runtime (dynamic quantization: trọng số int8, activation
+    lượng tử hóa lúc chạy → không cần bộ ảnh calibration). Giữ nguyên input động (batch) của file gốc.
+    """
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    print(f"[EXPORT] Quantizing {src} → {dst} (int8)...")
+    quantize_dynamic(src, dst, weight_type=QuantType.QUInt8)
+    return dst
+
+
+def export_detect_model(model_path, fmt=TRACK_MODEL_FORMAT, int8=TRACK_MODEL_INT8, imgsz=TRACK_IMGSZ):
+    """
+    Đường dẫn model tracking theo backend, export 1 lần (lần sau dùng lại file đã export):
+        pt       : model_path như cũ
+        onnx     : <stem>.onnx (int8: <stem>_int8.onnx, lượng tử hóa bằng ONNX Runtime)
+        openvino : <stem>_openvino_model/ (int8: <stem>_int8_openvino_model/, ultralytics + NNCF)
+    """
+    if fmt == "pt":
+        return model_path
+    from ultralytics import YOLO
+
+    stem = os.path.splitext(model_path)[0]
+    if fmt == "onnx":
+        path = stem + ".onnx"
+        if not os.path.exists(path):
+            print(f"[EXPORT] Exporting {model_path} → onnx...")
+            path = YOLO(model_path).export(format="onnx", imgsz=imgsz)
+        if not int8:
+            return path
+        int8_path = stem + "_int8.onnx"
+        return int8_path if os.path.exists(int8_path) else quantize_onnx(path, int8_path)
+    if fmt == "openvino":
+        path = stem + ("_int8_openvino_model" if int8 else "_openvino_model")
+        if not os.path.exists(path):
+            print(f"[EXPORT] Exporting {model_path} → openvino{' int8' if int8 else ''}...")
+            path = YOLO(model_path).export(format="openvino", imgsz=imgsz, int8=int8)
+        return path
+    raise ValueError(f"TRACK_MODEL_FORMAT không hỗ trợ: {fmt}")
@@ -0,0 +1,139 @@
+import os
+import ast
+import time
+import numpy as np
+from dotenv import load_dotenv
+load_dotenv()
+
+# Cấu hình mặc định (đọc từ .env), từng camera có thể ghi đè qua MOTION_GATE_CAMERAS.
+# Mặc định tắt (detect mọi frame): frame bị bỏ qua dùng lại bbox cũ → chỉ bật cho camera đã kiểm tra trên video thật
+MOTION_GATE = os.getenv("MOTION_GATE", "0") == "1"
+MOTION_WIDTH = int(os.getenv("MOTION_WIDTH", "160"))                     # chiều rộng ảnh nhỏ dùng để so sánh
+MOTION_PIXEL_THRESHOLD = int(os.getenv("MOTION_PIXEL_THRESHOLD", "25"))  # chênh lệch xám để tính 1 pixel là đổi
+MOTION_MIN_RATIO = float(os.getenv("MOTION_MIN_RATIO", "0.002"))         # tỉ lệ pixel đổi tối thiểu = có chuyển động
+MOTION_BG_ALPHA = float(os.getenv("MOTION_BG_ALPHA", "0.05"))            # tốc độ cập nhật nền (ánh sáng thay đổi chậm)
+DETECT_MAX_STRIDE = int(os.getenv("DETECT_MAX_STRIDE", "1"))             # lúc yên tĩnh: detect ít nhất 1 lần / k frame (1 = mọi frame)
+DETECT_IDLE_FRAMES = int(os.getenv("DETECT_IDLE_FRAMES", "30"))          # số frame yên tĩnh trước khi tăng stride
+MOTION_GATE_CAMERAS = ast.literal_eval(os.getenv("MOTION_GATE_CAMERAS", "{}") or "{}")
+
+
+def motion_config(cam_id):
+    """Cấu hình motion gate của 1 camera: mặc định từ .env, ghi đè bởi MOTION_GATE_CAMERAS[cam_id]."""
+    config = {
+        'enabled': MOTION_GATE,
+        'width': MOTION_WIDTH,
+        'pixel_threshold': MOTION_PIXEL_THRESHOLD,
+        'min_ratio': MOTION_MIN_RATIO,
+        'bg_alpha': MOTION_BG_ALPHA,
+        'max_stride': DETECT_MAX_STRIDE,
+        'idle_frames': DETECT_IDLE_FRAMES,
+    }
+    config.update(MOTION_GATE_CAMERAS.get(cam_id, {}))
+    return config
+
+
+class MotionGate:
+    """
+    Kiểm tra chuyển động rẻ tiền trước khi chạy YOLO.
+
+    - Frame được lấy mẫu thưa (bước pixel sao cho rộng ~`width`) rồi đổi sang xám, chỉ vài chục nghìn pixel.
+    - So với ảnh nền (running average, hệ số `bg_alpha`): nền tự thích nghi với ánh sáng thay đổi chậm,
+      xe đi vào / ra khỏi khung hình tạo vùng chênh lệch lớn.
+    - update(frame) trả về tỉ lệ pixel chênh lệch quá `pixel_threshold`; > `min_ratio` là có chuyển động.
+    """
+
+    def __init__(self, width=MOTION_WIDTH, pixel_threshold=MOTION_PIXEL_THRESHOLD,
+                 min_ratio=MOTION_MIN_RATIO, bg_alpha=MOTION_BG_ALPHA):
+        self.width = width
+        self.pixel_threshold = pixel_threshold
+        self.min_ratio = min_ratio
+        self.bg_alpha = bg_alpha
+        self._background = None
+        self.ratio = 0.0
+
+    def _gray(self, frame):
+        step = max(1, frame.shape[1] // self.width)
+        small = frame[::step, ::step]
+        if small.ndim == 2:
+            return small.astype(np.float32)
+        # BGR → xám (hệ số BT.601)
+        return small[..., 0] * np.float32(0.114) + small[..., 1] * np.float32(0.587) + small[..., 2] * np.float32(0.299)
+
+    def update(self, frame):
+        gray = self._gray(frame)
+        if self._background is None or self._background.shape != gray.shape:
+            self._background = gray
+            self.ratio = 1.0  # frame đầu / đổi độ phân giải: coi như có chuyển động
+            return self.ratio
+        diff = np.abs(gray - self._background)
+        self.ratio = float(np.count_nonzero(diff > self.pixel_threshold)) / diff.size
+        self._background += np.float32(self.bg_alpha) * (gray - self._background)
+        return self.ratio
+
+    def moving(self, frame):
+        return self.update(frame) > self.min_ratio
+
+
+class AdaptiveStride:
+    """
+    Quyết định frame nào chạy detection theo mức hoạt động gần đây.
+
+    - Có chuyển động hoặc danh sách track vừa đổi (xe mới / xe mất) → stride = 1, detect mọi frame.
+    - Yên tĩnh liên tục `idle_frames` frame → stride tăng gấp đôi (tối đa `max_stride`), mỗi
+      `idle_frames` frame tiếp theo lại tăng tiếp; frame bị bỏ qua dùng lại bbox lần detect trước
+      (xe đỗ đứng yên, không có chuyển động thì bbox không đổi).
+    - Stats: số frame detect / bỏ qua, in định kỳ mỗi `stats_interval` giây.
+    """
+
+    def __init__(self, max_stride=DETECT_MAX_STRIDE, idle_frames=DETECT_IDLE_FRAMES, name="Camera", stats_interval=60):
+        self.max_stride = max(1, max_stride)
+        self.idle_frames = max(1, idle_frames)
+        self.name = name
+        self.stats_interval = stats_interval
+        self.stride = 1
+        self._idle = 0
+        self._since_detect = 0
+        self.detected = 0
+        self.skipped = 0
+        self._last_log = time.time()
+
+    def should_detect(self, moving):
+        """Gọi mỗi frame. moving: kết quả MotionGate. Trả về True nếu frame này cần chạy detection."""
+        if moving:
+            self.stride = 1
+            self._idle = 0
+        else:
+            self._idle += 1
+            if self._idle >= self.idle_frames:
+                self._idle = 0
+                self.stride = min(self.stride * 2, self.max_stride)
+        self._since_detect += 1
+        detect = self._since_detect >= self.stride
+        if detect:
+            self._since_detect = 0
+            self.detected += 1
+        else:
+            self.skipped += 1
+        if self.stats_interval > 0 and time.time() - self._last_log >= self.stats_interval:
+            self.log_stats()
+        return detect
+
+    def tracks_changed(self):
+        """Detection vừa chạy thấy track mới / track mất → quay về detect mọi frame."""
+        self.stride = 1
+        self._idle = 0
+
+    def stats(self):
+        total = self.detected + self.skipped
+        return {
+            "detected": self.detected,
+            "skipped": self.skipped,
+            "skip_ratio": round(self.skipped / total, 3) if total else 0.0,
+            "stride": self.stride,
+        }
+
+    def log_stats(self):
+        self._last_log = time.time()
+        s = self.stats()
+        print(f"[MOTION] {self.name}: detected {s['detected']}, skipped {s['skipped']} "
+              f"({s['skip_ratio'] * 100:.1f}%), stride hiện tại {s['stride']}")
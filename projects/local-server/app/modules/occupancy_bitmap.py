@@ -0,0 +1,133 @@
+import time
+import zlib
+import numpy as np
+from multiprocessing import shared_memory
+
+# Số slot tối thiểu mỗi bitmap chứa được (camera có nhiều slot hơn thì bitmap được tạo lớn hơn,
+# còn chỗ cho slot thêm vào lúc hot-reload)
+MAX_SLOTS = 2048
+
+# Layout trong shared memory
+#   lock     : bộ đếm seqlock (lẻ = writer đang ghi, chẵn = ổn định)
+#   seqno    : số lần publish
+#   ts       : thời điểm frame cuối cùng được tính
+#   count    : số slot đã ghi (< số slot của camera khi vượt capacity)
+#   layout   : crc32 danh sách slot id lúc tính (reader so với slot id của mình, lệch = đang hot-reload)
+#   capacity : số slot tối đa của bitmap này (process attach đọc để dựng đúng layout)
+#   bits     : bitmap slot có xe (np.packbits)
+#   owner    : track id đang chiếm slot (-1 = trống)
+HEADER_FIELDS = [
+    ('lock', np.uint64),
+    ('seqno', np.uint64),
+    ('ts', np.float64),
+    ('count', np.uint32),
+    ('layout', np.uint32),
+    ('capacity', np.uint32),
+]
+HEADER_DTYPE = np.dtype(HEADER_FIELDS)
+
+
+def bitmap_dtype(capacity):
+    return np.dtype(HEADER_FIELDS + [
+        ('bits', np.uint8, (capacity // 8,)),
+        ('owner', np.int32, (capacity,)),
+    ])
+
+
+def layout_id(slot_ids):
+    """Mã của danh sách slot id (theo thứ tự) để 2 process kiểm tra đang dùng cùng file tọa độ."""
+    return zlib.crc32("\n".join(map(str, slot_ids)).encode("utf-8"))
+
+
+class OccupancyBitmap:
+    """
+    Trạng thái slot (sau hysteresis) của 1 camera trên `multiprocessing.shared_memory`.
+
+    - Writer: process camera, ghi mỗi frame (vài trăm byte, không qua Manager / Queue).
+    - Reader: check_occupied_slots ở main process, OR bitmap của các camera theo slot id.
+    - Seqlock giống DetectionRing; chỉ giữ bản mới nhất (không cần lịch sử).
+    - Kích thước theo số slot của camera lúc tạo (tối thiểu MAX_SLOTS). Hot-reload vượt capacity: chỉ
+      ghi `capacity` slot đầu + log [ERROR] (1 lần mỗi layout), cần khởi động lại để tạo bitmap lớn hơn.
+    """
+
+    def __init__(self, shm, owner=False):
+        self._shm = shm
+        self._owner = owner
+        capacity = int(np.ndarray((1,), dtype=HEADER_DTYPE, buffer=shm.buf)['capacity'][0])
+        self._data = np.ndarray((1,), dtype=bitmap_dtype(capacity), buffer=shm.buf)
+        self._seqno = int(self._data['seqno'][0])
+        self._warned_layout = None
+
+    @classmethod
+    def create(cls, num_slots=0):
+        """num_slots: số slot hiện tại của camera → capacity = max(MAX_SLOTS, num_slots) làm tròn lên bội 8."""
+        capacity = -(-max(MAX_SLOTS, num_slots) // 8) * 8
+        dtype = bitmap_dtype(capacity)
+        shm = shared_memory.SharedMemory(create=True, size=dtype.itemsize)
+        shm.buf[:dtype.itemsize] = bytes(dtype.itemsize)
+        np.ndarray((1,), dtype=HEADER_DTYPE, buffer=shm.buf)['capacity'] = capacity
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name):
+        return cls(shared_memory.SharedMemory(name=name))
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    @property
+    def capacity(self):
+        return int(self._data['capacity'][0])
+
+    # ------------------------------------------------------------------ writer
+    def write(self, occupied, owner, layout, ts=None):
+        """occupied: (N,) bool, owner: (N,) track id (-1 = trống), layout: layout_id(slot ids)."""
+        ts = time.time() if ts is None else ts
+        n = min(len(occupied), self.capacity)
+        if n < len(occupied) and layout != self._warned_layout:
+            self._warned_layout = layout
+            print(f"[ERROR] OccupancyBitmap: {len(occupied)} slots > capacity {self.capacity}, only the first "
+                  f"{n} slots are published - restart to resize the bitmap")
+        self._seqno += 1
+        rec = self._data[0]
+        lock = int(rec['lock'])
+        rec['lock'] = lock + 1
+        rec['seqno'] = self._seqno
+        rec['ts'] = ts
+        rec['count'] = n
+        rec['layout'] = layout
+        packed = np.packbits(np.asarray(occupied[:n], dtype=bool))
+        rec['bits'][:len(packed)] = packed
+        rec['owner'][:n] = np.asarray(owner[:n], dtype=np.int32)
+        rec['lock'] = lock + 2
+
+    # ------------------------------------------------------------------ reader
+    def read(self, retries=10):
+        """
+        Trả về (seqno, ts, layout, occupied (N,) bool, owner (N,) int32) - bản copy.
+        Chưa có dữ liệu → seqno = 0. N < số slot của camera khi camera vượt capacity.
+        """
+        rec = self._data[0]
+        for _ in range(retries):
+            lock = int(rec['lock'])
+            if lock & 1:
+                continue
+            seqno = int(rec['seqno'])
+            ts = float(rec['ts'])
+            n = int(rec['count'])
+            layout = int(rec['layout'])
+            bits = rec['bits'][:(n + 7) // 8].copy()
+            owner = rec['owner'][:n].copy()
+            if int(rec['lock']) == lock:
+                return seqno, ts, layout, np.unpackbits(bits, count=n).astype(bool), owner
+        return 0, 0.0, 0, np.zeros(0, dtype=bool), np.empty(0, dtype=np.int32)
+
+    def close(self):
+        self._data = None
+        self._shm.close()
+        if self._owner:
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,221 @@
+import os
+import json
+import sqlite3
+import threading
+
+DB_PATH = "app/resources/database/parked_vehicles.db"
+LEGACY_JSON_PATH = "app/resources/database/parked_vehicles.json"
+
+# Thứ tự field giống object vehicle cũ trong parked_vehicles.json
+VEHICLE_FIELDS = ('user_id', 'customer_type', 'time_in', 'license_plate', 'slot_name', 'num_slot')
+
+
+class ParkedVehicleStore:
+    """
+    Danh sách xe đang đỗ lưu trong SQLite (WAL) thay cho parked_vehicles.json.
+
+    - Nhiều thread / process cùng đọc-ghi an toàn: mỗi thread 1 connection, mỗi thao tác ghi là 1 transaction.
+    - Index theo license_plate (unique) và user_id → tra cứu không phải đọc cả danh sách.
+    - Cập nhật slot_name / num_slot theo từng dòng, không ghi lại toàn bộ file.
+    - `get_all()` trả về đúng dạng dict cũ: {'parking_id': ..., 'list': [vehicle, ...]}.
+    - Lần đầu tạo DB: tự import parked_vehicles.json cũ (nếu có).
+    - Mỗi thao tác ghi thêm 1 op (add / remove / patch / reset) vào bảng `changes` trong cùng transaction,
+      seq AUTOINCREMENT tăng đơn điệu → ParkedVehicleSync gửi delta lên cloud theo seq.
+    """
+
+    def __init__(self, db_path=DB_PATH, legacy_json_path=LEGACY_JSON_PATH):
+        self.db_path = db_path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        is_new = not os.path.exists(db_path)
+        conn = self._conn()
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS parked_vehicles (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id TEXT,
+                    customer_type TEXT,
+                    time_in TEXT,
+                    license_plate TEXT NOT NULL UNIQUE,
+                    slot_name TEXT DEFAULT '',
+                    num_slot INTEGER DEFAULT 0
+                )""")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_parked_user_id ON parked_vehicles(user_id)")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            conn.execute("CREATE TABLE IF NOT EXISTS changes (seq INTEGER PRIMARY KEY AUTOINCREMENT, op TEXT NOT NULL)")
+        if is_new and legacy_json_path and os.path.exists(legacy_json_path):
+            self.migrate_from_json(legacy_json_path)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _to_dict(row):
+        return {field: row[field] for field in VEHICLE_FIELDS}
+
+    @staticmethod
+    def _to_row(vehicle):
+        return (vehicle.get('user_id', ''), vehicle.get('customer_type', 'customer'), vehicle.get('time_in', ''),
+                vehicle['license_plate'], vehicle.get('slot_name', '') or '', int(vehicle.get('num_slot', 0) or 0))
+
+    # ---------- migration ----------
+    def migrate_from_json(self, json_path):
+        try:
+            with open(json_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[DB] Không đọc được {json_path}: {e}")
+            return 0
+        self.replace_all(data)
+        count = len(data.get('list') or [])
+        print(f"[DB] Đã import {count} xe từ {json_path}")
+        return count
+
+    # ---------- đọc ----------
+    def get_all(self):
+        conn = self._conn()
+        rows = conn.execute("SELECT * FROM parked_vehicles ORDER BY id").fetchall()
+        meta = conn.execute("SELECT value FROM meta WHERE key = 'parking_id'").fetchone()
+        return {
+            'parking_id': meta['value'] if meta is not None else os.getenv("PARKING_ID"),
+            'list': [self._to_dict(row) for row in rows]
+        }
+
+    def get_by_license_plate(self, license_plate):
+        row = self._conn().execute("SELECT * FROM parked_vehicles WHERE license_plate = ?",
+                                   (license_plate,)).fetchone()
+        return None if row is None else self._to_dict(row)
+
+    def exists_license_plate(self, license_plate):
+        return self._conn().execute("SELECT 1 FROM parked_vehicles WHERE license_plate = ?",
+                                    (license_plate,)).fetchone() is not None
+
+    def exists_user_id(self, user_id):
+        return self._conn().execute("SELECT 1 FROM parked_vehicles WHERE user_id = ?",
+                                    (user_id,)).fetchone() is not None
+
+    # ---------- ghi ----------
+    def add(self, vehicle):
+        """Thêm xe (biển số đã có → cập nhật thông tin, giữ nguyên thứ tự)."""
+        with self._conn() as conn:
+            conn.execute("""
+                INSERT INTO parked_vehicles (user_id, customer_type, time_in, license_plate, slot_name, num_slot)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(license_plate) DO UPDATE SET
+                    user_id = excluded.user_id, customer_type = excluded.customer_type,
+                    time_in = excluded.time_in, slot_name = excluded.slot_name, num_slot = excluded.num_slot
+            """, self._to_row(vehicle))
+            row = conn.execute("SELECT * FROM parked_vehicles WHERE license_plate = ?",
+                               (vehicle['license_plate'],)).fetchone()
+            self._log(conn, {'op': 'add', 'vehicle': self._to_dict(row)})
+
+    def remove(self, license_plate):
+        """Xóa xe theo biển số. Trả về vehicle đã xóa (None nếu không có)."""
+        with self._conn() as conn:
+            row = conn.execute("SELECT * FROM parked_vehicles WHERE license_plate = ?", (license_plate,)).fetchone()
+            if row is None:
+                return None
+            conn.execute("DELETE FROM parked_vehicles WHERE id = ?", (row['id'],))
+            self._log(conn, {'op': 'remove', 'license_plate': license_plate})
+        return self._to_dict(row)
+
+    def update_slot(self, license_plate, slot_name=None, num_slot=None):
+        """Cập nhật slot_name / num_slot của 1 xe. Trả về True nếu dòng có thay đổi."""
+        return self.update_slots({license_plate: (slot_name, num_slot)}) > 0
+
+    def update_slots(self, updates):
+        """
+        updates: {license_plate: (slot_name, num_slot)} - None = giữ nguyên field đó.
+        Ghi trong 1 transaction, chỉ dòng có giá trị khác mới bị update. Trả về số dòng thay đổi.
+        """
+        changed = 0
+        with self._conn() as conn:
+            for license_plate, (slot_name, num_slot) in updates.items():
+                cur = conn.execute("""
+                    UPDATE parked_vehicles
+                    SET slot_name = COALESCE(?, slot_name), num_slot = COALESCE(?, num_slot)
+                    WHERE license_plate = ?
+                      AND (slot_name IS NOT COALESCE(?, slot_name) OR num_slot IS NOT COALESCE(?, num_slot))
+                """, (slot_name, num_slot, license_plate, slot_name, num_slot))
+                if cur.rowcount:
+                    row = conn.execute("SELECT slot_name, num_slot FROM parked_vehicles WHERE license_plate = ?",
+                                       (license_plate,)).fetchone()
+                    self._log(conn, {'op': 'patch', 'license_plate': license_plate,
+                                     'fields': {'slot_name': row['slot_name'], 'num_slot': row['num_slot']}})
+                changed += cur.rowcount
+        return changed
+
+    def replace_all(self, parked_vehicles):
+        """Ghi đè toàn bộ danh sách (tương thích save_parked_vehicles_to_file cũ)."""
+        with self._conn() as conn:
+            conn.execute("DELETE FROM parked_vehicles")
+            conn.executemany("""
+                INSERT OR REPLACE INTO parked_vehicles (user_id, customer_type, time_in, license_plate, slot_name, num_slot)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, [self._to_row(v) for v in parked_vehicles.get('list') or []])
+            if parked_vehicles.get('parking_id') is not None:
+                conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('parking_id', ?)",
+                             (parked_vehicles['parking_id'],))
+            self._log(conn, {'op': 'reset'})
+
+    # ---------- change log (delta sync) ----------
+    @staticmethod
+    def _log(conn, op):
+        conn.execute("INSERT INTO changes (op) VALUES (?)", (json.dumps(op, ensure_ascii=False),))
+
+    def last_seq(self):
+        """Seq lớn nhất đã cấp (kể cả op đã bị prune)."""
+        row = self._conn().execute("SELECT seq FROM sqlite_sequence WHERE name = 'changes'").fetchone()
+        return row['seq'] if row is not None else 0
+
+    def changes_since(self, seq, limit=500):
+        """[(seq, op)] có seq > `seq`, theo thứ tự tăng dần."""
+        rows = self._conn().execute("SELECT seq, op FROM changes WHERE seq > ? ORDER BY seq LIMIT ?",
+                                    (seq, limit)).fetchall()
+        return [(row['seq'], json.loads(row['op'])) for row in rows]
+
+    def pending_changes(self, seq):
+        return self._conn().execute("SELECT COUNT(*) FROM changes WHERE seq > ?", (seq,)).fetchone()[0]
+
+    def snapshot(self):
+        """(get_all(), last_seq) đọc trong cùng 1 transaction → danh sách khớp đúng với seq."""
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN")
+            data = self.get_all()
+            seq = self.last_seq()
+        return data, seq
+
+    def prune_changes(self, upto_seq):
+        """Xóa op đã được cloud xác nhận."""
+        with self._conn() as conn:
+            conn.execute("DELETE FROM changes WHERE seq <= ?", (upto_seq,))
+
+    def get_meta(self, key, default=None):
+        row = self._conn().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return default if row is None else row['value']
+
+    def set_meta(self, key, value):
+        with self._conn() as conn:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_parked_vehicle_store():
+    """Store dùng chung trong 1 process (mỗi process tự mở DB của mình)."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ParkedVehicleStore()
+    return _store
@@ -0,0 +1,151 @@
+import os
+import time
+import threading
+from dotenv import load_dotenv
+from app.modules.cloud_api import apply_parked_vehicle_delta, replace_parked_vehicle_list
+from app.modules.cloud_outbox import CLOUD_FLUSH_INTERVAL, CLOUD_RETRY_BACKOFF_MAX
+from app.modules.parked_vehicle_store import get_parked_vehicle_store
+load_dotenv()
+
+PARKED_SYNC_BATCH = 200        # số op tối đa / request
+PARKED_SYNC_MAX_PENDING = 1000  # backlog lớn hơn → full resync rẻ hơn gửi từng op
+
+
+class ParkedVehicleSync:
+    """
+    Đồng bộ danh sách xe đậu lên cloud bằng delta thay vì PUT cả danh sách.
+
+    - Nguồn op là bảng `changes` của ParkedVehicleStore (ghi cùng transaction với thay đổi) → op bền
+      qua mất mạng / khởi động lại, đúng thứ tự seq.
+    - Gửi PUT parked_vehicles/apply_delta các op có seq > acked_seq; cloud áp dụng bằng
+      $push / $pull / positional $set và trả 409 khi seq không nối tiếp.
+    - Full resync (update_vehicle_list kèm seq) chỉ khi: lần sync đầu sau khi khởi động, cloud báo 409,
+      gặp op reset (replace_all), hoặc backlog quá PARKED_SYNC_MAX_PENDING.
+    - 1 thread, giữa 2 lần gửi cách ít nhất `interval` giây (gộp các thay đổi liên tiếp vào 1 request).
+    """
+
+    def __init__(self, store=None, parking_id=None, interval=CLOUD_FLUSH_INTERVAL, max_backoff=CLOUD_RETRY_BACKOFF_MAX):
+        self.store = store or get_parked_vehicle_store()
+        self.parking_id = parking_id or os.getenv("PARKING_ID")
+        self.interval = interval
+        self.max_backoff = max_backoff
+        self._wake = threading.Event()
+        self._idle = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._need_resync = True
+        self.deltas = 0
+        self.resyncs = 0
+
+    @property
+    def acked_seq(self):
+        return int(self.store.get_meta('cloud_acked_seq', 0))
+
+    def notify(self):
+        """Danh sách xe vừa thay đổi (op đã nằm trong store) → đánh thức thread gửi."""
+        self._idle.clear()
+        self.start()
+        self._wake.set()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="parked-sync", daemon=True)
+        self._thread.start()
+
+    def flush(self, timeout=5.0):
+        """Chờ gửi hết op đang chờ (gọi khi tắt chương trình)."""
+        if self._thread is None:
+            return True
+        self._wake.set()
+        return self._idle.wait(timeout)
+
+    def _run(self):
+        failures = 0
+        while True:
+            ok = self.sync_once()
+            if not ok:
+                failures += 1
+                time.sleep(min(self.max_backoff, self.interval * (2 ** min(failures, 10))))
+                continue
+            failures = 0
+            if self.store.pending_changes(self.acked_seq) == 0 and not self._need_resync:
+                self._idle.set()
+                self._wake.wait()
+                self._wake.clear()
+            time.sleep(self.interval)
+
+    def sync_once(self):
+        """Gửi 1 lượt. Trả về False nếu lỗi mạng / server (cần thử lại)."""
+        acked = self.acked_seq
+        if not self._need_resync and self.store.pending_changes(acked) > PARKED_SYNC_MAX_PENDING:
+            self._need_resync = True
+        if self._need_resync:
+            return self._resync()
+
+        changes = self.store.changes_since(acked, PARKED_SYNC_BATCH)
+        if not changes:
+            return True
+        ops = []
+        for seq, op in changes:
+            if op['op'] == 'reset':
+                # replace_all: toàn bộ danh sách đã đổi → gửi lại cả list
+                return self._resync()
+            ops.append(dict(op, seq=seq))
+
+        response = apply_parked_vehicle_delta({'parking_id': self.parking_id, 'ops': ops})
+        if response is None or response.status_code >= 500:
+            return False
+        if response.status_code == 409:
+            print(f"[SYNC] Cloud seq lệch (local acked={acked}), full resync danh sách xe đậu")
+            return self._resync()
+        if response.status_code != 200:
+            print(f"[SYNC] apply_delta lỗi HTTP {response.status_code}: {response.text[:200]}, full resync")
+            return self._resync()
+        self._ack(changes[-1][0])
+        self.deltas += 1
+        return True
+
+    def _resync(self):
+        data, seq = self.store.snapshot()
+        data['seq'] = seq
+        response = replace_parked_vehicle_list(data)
+        if response is None or response.status_code != 200:
+            if response is not None:
+                print(f"[SYNC] Full resync lỗi HTTP {response.status_code}: {response.text[:200]}")
+            return False
+        self._need_resync = False
+        self._ack(seq)
+        self.resyncs += 1
+        print(f"[SYNC] Đã full resync {len(data['list'])} xe đậu lên Cloud Server (seq={seq})")
+        return True
+
+    def _ack(self, seq):
+        self.store.set_meta('cloud_acked_seq', seq)
+        self.store.prune_changes(seq)
+
+    def stats(self):
+        acked = self.acked_seq
+        return {"acked_seq": acked, "pending": self.store.pending_changes(acked),
+                "deltas": self.deltas, "resyncs": self.resyncs}
+
+
+_sync = None
+_sync_lock = threading.Lock()
+
+
+def get_parked_vehicle_sync():
+    global _sync
+    if _sync is None:
+        with _sync_lock:
+            if _sync is None:
+                _sync = ParkedVehicleSync()
+    return _sync
+
+
+def sync_parked_vehicles():
+    """Gọi sau mỗi thay đổi danh sách xe đậu (thay cho PUT cả danh sách lên cloud)."""
+    get_parked_vehicle_sync().notify()
@@ -0,0 +1,116 @@
+import os
+import math
+import time
+from collections import deque
+from dotenv import load_dotenv
+load_dotenv()
+
+# Cấu hình bỏ phiếu biển số (đọc từ .env)
+PLATE_VOTE_WINDOW = float(os.getenv("PLATE_VOTE_WINDOW", "3"))         # giây: chỉ tính các lần đọc gần đây
+# Ngưỡng mặc định hiệu chỉnh bằng benchmarks/bench_plate_consensus: 0 biển xác nhận sai ở 8% / 15% lỗi ký tự
+PLATE_VOTE_THRESHOLD = float(os.getenv("PLATE_VOTE_THRESHOLD", "0.9999"))  # xác suất hậu nghiệm để xác nhận
+PLATE_VOTE_MIN_READS = int(os.getenv("PLATE_VOTE_MIN_READS", "3"))      # số lần đọc cùng dạng biển tối thiểu
+PLATE_ALPHABET = 31  # số lớp ký tự của LP_ocr (10 chữ số + chữ cái dùng trên biển số)
+CONF_MIN, CONF_MAX = 0.05, 0.99  # không tin tuyệt đối vào 1 lần đọc
+SHAPE_CONF, SHAPE_CLASSES = 0.9, 4  # bỏ phiếu dạng biển (độ dài / 1 hay 2 dòng)
+# Cặp ký tự OCR hay đọc nhầm với nhau: lỗi đọc dồn vào các cặp này chứ không rải đều trên K lớp,
+# nên 1 lần đọc ra ký tự "giống" chỉ là bằng chứng yếu để phân biệt 2 ký tự trong cặp
+LOOKALIKE_PAIRS = ("0D", "0Q", "0U", "09", "06", "8B", "83", "86", "89", "5S", "56", "2Z", "6G", "4A",
+                   "17", "1T", "7T", "1L", "EF", "MN", "UV", "KX", "HN")
+LOOKALIKE_SHARE = 0.6  # tỉ lệ lỗi đọc rơi vào ký tự giống
+LOOKALIKES = {}
+for _a, _b in LOOKALIKE_PAIRS:
+    LOOKALIKES.setdefault(_a, set()).add(_b)
+    LOOKALIKES.setdefault(_b, set()).add(_a)
+
+
+def plate_shape(plate):
+    """Dạng biển: độ dài + vị trí dấu "-" (biển 2 dòng). Chỉ bỏ phiếu ký tự giữa các lần đọc cùng dạng."""
+    return len(plate), plate.find("-")
+
+
+class PlateConsensus:
+    """
+    Xác nhận biển số bằng bỏ phiếu theo thời gian thay cho "N lần đọc giống hệt liên tiếp".
+
+    - Mỗi lần đọc (chuỗi + độ tự tin từng ký tự) được giữ `window` giây.
+    - Từng vị trí ký tự: lần đọc ra ký tự c với độ tự tin q được coi là P(đọc c | đúng c) = q; phần
+      lỗi 1 - q chia LOOKALIKE_SHARE cho các ký tự giống c (0/D, 8/B...), phần còn lại rải đều trên
+      K lớp. Cộng log-likelihood qua các lần đọc → hậu nghiệm của ký tự tốt nhất (prior đều trên K lớp,
+      các ký tự chưa từng đọc ra cũng được tính vào mẫu số).
+    - Dạng biển (độ dài, 1 / 2 dòng) được bỏ phiếu cùng cách; chỉ các lần đọc thuộc dạng thắng mới
+      bỏ phiếu ký tự. Hậu nghiệm biển = hậu nghiệm dạng × tích hậu nghiệm từng vị trí.
+    - update() trả về biển số khi hậu nghiệm ≥ `threshold` và có ít nhất `min_reads` lần đọc cùng dạng;
+      1 ký tự đọc sai ở 1 frame chỉ làm giảm hậu nghiệm vị trí đó chứ không reset như trước.
+    """
+
+    def __init__(self, window=PLATE_VOTE_WINDOW, threshold=PLATE_VOTE_THRESHOLD,
+                 min_reads=PLATE_VOTE_MIN_READS, alphabet=PLATE_ALPHABET):
+        self.window = window
+        self.threshold = threshold
+        self.min_reads = min_reads
+        self.alphabet = alphabet
+        self._reads = deque()
+        self.best = None
+        self.posterior = 0.0
+
+    def reset(self):
+        self._reads.clear()
+        self.best = None
+        self.posterior = 0.0
+
+    def update(self, plate, confs=None, now=None):
+        """Thêm 1 lần đọc (plate = None: frame không đọc được, chỉ dọn cửa sổ). Trả về biển đã xác nhận hoặc None."""
+        now = time.time() if now is None else now
+        while self._reads and now - self._reads[0][0] > self.window:
+            self._reads.popleft()
+        if plate:
+            confs = list(confs) if confs else [0.5] * len(plate)
+            self._reads.append((now, plate, [min(max(q, CONF_MIN), CONF_MAX) for q in confs]))
+        self.best, self.posterior, support = self._estimate()
+        if self.best is not None and support >= self.min_reads and self.posterior >= self.threshold:
+            return self.best
+        return None
+
+    def _estimate(self):
+        if not self._reads:
+            return None, 0.0, 0
+        # Dạng biển cũng được bỏ phiếu (1 lần đọc sai độ dài không chặn xác nhận tới khi rời cửa sổ)
+        shape, posterior = _vote([(plate_shape(text), SHAPE_CONF) for _, text, _ in self._reads], SHAPE_CLASSES)
+        reads = [read for read in self._reads if plate_shape(read[1]) == shape]
+        plate = []
+        for pos in range(shape[0]):
+            if pos == shape[1]:
+                plate.append("-")
+                continue
+            char, p = _vote([(text[pos], confs[pos]) for _, text, confs in reads], self.alphabet, LOOKALIKES)
+            posterior *= p
+            plate.append(char)
+        return "".join(plate), posterior, len(reads)
+
+
+def _likelihood(read, q, truth, k, lookalikes):
+    """P(đọc ra `read` với độ tự tin q | ký tự đúng là `truth`)."""
+    if read == truth:
+        return q
+    similar = lookalikes.get(truth, ())
+    if read in similar:
+        return (1.0 - q) * LOOKALIKE_SHARE / len(similar)
+    return (1.0 - q) * (1.0 - LOOKALIKE_SHARE if similar else 1.0) / (k - 1 - len(similar))
+
+
+def _vote(observations, k, lookalikes=None):
+    """
+    observations: [(ký hiệu, độ tự tin q), ...] của cùng 1 vị trí. Trả về (ký hiệu tốt nhất, hậu nghiệm)
+    với prior đều trên k lớp; lookalikes: {ký hiệu: tập ký hiệu hay bị đọc nhầm thành} (None = lỗi rải đều).
+    """
+    lookalikes = lookalikes or {}
+    # Ứng viên: ký hiệu đã đọc ra + ký hiệu giống chúng; các lớp còn lại tính gộp (lỗi rải đều)
+    candidates = {symbol for symbol, _ in observations}
+    candidates |= {alt for symbol in list(candidates) for alt in lookalikes.get(symbol, ())}
+    scores = {t: sum(math.log(_likelihood(symbol, q, t, k, lookalikes)) for symbol, q in observations)
+              for t in candidates}
+    rest = sum(math.log((1.0 - q) / (k - 1)) for _, q in observations)
+    best_symbol, best = max(scores.items(), key=lambda item: item[1])
+    total = sum(math.exp(v - best) for v in scores.values()) + max(k - len(candidates), 0) * math.exp(rest - best)
+    return best_symbol, 1.0 / total
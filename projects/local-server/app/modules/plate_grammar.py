@@ -0,0 +1,86 @@
+import os
+import math
+from dotenv import load_dotenv
+load_dotenv()
+
+# Sửa chuỗi OCR theo cấu trúc biển số VN (1 = bật); tắt khi bãi có nhiều biển đặc biệt (ngoại giao, quân đội...)
+LPR_GRAMMAR = os.getenv("LPR_GRAMMAR", "1") == "1"
+
+# Ký tự OCR hay nhầm giữa chữ số và chữ cái (chữ cái trên biển VN không có I, J, O, Q, R, W)
+LETTER_TO_DIGIT = {"D": "0", "O": "0", "Q": "0", "U": "0", "B": "8", "S": "5", "Z": "2", "G": "6",
+                   "A": "4", "T": "1", "I": "1", "L": "1", "J": "1"}
+DIGIT_TO_LETTER = {"0": "D", "8": "B", "5": "S", "2": "Z", "6": "G", "4": "A", "1": "T", "7": "T", "3": "B"}
+PROB_MIN = 0.02  # xác suất tối thiểu của 1 ký tự (tránh log(0) khi OCR rất tự tin vào ký tự sai loại)
+
+
+def templates(length, first_line=None):
+    """
+    Mẫu biển số VN (bỏ "-") có độ dài `length`: "D" chữ số, "L" chữ cái, "X" chữ cái hoặc chữ số.
+        2 số tỉnh + seri (1 chữ cái, có thể thêm 1 chữ cái / chữ số) + 4 hoặc 5 số
+        VD: 30G4934, 30G49341, 51LD12345, 29B112345 (2 dòng: 29B1-12345)
+    first_line: độ dài dòng trên của biển 2 dòng (= 2 số tỉnh + seri), None với biển 1 dòng.
+    """
+    out = []
+    for series in ("L", "LX"):
+        digits = length - 2 - len(series)
+        if digits not in (4, 5):
+            continue
+        if first_line is not None and first_line != 2 + len(series):
+            continue
+        out.append("DD" + series + "D" * digits)
+    return out
+
+
+def _char_prob(char, conf, kind):
+    """(ký tự theo mẫu, xác suất): giữ ký tự nếu đúng loại, không thì đổi sang ký tự dễ nhầm với xác suất 1 - conf."""
+    if kind == "X" or (kind == "D") == char.isdigit():
+        return char, conf
+    alt = (LETTER_TO_DIGIT if kind == "D" else DIGIT_TO_LETTER).get(char)
+    if alt is None:
+        return None, 0.0
+    return alt, max(1.0 - conf, PROB_MIN)
+
+
+def plate_candidates(plate, confs):
+    """
+    Các cách đọc hợp lệ theo cấu trúc biển số của 1 chuỗi OCR (chuỗi từ decode_plate, confs theo từng ký tự):
+    [(chuỗi, độ tự tin từng ký tự, score), ...] sắp score giảm dần, score = trung bình nhân xác suất
+    các ký tự. Rỗng nếu không khớp mẫu nào.
+    """
+    if plate == "unknown" or len(confs) != len(plate):
+        return []
+    split = plate.find("-")
+    chars = [(c, q) for c, q in zip(plate, confs) if c != "-"]
+    candidates = {}
+    for template in templates(len(chars), split if split >= 0 else None):
+        out, probs = [], []
+        for (char, conf), kind in zip(chars, template):
+            char, prob = _char_prob(char, conf, kind)
+            if char is None:
+                break
+            out.append(char)
+            probs.append(prob)
+        else:
+            score = math.exp(sum(math.log(max(p, PROB_MIN)) for p in probs) / len(probs))
+            if split >= 0:
+                out.insert(split, "-")
+                probs.insert(split, 1.0)
+            text = "".join(out)
+            if text not in candidates or candidates[text][2] < score:
+                candidates[text] = (text, probs, score)
+    return sorted(candidates.values(), key=lambda c: -c[2])
+
+
+def correct_plate(plate, confs, enabled=LPR_GRAMMAR):
+    """
+    Cách đọc tốt nhất: (chuỗi, độ tự tin từng ký tự, score, hợp lệ, candidates).
+    Không khớp mẫu (hoặc tắt LPR_GRAMMAR) → giữ nguyên chuỗi OCR với hợp lệ = False.
+    """
+    candidates = plate_candidates(plate, confs) if enabled else []
+    if candidates:
+        text, probs, score = candidates[0]
+        return text, probs, score, True, candidates
+    if plate == "unknown" or not confs:
+        return plate, list(confs), 0.0, False, []
+    score = math.exp(sum(math.log(max(q, PROB_MIN)) for q in confs) / len(confs))
+    return plate, list(confs), score, False, [(plate, list(confs), score)]
@@ -0,0 +1,118 @@
+import threading
+
+
+class PlateIndex:
+    """
+    Index 2 chiều biển số ↔ global_id (ghi ở main process).
+
+    - Dict local `_by_gid` / `_by_plate` → tra cứu O(1), không round-trip tới Manager.
+    - Mỗi lần bind/unbind ghi xuyên xuống `shared_map` (Manager dict global_id -> biển số)
+      rồi tăng `version` để camera process (PlateIndexReader) biết mà nạp lại cache.
+    - 1 biển số chỉ thuộc 1 global_id: bind biển số đã có → global_id cũ bị gỡ (xe vào lại bãi).
+    - shared_map được ghi ngay trong lock để thứ tự ghi khớp thứ tự thay đổi dict local.
+    """
+
+    def __init__(self, shared_map=None, version=None):
+        self.shared_map = shared_map
+        self.version = version
+        self._lock = threading.Lock()
+        self._by_gid = {}
+        self._by_plate = {}
+
+    def _bump(self):
+        if self.version is not None:
+            self.version.value += 1
+
+    def _bind(self, global_id, plate):
+        """bind khi đang giữ lock."""
+        old_gid = self._by_plate.get(plate)
+        old_plate = self._by_gid.get(global_id)
+        if old_gid == global_id:
+            return
+        if old_gid is not None:
+            self._by_gid.pop(old_gid, None)
+        if old_plate is not None:
+            self._by_plate.pop(old_plate, None)
+        self._by_gid[global_id] = plate
+        self._by_plate[plate] = global_id
+        if self.shared_map is not None:
+            if old_gid is not None:
+                self.shared_map.pop(old_gid, None)
+            self.shared_map[global_id] = plate
+        self._bump()
+
+    def _unbind(self, global_id):
+        """unbind khi đang giữ lock."""
+        plate = self._by_gid.pop(global_id, None)
+        if plate is None:
+            return None
+        self._by_plate.pop(plate, None)
+        if self.shared_map is not None:
+            self.shared_map.pop(global_id, None)
+        self._bump()
+        return plate
+
+    def bind(self, global_id, plate):
+        with self._lock:
+            self._bind(global_id, plate)
+
+    def unbind(self, global_id):
+        """Gỡ global_id khỏi index. Trả về biển số đã gỡ (None nếu không có)."""
+        with self._lock:
+            return self._unbind(global_id)
+
+    def relabel(self, old_id, new_id):
+        """
+        Canonical old_id bị gộp vào new_id (old_id không còn là global_id): chuyển biển số sang new_id.
+        new_id đã có biển số khác → giữ biển của new_id, gỡ biển của old_id và log xung đột.
+        """
+        with self._lock:
+            plate = self._by_gid.get(old_id)
+            if plate is None:
+                return
+            new_plate = self._by_gid.get(new_id)
+            if new_plate is None:
+                self._bind(new_id, plate)
+                return
+            self._unbind(old_id)
+        print(f"[WARNING] Gộp ID {old_id} → {new_id}: 2 biển số khác nhau {plate} / {new_plate}, giữ {new_plate}")
+
+    def plate_of(self, global_id, default=None):
+        return self._by_gid.get(global_id, default)
+
+    def global_id_of(self, plate):
+        return self._by_plate.get(plate)
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._by_gid)
+
+    def __len__(self):
+        return len(self._by_gid)
+
+
+class PlateIndexReader:
+    """
+    Phía camera process: cache đọc của PlateIndex.
+    Mỗi frame chỉ đọc version (shared memory); version đổi mới copy lại Manager dict.
+    """
+
+    def __init__(self, shared_map, version):
+        self.shared_map = shared_map
+        self.version = version
+        self._version = None
+        self._by_gid = {}
+        self._by_plate = {}
+
+    def refresh(self):
+        v = self.version.value
+        if v != self._version:
+            self._by_gid = dict(self.shared_map)
+            self._by_plate = {plate: gid for gid, plate in self._by_gid.items()}
+            self._version = v
+
+    def plate_of(self, global_id, default=None):
+        return self._by_gid.get(global_id, default)
+
+    def global_id_of(self, plate):
+        return self._by_plate.get(plate)
@@ -0,0 +1,99 @@
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import cv2
+
+BOUNDARY = "frame"
+
+
+class PreviewStream:
+    """
+    MJPEG preview cho 1 camera process (dùng khi chạy HEADLESS trên máy production).
+
+    - Chỉ vẽ + encode JPEG khi có client đang xem: camera loop gọi `wants_frame()` trước khi annotate,
+      không có client → trả False, không tốn chi phí vẽ/encode.
+    - Giới hạn tối đa `fps` frame/giây gửi cho client, độc lập với tốc độ detect.
+    - Xem bằng trình duyệt: http://<host>:<port>/
+    """
+
+    def __init__(self, port, fps=5, quality=70, tag="Preview"):
+        self.port = port
+        self.interval = 1.0 / fps if fps > 0 else 0.0
+        self.quality = quality
+        self.tag = tag
+        self._clients = 0
+        self._last_publish = 0.0
+        self._jpeg = None
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._server = None
+
+    def start(self):
+        stream = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path not in ("/", "/stream"):
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("Content-Type", f"multipart/x-mixed-replace; boundary={BOUNDARY}")
+                self.end_headers()
+                stream._serve(self.wfile)
+
+            def log_message(self, format, *args):
+                pass
+
+        try:
+            self._server = ThreadingHTTPServer(("0.0.0.0", self.port), Handler)
+        except OSError as e:
+            print(f"[{self.tag}] Cannot start preview on port {self.port}: {e}")
+            return False
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        print(f"[{self.tag}] MJPEG preview at http://0.0.0.0:{self.port}/")
+        return True
+
+    def _serve(self, wfile):
+        with self._cond:
+            self._clients += 1
+        print(f"[{self.tag}] Client connected ({self._clients})")
+        seq = 0
+        try:
+            while True:
+                with self._cond:
+                    if not self._cond.wait_for(lambda: self._seq != seq, timeout=5.0):
+                        continue
+                    seq, jpeg = self._seq, self._jpeg
+                wfile.write(f"--{BOUNDARY}\r\nContent-Type: image/jpeg\r\n"
+                            f"Content-Length: {len(jpeg)}\r\n\r\n".encode())
+                wfile.write(jpeg)
+                wfile.write(b"\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            with self._cond:
+                self._clients -= 1
+            print(f"[{self.tag}] Client disconnected ({self._clients})")
+
+    def wants_frame(self):
+        """True nếu có client đang xem và đã tới lượt gửi frame mới (theo fps)."""
+        return self._clients > 0 and time.time() - self._last_publish >= self.interval
+
+    def publish(self, frame):
+        """Encode frame đã vẽ thành JPEG và đẩy cho tất cả client."""
+        self._last_publish = time.time()
+        ok, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        if not ok:
+            return
+        with self._cond:
+            self._jpeg = buffer.tobytes()
+            self._seq += 1
+            self._cond.notify_all()
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
@@ -0,0 +1,89 @@
+import math
+
+
+def polygon_area(poly):
+    """Diện tích đa giác (shoelace). poly: [(x, y), ...]."""
+    area = 0.0
+    n = len(poly)
+    for i in range(n):
+        x1, y1 = poly[i]
+        x2, y2 = poly[(i + 1) % n]
+        area += x1 * y2 - x2 * y1
+    return abs(area) / 2.0
+
+
+def polygon_bounds(poly):
+    xs = [p[0] for p in poly]
+    ys = [p[1] for p in poly]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def polygon_centroid(poly):
+    xs = [p[0] for p in poly]
+    ys = [p[1] for p in poly]
+    return int(round(sum(xs) / len(xs))), int(round(sum(ys) / len(ys)))
+
+
+def _clip(poly, inside, intersect):
+    out = []
+    n = len(poly)
+    for i in range(n):
+        cur = poly[i]
+        prev = poly[i - 1]
+        if inside(cur):
+            if not inside(prev):
+                out.append(intersect(prev, cur))
+            out.append(cur)
+        elif inside(prev):
+            out.append(intersect(prev, cur))
+    return out
+
+
+def box_overlap_area(poly, box):
+    """
+    Diện tích phần đa giác nằm trong bbox (x1, y1, x2, y2): cắt đa giác theo 4 cạnh của bbox
+    (Sutherland-Hodgman, bbox là hình lồi) rồi tính shoelace.
+    """
+    x1, y1, x2, y2 = box
+
+    def at_x(x):
+        return lambda p, q: (x, p[1] + (q[1] - p[1]) * (x - p[0]) / (q[0] - p[0]))
+
+    def at_y(y):
+        return lambda p, q: (p[0] + (q[0] - p[0]) * (y - p[1]) / (q[1] - p[1]), y)
+
+    for inside, intersect in ((lambda p: p[0] >= x1, at_x(x1)), (lambda p: p[0] <= x2, at_x(x2)),
+                              (lambda p: p[1] >= y1, at_y(y1)), (lambda p: p[1] <= y2, at_y(y2))):
+        poly = _clip(poly, inside, intersect)
+        if len(poly) < 3:
+            return 0.0
+    return polygon_area(poly)
+
+
+class GridIndex:
+    """
+    Index lưới đều cho các vùng chữ nhật (bounds của polygon slot), dựng 1 lần khi load tọa độ.
+    query(box) chỉ trả về các vùng nằm chung ô lưới với bbox → mỗi bbox chỉ test slot ở gần nó.
+    """
+
+    def __init__(self, bounds, cell=64):
+        self.cell = cell
+        self._cells = {}
+        for idx, (bx1, by1, bx2, by2) in enumerate(bounds):
+            for cx in range(int(bx1 // cell), int(bx2 // cell) + 1):
+                for cy in range(int(by1 // cell), int(by2 // cell) + 1):
+                    self._cells.setdefault((cx, cy), []).append(idx)
+
+    def query(self, box):
+        x1, y1, x2, y2 = box
+        cell = self.cell
+        found = set()
+        for cx in range(int(math.floor(x1 / cell)), int(math.floor(x2 / cell)) + 1):
+            for cy in range(int(math.floor(y1 / cell)), int(math.floor(y2 / cell)) + 1):
+                items = self._cells.get((cx, cy))
+                if items:
+                    found.update(items)
+        return found
+
+    def __len__(self):
+        return len(self._cells)
@@ -0,0 +1,167 @@
+import os
+import math
+import time
+from collections import namedtuple
+
+import numpy as np
+from dotenv import load_dotenv
+from app.modules.occupancy_bitmap import layout_id
+load_dotenv()
+
+SLOT_OCCUPANCY_TAU = float(os.getenv("SLOT_OCCUPANCY_TAU", "1.5"))        # hằng số thời gian EMA (giây)
+SLOT_ENTER_THRESHOLD = float(os.getenv("SLOT_ENTER_THRESHOLD", "0.7"))   # EMA > ngưỡng → slot có xe
+SLOT_LEAVE_THRESHOLD = float(os.getenv("SLOT_LEAVE_THRESHOLD", "0.3"))   # EMA < ngưỡng → slot trống
+
+
+SlotEvent = namedtuple("SlotEvent", ["slot_id", "old", "new", "ts"])  # old/new: biển số, None = trống
+
+_UNSET = object()
+
+
+class SlotStateMachine:
+    """
+    Trạng thái bãi đã xác nhận, debounce riêng từng slot.
+
+    - update(sample): sample = {slot_id: biển số hoặc None (trống)} của 1 lần lấy mẫu.
+      Slot có giá trị khác trạng thái đã xác nhận → thành ứng viên; ứng viên giữ nguyên đủ `debounce`
+      giây thì được xác nhận. 1 slot nhấp nháy chỉ reset bộ đếm của chính nó, không chặn slot khác
+      (khác cửa sổ "toàn bộ state không đổi 6s" cũ: bãi đông xe thì không bao giờ ổn định).
+    - Trả về danh sách SlotEvent của các slot vừa được xác nhận đổi trạng thái; listener
+      (cloud, màn hình, parked vehicles) chỉ được gọi khi có event.
+    - Slot mới xuất hiện cũng phải qua debounce trước khi có trạng thái (old = None).
+    """
+
+    def __init__(self, debounce=4.0):
+        self.debounce = debounce
+        self._confirmed = {}   # slot_id -> biển số / None
+        self._candidate = {}   # slot_id -> (giá trị, ts lần đầu thấy)
+        self._listeners = []
+        self._lists = None
+
+    def add_listener(self, callback):
+        """callback(events, machine) - gọi khi có slot đổi trạng thái đã xác nhận."""
+        self._listeners.append(callback)
+
+    def update(self, sample, now=None):
+        now = time.time() if now is None else now
+        events = []
+        # Slot bị xóa khỏi cấu hình tọa độ
+        for slot_id in [s for s in self._confirmed if s not in sample]:
+            events.append(SlotEvent(slot_id, self._confirmed.pop(slot_id), None, now))
+        for slot_id in [s for s in self._candidate if s not in sample]:
+            del self._candidate[slot_id]
+
+        for slot_id, value in sample.items():
+            confirmed = self._confirmed.get(slot_id, _UNSET)
+            if value == confirmed:
+                self._candidate.pop(slot_id, None)
+                continue
+            candidate = self._candidate.get(slot_id)
+            if candidate is None or candidate[0] != value:
+                self._candidate[slot_id] = (value, now)
+                candidate = self._candidate[slot_id]
+            if now - candidate[1] >= self.debounce:
+                del self._candidate[slot_id]
+                self._confirmed[slot_id] = value
+                events.append(SlotEvent(slot_id, None if confirmed is _UNSET else confirmed, value, now))
+
+        if events:
+            self._lists = None
+            for callback in self._listeners:
+                try:
+                    callback(events, self)
+                except Exception as e:
+                    print(f"[SLOT] Listener error: {e}")
+        return events
+
+    def lists(self):
+        """(occupied_list, available_list, license_occupied_list) của trạng thái đã xác nhận (cache tới event sau)."""
+        if self._lists is None:
+            occupied = sorted(s for s, v in self._confirmed.items() if v is not None)
+            available = sorted(s for s, v in self._confirmed.items() if v is None)
+            self._lists = (occupied, available, [self._confirmed[s] for s in occupied])
+        return self._lists
+
+    def confirmed(self, slot_id, default=None):
+        return self._confirmed.get(slot_id, default)
+
+
+class SlotHysteresis:
+    """
+    Làm mượt occupancy từng slot ngay trong camera process, theo từng frame.
+
+    - score[i] = EMA của "slot i bị bbox che" với hằng số thời gian `tau` (alpha tính theo dt giữa
+      2 frame → không phụ thuộc FPS); 1-2 frame mất detection không làm slot đổi trạng thái.
+    - Hysteresis: trống → có xe khi score > enter, có xe → trống khi score < leave (enter > leave).
+    - owner[i]: track id gần nhất che slot i (giữ nguyên trong lúc mất detection ngắn), -1 khi trống.
+    - Số slot đổi (hot-reload tọa độ) → reset toàn bộ trạng thái.
+    """
+
+    def __init__(self, tau=SLOT_OCCUPANCY_TAU, enter=SLOT_ENTER_THRESHOLD, leave=SLOT_LEAVE_THRESHOLD):
+        self.tau = tau
+        self.enter = enter
+        self.leave = leave
+        self.reset(0)
+
+    def reset(self, num_slots):
+        self.score = np.zeros(num_slots, dtype=np.float32)
+        self.occupied = np.zeros(num_slots, dtype=bool)
+        self.owner = np.full(num_slots, -1, dtype=np.int32)
+        self._last_ts = None
+
+    def update(self, match, ids, now=None):
+        """
+        match: (N,) index bbox che slot (CoordinateSet.match), -1 = không bị che.
+        ids: track id của các bbox. Trả về (occupied, owner).
+        """
+        now = time.time() if now is None else now
+        if len(match) != len(self.score):
+            self.reset(len(match))
+        hit = match >= 0
+        if self._last_ts is None:
+            self.score[:] = hit  # frame đầu tiên: khởi tạo bằng quan sát
+        else:
+            dt = max(now - self._last_ts, 0.0)
+            alpha = 1.0 if self.tau <= 0 else 1.0 - math.exp(-dt / self.tau)
+            self.score += np.float32(alpha) * (hit - self.score)
+        self._last_ts = now
+        self.occupied = np.where(self.occupied, self.score >= self.leave, self.score > self.enter)
+        if hit.any():
+            self.owner[hit] = np.asarray(ids, dtype=np.int32)[match[hit]]
+        self.owner[~self.occupied] = -1
+        return self.occupied, self.owner
+
+
+def occupancy_from_bitmaps(slot_indexes, bitmaps, plate_of, previous=None):
+    """
+    OR bitmap occupancy của các camera theo slot id → mẫu {slot_id: biển số hoặc None} cho SlotStateMachine.
+
+    Args:
+        slot_indexes: {cam_idx: CoordinateSet} - slot của từng camera (cùng file camera đang dùng)
+        bitmaps: {cam_idx: (layout, occupied (N,), owner (N,))} - OccupancyBitmap.read()
+        plate_of: hàm (cam_idx, obj_id) -> biển số ("UNKNOWN" nếu chưa biết)
+        previous: mẫu lần trước - camera có layout khác slot id của main (đang hot-reload) hoặc chưa
+            publish thì slot của nó giữ giá trị cũ thay vì nhảy về trống (bitmap bị cắt ở capacity: chỉ
+            các slot không được publish giữ giá trị cũ).
+    """
+    previous = previous or {}
+    sample = {}
+    for cam_idx, slot_index in slot_indexes.items():
+        sample.update(dict.fromkeys(slot_index.ids))
+    for cam_idx, slot_index in slot_indexes.items():
+        layout, occupied, owner = bitmaps.get(cam_idx, (None, (), ()))
+        # Layout khớp nhưng bitmap ngắn hơn (camera vượt capacity bitmap): dùng phần đã publish,
+        # chỉ slot phía sau giữ giá trị cũ
+        stale = slot_index.ids if layout != layout_id(slot_index.ids) else slot_index.ids[len(occupied):]
+        for slot_id in stale:
+            if sample.get(slot_id) in (None, "UNKNOWN") and previous.get(slot_id) is not None:
+                sample[slot_id] = previous[slot_id]
+        if len(stale) == len(slot_index.ids):
+            continue
+        for pos in np.flatnonzero(occupied):
+            slot_id = slot_index.ids[pos]
+            plate = plate_of(cam_idx, int(owner[pos]))
+            # Nhiều camera cùng thấy 1 slot: ưu tiên camera đã biết biển số
+            if sample.get(slot_id) in (None, "UNKNOWN"):
+                sample[slot_id] = plate
+    return sample
@@ -1,13 +1,30 @@
 import cv2
 from flask import json
-from ultralytics import YOLO
-from multiprocessing import Process, set_start_method, Value, Manager
+from multiprocessing import Process, set_start_method, Value, Manager, Queue
 import time
-from app.modules.utils import read_yaml, write_yaml_file, speech_text, get_parked_vehicles_from_file, save_parked_vehicles_to_file, get_new_license_plate_from_file, save_new_license_plate_to_file, update_screen_display
+import numpy as np
+from app.modules.utils import speech_text, get_parked_vehicles_from_file, save_parked_vehicles_to_file, update_screen_display
 from app.modules import globals
 import threading
 from multiprocessing import Barrier
-from app.modules.cloud_api import get_coordinates, update_parked_vehicle_list, update_parking_lot
+from app.modules.cloud_api import push_parking_lot, flush_outboxes
+from app.modules.parked_vehicle_sync import sync_parked_vehicles, get_parked_vehicle_sync
+from app.modules.coordinate_store import (CoordinateStore, REID_COORDS_PATH, SLOT_COORDS_PATH,
+                                          sync_from_cloud, start_watch_cloud_coordinates)
+from app.modules.detection_ring import DetectionRing
+from app.modules.inference_server import InferenceClient, load_detect_model, start_inference_server
+from app.modules.model_export import export_detect_model
+from app.modules.slot_occupancy import SlotStateMachine, SlotHysteresis, occupancy_from_bitmaps
+from app.modules.occupancy_bitmap import MAX_SLOTS, OccupancyBitmap, layout_id
+from app.modules.preview_stream import PreviewStream
+from app.modules.frame_grabber import FrameGrabber, FRAME_STATS_INTERVAL
+from app.modules.motion_gate import MotionGate, AdaptiveStride, motion_config
+from app.modules.frame_roi import FrameRoi, ROI_CROP
+from app.modules.id_merger import CrossingReporter, IdMerger
+from app.modules.identity_store import IdentityStore, IdentityMirror
+from app.modules.plate_index import PlateIndex, PlateIndexReader
+from app.modules.parked_vehicle_store import get_parked_vehicle_store
+from app.modules.entry_events import entry_channel
 import os
 import dotenv
 import ast
@@ -20,13 +37,19 @@ PARKING_ID = os.getenv("PARKING_ID")
 VIDEO_SOURCES = ast.literal_eval(os.getenv("TRACKING_CAMERA"))
 TRACKER_PATH = "app/resources/tracker/"+os.getenv("TRACKER_CONFIG")+".yaml"
 DETECT_MODEL_PATH = os.getenv("DETECT_MODEL_PATH")
-REID_COORDS_PATH = "app/resources/coordinates/reid-data/"
-SLOT_COORDS_PATH = "app/resources/coordinates/slot-data/"
+INFERENCE_SERVER = os.getenv("INFERENCE_SERVER", "0") == "1"
+HEADLESS = os.getenv("HEADLESS", "0") == "1"
+PREVIEW_PORT = int(os.getenv("PREVIEW_PORT", "0"))  # 0 = tắt preview, camera i dùng port PREVIEW_PORT + i
+PREVIEW_FPS = float(os.getenv("PREVIEW_FPS", "5"))
 CLOUDINARY_UPLOAD_PRESET = os.getenv("UPLOAD_PRESET")
 CLOUDINARY_UPLOAD_URL = os.getenv("CLOUDINARY_UPLOAD_URL")
 MQTT_BROKER = "broker.hivemq.com"
 MQTT_PORT = 1883
 MQTT_TOPIC_SHOW_VEHICLE = "parking/vehicle/show"
+COORDINATES_SYNC_INTERVAL = float(os.getenv("COORDINATES_SYNC_INTERVAL", "60"))
+MERGE_TIME_TOL = 0.5  # các camera phải thấy cùng điểm giao trong khoảng này (giây) mới merge
+MERGE_STALE = 1.0     # quan sát cũ hơn (giây) bị bỏ qua
+IDENTITY_TTL = 120.0  # track local không còn detect quá TTL (giây) bị xóa khỏi IdentityStore
 
 def publish_vehicle_image_url(image_url):
     """
@@ -51,111 +74,78 @@ def publish_vehicle_image_url(image_url):
         print(f"[MQTT] ❌ Failed to publish: {e}")
         return False
 
-def update_mappings_atomic(coords_by_cam, lock, canonical_map, next_canonical, time_tol=0.5, stale=1.0):
+def register_new_vehicle(global_id, plate_index, track_ts=None):
     """
-    Hàm này dùng để MERGE ID giữa nhiều camera → tạo thành ID toàn cục (global canonical ID).
-    (Giữ nguyên logic cũ)
+    Gọi từ IdMerger khi camera anchor cấp canonical id mới:
+    nếu có sự kiện xe qua cổng (entry_channel) khớp thời gian thì gán biển số cho global_id
+    và thêm xe vào danh sách bãi xe.
     """
-    now = time.time()
-
-    # snapshot cleaned: chỉ giữ dữ liệu không bị quá hạn "stale"
-    snapshots = {}
-    latest_ts = {}
-
-    cams = range(0, len(coords_by_cam))
-
-    for cam in cams:
-        raw = dict(coords_by_cam[cam])  # copy từ memory shared dict -> local dict
-
-        # Lọc dữ liệu cũ (stale)
-        s = {k: v for k, v in raw.items() if v and (now - v[1]) <= stale}
-        snapshots[cam] = s
-
-        # Lưu timestamp cuối cùng của từng track
-        latest_ts[cam] = {}
-        for _, (tid, ts) in s.items():
-            if tid is not None:
-                latest_ts[cam][tid] = max(latest_ts[cam].get(tid, 0.0), ts)
-
-    # Lấy danh sách TẤT CẢ coord_id từng xuất hiện ở bất kỳ camera nào
-    coord_ids = set()
-    for cam in cams:
-        coord_ids.update(snapshots[cam].keys())
-
-    # Bắt đầu merge
-    with lock:
-        for cid in coord_ids:
-            obs = []
-            # Gom tất cả (camera, track_id, timestamp) nhìn thấy coord_id này
-            for cam in cams:
-                if cid in snapshots[cam]:
-                    tid, ts = snapshots[cam][cid]
-                    if tid is not None:
-                        obs.append((cam, int(tid), ts))
-
-            if len(obs) < 2:
-                continue  # Chỉ 1 camera thấy → không merge được
-
-            # Lọc theo thời gian (camera phải thấy gần cùng thời điểm)
-            times = [ts for (_, _, ts) in obs]
-            median_ts = sorted(times)[len(times)//2]
-
-            close = [(cam, tid, ts) for (cam, tid, ts) in obs if abs(ts - median_ts) <= time_tol]
-            if len(close) < 2:
-                continue
-
-            # Kiểm tra xem có camera nào đã có canonical_id chưa
-            existing_canons = []
-            for cam, tid, _ in close:
-                key = f"c{cam}_{tid}"
-                c = canonical_map.get(key)
-                if c is not None:
-                    existing_canons.append((cam, tid, int(c)))
-
-            # Chọn canonical id
-            if existing_canons:
-                # Ưu tiên canonical id nhỏ nhất (để ổn định)
-                chosen_canon = min(c for (_, _, c) in existing_canons)
-            else:
-                # Tạo canonical mới
-                chosen_canon = int(next_canonical.value)
-                next_canonical.value += 1
-
-            # Gán chung canonical id cho tất cả track liên quan
-            for cam, tid, _ in close:
-                key = f"c{cam}_{tid}"
-                canonical_map[key] = chosen_canon
-
-            # Log merge cho dễ debug
-            #mapped = ", ".join([f"(cam{cam}:{tid})" for cam, tid, _ in close])
-            #print(f"[MERGE] coord {cid}: {mapped} -> canon {chosen_canon}")
+    entry = entry_channel.match(track_ts)
+    if entry is None:
+        return
+    new_license_plate, user_id = entry
+    plate_index.bind(global_id, new_license_plate)
+    #print(f"[ADD LP] global_id {global_id} -> {new_license_plate}")
+
+    # Tạo đối tượng vehicle mới cho bãi xe
+    time_in = datetime.datetime.utcnow()+ datetime.timedelta(hours=7) 
+    store = get_parked_vehicle_store()
+    store.add({
+        'user_id': user_id,
+        'customer_type': 'customer',
+        'time_in': time_in.isoformat(),
+        'license_plate': new_license_plate,
+        'slot_name': "",
+        'num_slot': 0 # 0 làm đỗ đúng, 1 là đổ sai
+    })
+    # POST (write-behind, gộp với các cập nhật khác trong cùng khoảng flush)
+    sync_parked_vehicles()
 
 
 def process_video(video_path, window_name, model_path, cam_id,
-                  coords_by_cam, lock, canonical_map, next_canonical,
+                  merge_events, canonical_map, identity_version,
                   intersections_file, slot_file, start_barrier,
-                  bbox_shared, license_shared, search_vehicle_shared, searched_vehicle_uploaded):
+                  ring_name, occupancy_name, license_shared, plate_version, search_vehicle_shared,
+                  searched_vehicle_uploaded, inference_queues=None):
     """
     Hàm xử lý video cho từng camera (chạy song song bằng process).
 
     Thay đổi quan trọng:
-    - Truyền explicit shared dict `bbox_shared`, `license_shared`, `search_vehicle_shared` (manager.dict) từ main process.
+    - Truyền explicit shared dict `license_shared`, `search_vehicle_shared` (manager.dict) từ main process.
+      `license_shared` + `plate_version` được đọc qua PlateIndexReader (cache local, chỉ nạp lại khi version đổi).
       Tránh việc child process cập nhật module `globals` cục bộ (không cùng memory với main khi dùng 'spawn').
+    - ring_name: tên shared memory của DetectionRing camera này (bbox ghi thẳng vào shared memory, không qua Manager).
+    - occupancy_name: tên shared memory của OccupancyBitmap camera này - occupancy slot đã qua hysteresis
+      (SlotHysteresis) được tính mỗi frame tại đây, check_occupied_slots chỉ OR bitmap các camera.
     - searched_vehicle_uploaded: shared dict để đảm bảo chỉ upload 1 lần.
+    - merge_events: Queue sự kiện gửi cho IdMerger (main process) - camera không giữ lock chung.
+    - canonical_map + identity_version: mirror của IdentityStore, đọc qua IdentityMirror (cache local theo version).
+    - inference_queues: (request_queue, result_queue) khi bật INFERENCE_SERVER - camera không load model riêng,
+      detection chạy batch ở inference server, tracker vẫn chạy tại đây.
+    - HEADLESS=1: không cv2.imshow, chỉ vẽ bbox/điểm khi có client xem MJPEG preview (PREVIEW_PORT + cam_id).
+    - Motion gate (mặc định tắt, bật theo camera qua MOTION_GATE_CAMERAS): lúc yên tĩnh chỉ detect 1 lần / stride frame,
+      frame bỏ qua dùng lại bbox lần trước (ring vẫn được ghi với timestamp mới).
+    - ROI_CROP=1 (mặc định tắt): model chỉ chạy trên vùng quanh slot / điểm giao ReID (FrameRoi: crop hoặc
+      mosaic các tile, anchor chỉ crop), bbox được đổi về tọa độ frame gốc trước khi dùng.
     """
-    print(f"[Camera {cam_id}] Loading YOLO model...")
-    try:
-        # NOTE: nếu không muốn ép dùng cuda, có thể bỏ `.to("cuda")` nếu model không hỗ trợ
-        model = YOLO(model_path, verbose=False).to("cuda")
-        print(f"[Camera {cam_id}] Model loaded on CUDA")
-    except Exception as e:
-        # fallback nếu không có GPU / lỗi
-        print(f"[Camera {cam_id}] CUDA not available, using CPU: {e}")
-        model = YOLO(model_path, verbose=False)
+    ring = DetectionRing.attach(ring_name)
+    occupancy = OccupancyBitmap.attach(occupancy_name)
+    hysteresis = SlotHysteresis()
+    reporter = CrossingReporter(cam_id, merge_events, min_interval=MERGE_TIME_TOL / 2)
+    identity = IdentityMirror(canonical_map, identity_version)
+    plates = PlateIndexReader(license_shared, plate_version)
+
+    inference = None
+    if inference_queues is not None:
+        inference = InferenceClient(cam_id, *inference_queues, TRACKER_PATH)
+        print(f"[Camera {cam_id}] Using shared inference server")
+    else:
+        model = load_detect_model(model_path, f"Camera {cam_id}")
 
     print(f"[Camera {cam_id}] Opening video source...")
-    cap = cv2.VideoCapture(video_path, cv2.CAP_DSHOW)
-    if not cap.isOpened():
+    # Thread grab riêng, chỉ giữ frame mới nhất (inference chậm hơn camera thì frame cũ bị bỏ)
+    grabber = FrameGrabber(video_path, cv2.CAP_DSHOW, name=f"Camera {cam_id}")
+    if not grabber.start():
         print(f"[ERROR] Camera {cam_id} failed to open {video_path}")
         return
 
@@ -167,18 +157,54 @@ def process_video(video_path, window_name, model_path, cam_id,
         print(f"Camera {cam_id} barrier wait error: {e}")
     print(f"Camera {cam_id} started.")
 
-    # Load điểm giao trên hình (các vị trí bạn đánh dấu)
-    intersections_coords = read_yaml(intersections_file)
+    # Load điểm giao + slot trên hình (giữ trong RAM, tự reload khi file tọa độ thay đổi)
+    coords = CoordinateStore(intersections_file, slot_file)
+    coords.add_listener(lambda store: print(f"[Camera {cam_id}] Coordinates reloaded: "
+                                            f"{len(store.reid)} ReID points, {len(store.slots)} slots"))
+    slot_layout = [layout_id(coords.slots.ids)]
+    coords.add_listener(lambda store: slot_layout.__setitem__(0, layout_id(store.slots.ids)))
+
+    # Vùng ảnh đưa vào model (tính lại khi tọa độ hot-reload)
+    roi = None
+    if ROI_CROP:
+        # Anchor cấp global_id mới cho mỗi track id → không dùng mosaic (xe qua làn giữa 2 tile đổi track id)
+        roi = FrameRoi(name=f"Camera {cam_id}", mosaic=cam_id != 0)
+        roi.set_coordinates(coords)
+        coords.add_listener(roi.set_coordinates)
     
+    # Preview MJPEG (chỉ vẽ + encode khi có client đang xem)
+    preview = None
+    if PREVIEW_PORT > 0:
+        preview = PreviewStream(PREVIEW_PORT + cam_id, PREVIEW_FPS, tag=f"Camera {cam_id}")
+        if not preview.start():
+            preview = None
+
+    # Motion gate + adaptive stride: bỏ qua YOLO khi khung hình đứng yên
+    gate_config = motion_config(cam_id)
+    gate = stride = None
+    if gate_config['enabled']:
+        gate = MotionGate(gate_config['width'], gate_config['pixel_threshold'],
+                          gate_config['min_ratio'], gate_config['bg_alpha'])
+        stride = AdaptiveStride(gate_config['max_stride'], gate_config['idle_frames'],
+                                name=f"Camera {cam_id}", stats_interval=FRAME_STATS_INTERVAL)
+        print(f"[Camera {cam_id}] Motion gate on (max stride {stride.max_stride}, min ratio {gate.min_ratio})")
+    ids, xyxy = [], []
+
     # Lưu search_vehicle trước đó để detect thay đổi
     previous_search_vehicle = ""
 
     while True:
-        coords_trackids = {}
+        coords.refresh()
+        identity.refresh()
+        plates.refresh()
 
-        ret, frame = cap.read()
+        # frame_ts: thời điểm grab frame (không phải lúc inference xong) → dùng cho ring và merge ID
+        ret, frame, frame_ts = grabber.read()
         if not ret:
-            break
+            if grabber.ended:
+                break
+            # Camera live đang đọc lại / mở lại sau lỗi: chờ frame tiếp theo
+            continue
 
         # Kiểm tra nếu có yêu cầu tìm kiếm xe
         search_vehicle = search_vehicle_shared.get('value', '')
@@ -202,79 +228,62 @@ def process_video(video_path, window_name, model_path, cam_id,
         found_vehicle_in_this_camera = False
         found_vehicle_bbox = None
         found_vehicle_obj_id = None
+        # global_id của xe đang tìm (None nếu biển số chưa gắn với xe nào)
+        search_global_id = plates.global_id_of(search_vehicle) if search_vehicle != "" else None
 
-        # YOLO + BoT-SORT tracking 
-        results = model.track(
-            frame,
-            persist=True,
-            conf=0.5,
-            verbose=False,
-            tracker=TRACKER_PATH
-        )
+        # Chỉ vẽ khi có người xem: cửa sổ imshow (không headless) hoặc client preview
+        send_preview = preview is not None and preview.wants_frame()
+        annotate = not HEADLESS or send_preview
 
-        boxes = results[0].boxes
+        # Chỉ vùng quanh slot / ReID được đưa vào motion gate và model
+        roi_image = frame if roi is None else roi.apply(frame)
 
-        if boxes.id is not None:
-            ids = boxes.id.int().tolist()
-            xyxy = boxes.xyxy.tolist()
+        # Motion gate: khung hình đứng yên thì dùng lại bbox lần detect trước
+        detect = stride is None or stride.should_detect(gate.moving(roi_image))
 
+        # YOLO + BoT-SORT tracking (frame bị motion gate bỏ qua: giữ nguyên ids, xyxy của lần trước)
+        if detect:
+            previous_ids = ids
+            if inference is not None:
+                ids, xyxy = inference.track(roi_image)
+            else:
+                results = model.track(
+                    roi_image,
+                    persist=True,
+                    conf=0.5,
+                    verbose=False,
+                    tracker=TRACKER_PATH
+                )
+                boxes = results[0].boxes
+                ids = boxes.id.int().tolist() if boxes.id is not None else []
+                xyxy = boxes.xyxy.tolist() if boxes.id is not None else []
+            if roi is not None:
+                ids, xyxy = roi.to_frame(ids, xyxy)
+            if stride is not None and set(ids) != set(previous_ids):
+                stride.tracks_changed()
+
+        if ids:
             for i, box in enumerate(xyxy):
                 obj_id = ids[i]
                 x1, y1, x2, y2 = map(int, box)
                 # ---------- Assign global ID immediately if cam is anchor ----------
                 if cam_id == 0:  # Camera 1 là ANCHOR
-                    key = f"c{cam_id}_{obj_id}"
-                    # Use lock to avoid races when anchor assigns new canonical id
-                    with lock:
-                        if key not in canonical_map:
-
-                            canonical_map[key] = int(next_canonical.value)
-                            next_canonical.value += 1
-
-                            global_id = canonical_map[key]
-
-                            # Nếu có biển số mới từ OCR (lưu vào shared license map)
-                            new_license_plate, user_id = get_new_license_plate_from_file()
-                            if new_license_plate != "":
-                                license_shared[global_id] = new_license_plate
-                                #print(f"[ADD LP] global_id {global_id} -> {new_license_plate}")
-
-                                # Tạo đối tượng vehicle mới cho bãi xe
-                                time_in = datetime.datetime.utcnow()+ datetime.timedelta(hours=7) 
-                                parked_vehicles = get_parked_vehicles_from_file()
-                                parked_vehicles['list'].append({
-                                    'user_id': user_id,
-                                    'customer_type': 'customer',
-                                    'time_in': time_in.isoformat(),
-                                    'license_plate': new_license_plate,
-                                    'slot_name': "",
-                                    'num_slot': 0 # 0 làm đỗ đúng, 1 là đổ sai
-                                })
-                                save_parked_vehicles_to_file(parked_vehicles)
-                                # POST
-                                #print("debug 3")
-                                #print(parked_vehicles)
-                                threading.Thread(target=update_parked_vehicle_list, args=(parked_vehicles,)).start()
-                                # Reset biến
-                                save_new_license_plate_to_file("")
+                    # IdMerger cấp canonical id + gán biển số mới (không lock trong camera process)
+                    reporter.new_track(obj_id, frame_ts)
                 # --------------------------------------------------------------------
 
                 # Kiểm tra object có đi qua điểm giao nào không
-                for item in intersections_coords:
-                    cid = item['id']
-                    x, y = item["coordinate"]
-                    if x1 <= x <= x2 and y1 <= y <= y2:
-                        coords_trackids[cid] = (int(obj_id), time.time())
+                for cid in coords.reid.inside((x1, y1, x2, y2)):
+                    reporter.cross(cid, int(obj_id), frame_ts)
 
                 # Lấy canonical_id
                 key = f"c{cam_id}_{obj_id}"
-                global_id = canonical_map.get(key)
+                global_id = identity.get(key)
                 
                 # Kiểm tra nếu xe này đang được tìm kiếm
-                if search_vehicle != "" and global_id is not None:
-                    vehicle_license = license_shared.get(global_id, "")
+                if search_global_id is not None and global_id is not None:
                     # So sánh case-insensitive (đã normalize search_vehicle thành uppercase)
-                    if vehicle_license == search_vehicle:
+                    if global_id == search_global_id:
                         # Chỉ process nếu chưa upload (tránh spam log và upload trùng)
                         if not searched_vehicle_uploaded.get(search_vehicle, False):
                             found_vehicle_in_this_camera = True
@@ -282,24 +291,23 @@ def process_video(video_path, window_name, model_path, cam_id,
                             found_vehicle_obj_id = obj_id
                             print(f"[SEARCH] ✓ MATCHED! Cam {cam_id} found vehicle {search_vehicle} (obj_id={obj_id}, global_id={global_id})")
                 
-                label = f"ID:{obj_id}/{int(global_id)}" if global_id else f"ID {obj_id}/-"
-                
-                # Vẽ bbox bình thường (không highlight)
-                cv2.rectangle(frame, (x1, y1), (x2, y2), (0,255,0), 2)
-                cv2.putText(frame, label, (x1 + 3, y1 - 3),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
+                if annotate:
+                    label = f"ID:{obj_id}/{int(global_id)}" if global_id else f"ID {obj_id}/-"
+
+                    # Vẽ bbox bình thường (không highlight)
+                    cv2.rectangle(frame, (x1, y1), (x2, y2), (0,255,0), 2)
+                    cv2.putText(frame, label, (x1 + 3, y1 - 3),
+                                cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
                 
             # CAMERA GỬI RẺ NHẤT – CHỈ GỬI ID và BOUNDING BOX
-            # Update the SHARED bbox dict (manager dict) passed from main
-            # Convert boxes to simple lists so manager proxy can serialize easily
-            # Thêm timestamp để kiểm tra detection có còn mới không
-            current_time = time.time()
-            bbox_shared[cam_id] = [
-                (int(ids[i]), [int(x) for x in xyxy[i]], current_time)
-                for i in range(len(ids))
-            ]
+            # Ghi thẳng vào ring buffer shared memory (kèm timestamp để kiểm tra detection có còn mới không)
+            ring.write(ids, xyxy, ts=frame_ts)
         else:
-            bbox_shared[cam_id] = []
+            ring.write([], [], ts=frame_ts)
+
+        # Occupancy slot theo frame (EMA + hysteresis) → bitmap shared memory cho check_occupied_slots
+        occupied, owner = hysteresis.update(coords.slots.match(xyxy), ids, now=frame_ts)
+        occupancy.write(occupied, owner, slot_layout[0])
 
         # Nếu tìm thấy xe đang được search và chưa upload
         if found_vehicle_in_this_camera and search_vehicle != "":
@@ -361,26 +369,32 @@ def process_video(video_path, window_name, model_path, cam_id,
                 if not upload_success:
                     searched_vehicle_uploaded[search_vehicle] = False
 
-        # Cập nhật dữ liệu detection của camera vào shared dict (để merge giữa các camera)
-        for k, v in coords_trackids.items():
-            coords_by_cam[cam_id][k] = v
-
-        # Merge ID giữa các camera
-        update_mappings_atomic(
-            coords_by_cam, lock, canonical_map, next_canonical,
-            time_tol=0.5, stale=1.0
-        )
+        if not annotate:
+            continue
 
         # Vẽ điểm giao
-        for item in intersections_coords:
-            cv2.circle(frame, (item['coordinate']), 5, (0, 0, 255), -1)
-        for item in read_yaml(slot_file):
-            cv2.circle(frame, (item['coordinate']), 5, (0, 255, 0), -1)
-
-        cv2.imshow(window_name, frame)
-        cv2.waitKey(1)
-
-    cap.release()
+        for x, y in coords.reid.points.tolist():
+            cv2.circle(frame, (x, y), 5, (0, 0, 255), -1)
+        for (x, y), polygon in zip(coords.slots.points.tolist(), coords.slots.polygons):
+            if polygon is not None:
+                cv2.polylines(frame, [np.array(polygon, dtype=np.int32)], True, (0, 255, 0), 2)
+            cv2.circle(frame, (x, y), 5, (0, 255, 0), -1)
+
+        if send_preview:
+            preview.publish(frame)
+        if not HEADLESS:
+            cv2.imshow(window_name, frame)
+            cv2.waitKey(1)
+
+    grabber.log_stats()
+    grabber.release()
+    if stride is not None:
+        stride.log_stats()
+    if preview is not None:
+        preview.stop()
+    ring.close()
+    if inference is not None:
+        inference.close()
 
 
 def get_global_id_by_license_plate(license_plate):
@@ -392,14 +406,13 @@ def get_global_id_by_license_plate(license_plate):
         from app.modules.tracking_car import get_global_id_by_license_plate
         global_id = get_global_id_by_license_plate("30A-12345")
     """
-    # Tìm trong license map
-    for global_id, plate in globals.global_id_license_plate_map.items():
-        if plate == license_plate:
-            return global_id
-    return None
+    # Tra index ngược biển số → global_id
+    if globals.plate_index is None:
+        return None
+    return globals.plate_index.global_id_of(license_plate)
 
 
-def is_vehicle_being_tracked(license_plate, canonical_map=None):
+def is_vehicle_being_tracked(license_plate, identity=None):
     """
     Kiểm tra xe có biển số này có đang được tracking không.
     Trả về (is_tracked, global_id, cameras_info)
@@ -410,30 +423,29 @@ def is_vehicle_being_tracked(license_plate, canonical_map=None):
     
     Args:
         license_plate: Biển số xe cần kiểm tra
-        canonical_map: (Optional) Nếu None sẽ dùng từ globals
+        identity: (Optional) IdentityStore, nếu None sẽ dùng từ globals
     
     Returns:
         tuple: (is_tracked: bool, global_id: int|None, cameras_info: list)
     """
-    # Lấy canonical_map từ globals nếu không truyền vào
-    if canonical_map is None:
-        canonical_map = globals.canonical_map
-        if canonical_map is None:
-            print("[WARNING] canonical_map not initialized yet")
+    # Lấy identity store từ globals nếu không truyền vào
+    if identity is None:
+        identity = globals.identity_store
+        if identity is None:
+            print("[WARNING] identity_store not initialized yet")
             return (False, None, [])
     
-    # QUAN TRỌNG: bbox_by_cam phải là manager.dict được share giữa processes
-    bbox_by_cam = globals.bbox_by_cam
-    if bbox_by_cam is None:
-        print("[WARNING] bbox_by_cam not initialized yet")
+    # QUAN TRỌNG: detection_rings là ring buffer shared memory do các camera process ghi
+    detection_rings = globals.detection_rings
+    if detection_rings is None:
+        print("[WARNING] detection_rings not initialized yet")
         return (False, None, [])
     
     global_id = get_global_id_by_license_plate(license_plate)
     
     print(f"[DEBUG is_vehicle_being_tracked] License: {license_plate}")
     print(f"[DEBUG] Found global_id: {global_id}")
-    print(f"[DEBUG] globals.global_id_license_plate_map: {dict(globals.global_id_license_plate_map)}")
-    print(f"[DEBUG] bbox_by_cam type: {type(bbox_by_cam)}")
+    print(f"[DEBUG] globals.plate_index: {globals.plate_index.snapshot()}")
     
     if global_id is None:
         print(f"[DEBUG] global_id is None, returning (False, None, [])")
@@ -441,49 +453,33 @@ def is_vehicle_being_tracked(license_plate, canonical_map=None):
     
     # KIỂM TRA QUAN TRỌNG: Xác minh global_id này VẪN thuộc về license_plate này
     # (Tránh trường hợp global_id bị tái sử dụng cho xe khác)
-    current_license_for_gid = globals.global_id_license_plate_map.get(global_id)
+    current_license_for_gid = globals.plate_index.plate_of(global_id)
     if current_license_for_gid != license_plate:
         print(f"[DEBUG] global_id {global_id} hiện tại thuộc về '{current_license_for_gid}', không phải '{license_plate}'")
         print(f"[DEBUG] Xe {license_plate} không còn được track (global_id đã được tái sử dụng)")
         return (False, None, [])
     
-    # Tìm xe đang được track ở camera nào
+    # Tìm xe đang được track ở camera nào: chỉ so với các track local thuộc global_id này
+    members = identity.members(global_id)
+    print(f"[DEBUG] global_id {global_id} members: {sorted(members)}")
     cameras_tracking = []
     current_time = time.time()
     DETECTION_TIMEOUT = 2.0  # Chỉ coi là đang track nếu detect trong vòng 2 giây gần nhất
     
     print(f"[DEBUG] Checking {len(VIDEO_SOURCES)} cameras...")
-    print(f"[DEBUG] bbox_by_cam keys: {list(bbox_by_cam.keys())}")
     for cam_idx in range(len(VIDEO_SOURCES)):
-        bboxes = bbox_by_cam.get(cam_idx, [])
+        bboxes = detection_rings[cam_idx].read_bboxes()
         print(f"[DEBUG] Camera {cam_idx}: {len(bboxes)} bboxes")
-        for bbox_data in bboxes:
-            # Xử lý cả format cũ (obj_id, box) và format mới (obj_id, box, timestamp)
-            if len(bbox_data) == 2:
-                obj_id, box = bbox_data
-                timestamp = current_time  # Fallback: coi như mới nếu không có timestamp
-            elif len(bbox_data) == 3:
-                obj_id, box, timestamp = bbox_data
-            else:
-                continue
-            
+        for obj_id, box, timestamp in bboxes:
             # KIỂM TRA QUAN TRỌNG: Detection có còn mới không?
             time_diff = current_time - timestamp
             if time_diff > DETECTION_TIMEOUT:
                 print(f"[DEBUG]   SKIP obj_id={obj_id}: detection quá cũ ({time_diff:.2f}s)")
                 continue
             
-            # Kiểm tra key trong canonical_map
+            # Kiểm tra key có thuộc global_id không
             key = f"c{cam_idx}_{obj_id}"
-            gid = canonical_map.get(key)
-            print(f"[DEBUG]   Checking obj_id={obj_id}, key={key}, gid={gid}, target_global_id={global_id}, age={time_diff:.2f}s")
-            if gid == global_id:
-                # Double-check: global_id này có đúng license_plate đang tìm không?
-                verified_license = globals.global_id_license_plate_map.get(gid)
-                print(f"[DEBUG]   Double-check: gid {gid} -> license '{verified_license}' (looking for '{license_plate}')")
-                if verified_license != license_plate:
-                    print(f"[DEBUG]   SKIP: global_id {gid} không còn thuộc về {license_plate}")
-                    continue
+            if key in members:
                 print(f"[DEBUG] ✓ MATCH FOUND! Camera {cam_idx}, obj_id {obj_id}, bbox {box}, age={time_diff:.2f}s")
                 cameras_tracking.append({
                     'camera_id': cam_idx,
@@ -500,7 +496,7 @@ def is_vehicle_being_tracked(license_plate, canonical_map=None):
     return (is_tracked, global_id, cameras_tracking)
 
 
-def print_tracking_status(license_plate, canonical_map=None):
+def print_tracking_status(license_plate, identity=None):
     """
     In ra thông tin chi tiết về trạng thái tracking của xe.
     Dùng để debug.
@@ -511,16 +507,16 @@ def print_tracking_status(license_plate, canonical_map=None):
     
     Args:
         license_plate: Biển số xe cần kiểm tra
-        canonical_map: (Optional) Nếu None sẽ dùng từ globals
+        identity: (Optional) IdentityStore, nếu None sẽ dùng từ globals
     """
-    # Lấy canonical_map từ globals nếu không truyền vào
-    if canonical_map is None:
-        canonical_map = globals.canonical_map
-        if canonical_map is None:
+    # Lấy identity store từ globals nếu không truyền vào
+    if identity is None:
+        identity = globals.identity_store
+        if identity is None:
             print("[ERROR] Tracking system not initialized yet!")
             return
     
-    is_tracked, global_id, cameras = is_vehicle_being_tracked(license_plate, canonical_map)
+    is_tracked, global_id, cameras = is_vehicle_being_tracked(license_plate, identity)
     
     # print(f"\n{'='*60}")
     # print(f"TRACKING STATUS: {license_plate}")
@@ -570,9 +566,8 @@ def check_parking_vehicle_valid():
                     print(f"⚠️ CẢNH BÁO: Xe {license_plate} chưa được gán vị trí đỗ trong 20 giây!") #20s-30s
                     threading.Thread(target=speech_text, args=(f"Cảnh báo! Xe biển số {license_plate} đỗ sai vị trí!",)).start()
                     if empty_slot_count[license_plate] == 3:
-                        # Cập nhật num_slot = 1 (đỗ sai vị trí)
-                        vehicle.update({'num_slot': 1})
-                        wrong_slot = True
+                        # Cập nhật num_slot = 1 (đỗ sai vị trí) - chỉ update đúng dòng của xe này
+                        wrong_slot = get_parked_vehicle_store().update_slot(license_plate, num_slot=1) or wrong_slot
             else:
                 # Nếu đã có slot_name → reset counter
                 if license_plate in empty_slot_count:
@@ -580,8 +575,7 @@ def check_parking_vehicle_valid():
         if wrong_slot:
             # POST cập nhật danh sách xe đậu
             #print("debug 1")
-            save_parked_vehicles_to_file(parked_vehicles)
-            threading.Thread(target=update_parked_vehicle_list, args=(parked_vehicles,)).start()
+            sync_parked_vehicles()
         time.sleep(10)  # Kiểm tra mỗi 10 giây
 
 def update_parked_vehicle_info(occupied_list, occupied_license_list):
@@ -599,157 +593,101 @@ def update_parked_vehicle_info(occupied_list, occupied_license_list):
         license_to_slots[lic].append(slot)
 
     # -------------------------------
-    # 2. Cập nhật parked_vehicles
+    # 2. Cập nhật parked_vehicles (update theo dòng, 1 transaction)
     # -------------------------------
-    parked_vehicles = get_parked_vehicles_from_file()
-    for vehicle in parked_vehicles['list']:
+    store = get_parked_vehicle_store()
+    updates = {}
+    for vehicle in store.get_all()['list']:
         lic = vehicle['license_plate']
         if lic in license_to_slots:
             slots = license_to_slots[lic]
-
-            vehicle['slot_name'] = ", ".join(slots)  
+            slot_name = ", ".join(slots)
             if len(slots) < 2:           
-                vehicle['num_slot'] = 0
+                updates[lic] = (slot_name, 0)
             else:
-                vehicle['num_slot'] = 1
+                updates[lic] = (slot_name, 1)
                 # WARNING: xe đỗ sai vị trí (trường hợp 1)
-                print(f"⚠️ CẢNH BÁO: Xe {lic} đỗ sai vị trí tại các slot {vehicle['slot_name']}!")
+                print(f"⚠️ CẢNH BÁO: Xe {lic} đỗ sai vị trí tại các slot {slot_name}!")
                 threading.Thread(target=speech_text, args=(f"Cảnh báo! Xe biển số {lic} đỗ sai vị trí!",)).start()
         else:
-            vehicle['slot_name'] = ""
-            vehicle['num_slot'] = 0
+            updates[lic] = ("", 0)
+    store.update_slots(updates)
     # POST
     #print("debug 2")
-    save_parked_vehicles_to_file(parked_vehicles)
-    update_parked_vehicle_list(parked_vehicles)
+    sync_parked_vehicles()
 
 
-def check_occupied_slots(canonical_map):
-    CHECK_INTERVAL = 2       # kiểm tra mỗi 2s
-    DELAY_TIME = 6          # yêu cầu ổn định 6s
+def check_occupied_slots(identity):
+    CHECK_INTERVAL = 2       # lấy mẫu mỗi 2s
+    DEBOUNCE_TIME = 2        # hysteresis đã làm ở camera; ở đây chỉ cần xác nhận thêm 1 mẫu
 
-    last_check_time = 0
-    delay_counter = 0
+    # Slot id theo từng camera (chỉ đọc lại YAML khi file thay đổi) - thứ tự khớp bitmap của camera
+    coord_stores = {cam_idx: CoordinateStore.for_camera(cam_idx) for cam_idx in range(len(VIDEO_SOURCES))}
+    slot_indexes = {cam_idx: store.slots for cam_idx, store in coord_stores.items()}
+    machine = SlotStateMachine(debounce=DEBOUNCE_TIME)
+    machine.add_listener(on_slot_events)
 
-    candidate_state = None
-    confirmed_state = None
+    def plate_of(cam_idx, obj_id):
+        gid = identity.lookup(f"c{cam_idx}_{obj_id}")
+        if gid is None:
+            return "UNKNOWN"
+        return globals.plate_index.plate_of(gid, "UNKNOWN")
 
+    last_key = None
+    sample = {}
     while True:
-        time. sleep(1)
-        now = time.time()
-        if now - last_check_time < CHECK_INTERVAL:
-            continue
+        time.sleep(CHECK_INTERVAL)
 
-        last_check_time = now
         # =============================================================
-        # 1.  TÍNH DANH SÁCH SLOT TỪ HAI CAMERA MỖI 2s
+        # 1. OR BITMAP OCCUPANCY (đã qua hysteresis) CỦA CÁC CAMERA
         # =============================================================
-        occupied_set = set()              # ID slot bị che
-        license_map = {}                  # map slot_id → license
-
-        # Đọc toàn bộ slot (để biết tổng số slot)
-        all_slot_ids = set()
-
-        # KIỂM TRA MỖI CAMERA VỚI SLOT CỦA CHÍNH NÓ
-        for cam_idx in range(len(VIDEO_SOURCES)):     
-            slots = read_yaml(SLOT_COORDS_PATH+str(cam_idx)+'.yml')
-            
-            # Lưu tất cả slot IDs
-            for s in slots:
-                all_slot_ids.add(s["id"])
-            
-            # Lấy bbox từ camera tương ứng
-            bboxes = globals.bbox_by_cam. get(cam_idx, [])
-            
-            # Kiểm tra từng slot của camera này
-            for s in slots:
-                slot_id = s["id"]
-                sx, sy = s["coordinate"]
-                
-                # Chỉ kiểm tra với bbox từ camera này
-                for bbox_data in bboxes:
-                    # Xử lý cả format cũ (obj_id, box) và format mới (obj_id, box, timestamp)
-                    if len(bbox_data) == 2:
-                        obj_id, box = bbox_data
-                    elif len(bbox_data) == 3:
-                        obj_id, box, timestamp = bbox_data
-                    else:
-                        continue
-                    
-                    x1, y1, x2, y2 = map(int, box)
-                    
-                    if x1 <= sx <= x2 and y1 <= sy <= y2:
-                        occupied_set.add(slot_id)
-                        
-                        key = f"c{cam_idx}_{obj_id}"
-                        gid = canonical_map.get(key)
-                        
-                        if gid is not None:
-                            plate = globals.global_id_license_plate_map.get(gid, "UNKNOWN")
-                        else:
-                            plate = "UNKNOWN"
-                        
-                        license_map[slot_id] = plate
-                        break  # slot này đã bị chiếm, không cần check bbox khác
-        
-        # print("Occupied slots:", occupied_set)
-        # print("Available slots:", all_slot_ids - occupied_set)
-        # print("License map:", license_map)
-        
-        # Danh sách
-        globals.occupied_list = sorted(list(occupied_set))
-        globals.available_list = sorted(list(all_slot_ids - occupied_set))
-
-        # Danh sách biển số theo đúng thứ tự slot trong occupied_list
-        globals.license_occupied_list = [license_map.get(sid, "UNKNOWN") for sid in globals.occupied_list]
-        
-        # Đây là state mới
-        new_state = {
-            "occupied_list": globals.occupied_list,
-            "available_list": globals. available_list,
-            "license_occupied_list": globals.license_occupied_list
-        }
-
-        # =============================================================
-        # 2.  DELAY WINDOW – PHẢI ỔN ĐỊNH TRONG 6s
-        # =============================================================
-        if candidate_state is None:
-            candidate_state = new_state
-            delay_counter = 1
-            continue
-
-        if new_state == candidate_state:
-            delay_counter += 1
-        else:
-            candidate_state = new_state
-            delay_counter = 1
-
-        # Chưa đủ delay → bỏ qua
-        if delay_counter * CHECK_INTERVAL < DELAY_TIME:
-            continue
+        coords_changed = False
+        seqs = []
+        bitmaps = {}
+        for cam_idx, store in coord_stores.items():
+            coords_changed = store.refresh() or coords_changed
+            seq, _, layout, occupied, owner = globals.occupancy_bitmaps[cam_idx].read()
+            seqs.append(seq)
+            bitmaps[cam_idx] = (layout, occupied, owner)
+
+        # Dọn track local đã chết (không còn detect quá IDENTITY_TTL) khỏi IdentityStore
+        live_keys = []
+        for cam_idx, ring in globals.detection_rings.items():
+            _, _, ids, _ = ring.read()
+            live_keys.extend(f"c{cam_idx}_{int(obj_id)}" for obj_id in ids)
+        identity.evict(live_keys)
+
+        # Fast path: bitmap, tọa độ, biển số, canonical không đổi → mẫu giữ nguyên
+        key = (tuple((layout, occupied.tobytes(), owner.tobytes()) for layout, occupied, owner in bitmaps.values()),
+               globals.plate_index.version.value, identity.version.value)
+        if coords_changed or key != last_key:
+            sample = occupancy_from_bitmaps(slot_indexes, bitmaps, plate_of, previous=sample)
+            last_key = key
 
         # =============================================================
-        # 3. KẾT QUẢ ỔN ĐỊNH → IN NẾU CÓ THAY ĐỔI
+        # 2. XÁC NHẬN TỪNG SLOT → listener chỉ chạy khi có slot đổi trạng thái
         # =============================================================
-        if confirmed_state != new_state:
-            # print("===== SLOT STATUS CHANGED =====")
-            # print("OCCUPIED:", new_state["occupied_list"])
-            # print("AVAILABLE:", new_state["available_list"])
-            # print("LICENSE_OCCUPIED:", new_state["license_occupied_list"])
-            # print("================================")
-            confirmed_state = new_state
-            # Gửi dữ liệu thay đổi lên cloud server 
-            parking_slot_data = {
-                'parking_id': PARKING_ID,
-                'available_list': new_state["available_list"],
-                'occupied_list': new_state["occupied_list"],
-                'occupied_license_list': new_state["license_occupied_list"]
-            }
-            # POST
-            threading.Thread(target=update_parked_vehicle_info, args=(new_state["occupied_list"], new_state["license_occupied_list"])).start()
-            threading.Thread(target=update_parking_lot, args=(parking_slot_data,)).start()
-            # Update Screen
-            threading.Thread(target=update_screen_display, args=(new_state["occupied_list"], new_state["available_list"])).start()
+        machine.update(sample)
+
+
+def on_slot_events(events, machine):
+    """Có slot vừa được xác nhận đổi trạng thái: cập nhật globals, parked vehicles, cloud, màn hình."""
+    occupied_list, available_list, license_occupied_list = machine.lists()
+    globals.occupied_list = occupied_list
+    globals.available_list = available_list
+    globals.license_occupied_list = license_occupied_list
+    # for e in events:
+    #     print(f"[SLOT] {e.slot_id}: {e.old} -> {e.new}")
+    update_parked_vehicle_info(occupied_list, license_occupied_list)
+    # POST (write-behind)
+    push_parking_lot({
+        'parking_id': PARKING_ID,
+        'available_list': available_list,
+        'occupied_list': occupied_list,
+        'occupied_license_list': license_occupied_list
+    })
+    # Update Screen
+    update_screen_display(occupied_list, available_list)
 
 def start_tracking_car():
     manager = Manager()
@@ -757,14 +695,13 @@ def start_tracking_car():
         'parking_id': PARKING_ID,
         'list': []
     }
-    save_new_license_plate_to_file("", "")
+    entry_channel.clear()
     save_parked_vehicles_to_file(parked_vehicles)
     # barrier count = number of camera processes
     start_barrier = Barrier(len(VIDEO_SOURCES))
 
     # Khởi tạo shared memory cho bbox và slot
     # Use explicit shared objects and pass them to child processes (important for 'spawn' start method)
-    shared_bbox_by_cam = manager.dict()
     shared_license_map = manager.dict()
     
     # Khởi tạo hoặc lấy search_vehicle_shared từ main
@@ -780,7 +717,9 @@ def start_tracking_car():
     # Shared dict để đảm bảo chỉ upload 1 lần cho mỗi search_vehicle
     searched_vehicle_uploaded = manager.dict()
 
-    globals.bbox_by_cam = shared_bbox_by_cam
+    # Mỗi camera 1 ring buffer shared memory (main process sở hữu và unlink khi kết thúc)
+    detection_rings = {i: DetectionRing.create() for i in range(len(VIDEO_SOURCES))}
+    globals.detection_rings = detection_rings
     globals.global_id_license_plate_map = shared_license_map
 
     camera_configs = []
@@ -789,12 +728,7 @@ def start_tracking_car():
     # Tải tọa độ song song bằng threads để nhanh hơn
     def load_camera_coords(cam_idx):
         try:
-            cam = get_coordinates(PARKING_ID, str(cam_idx))
-            if cam is not None:
-                slot_coordinates_data = cam.get('coordinates_list')
-                reid_coordinates_data = cam.get('coordinates_reid_list')
-                write_yaml_file(f"{SLOT_COORDS_PATH}{cam_idx}.yml", slot_coordinates_data)
-                write_yaml_file(f"{REID_COORDS_PATH}{cam_idx}.yml", reid_coordinates_data)
+            if sync_from_cloud(PARKING_ID, cam_idx) is not None:
                 print(f"[INFO] Camera {cam_idx} coordinates loaded")
         except Exception as e:
             print(f"[WARNING] Failed to load camera {cam_idx} coordinates: {e}")
@@ -803,7 +737,6 @@ def start_tracking_car():
     coord_threads = []
     for i, cam_source in enumerate(VIDEO_SOURCES):
         camera_configs.append((VIDEO_SOURCES[i], f"Camera {i}", REID_COORDS_PATH+str(i)+'.yml', SLOT_COORDS_PATH+str(i)+'.yml'))
-        globals.bbox_by_cam[i] = []
         t = threading.Thread(target=load_camera_coords, args=(i,))
         t.start()
         coord_threads.append(t)
@@ -813,40 +746,86 @@ def start_tracking_car():
         t.join()
     
     print("[INFO] All camera coordinates loaded")
+    # Mỗi camera 1 bitmap occupancy (slot có xe + track id chiếm slot) sau hysteresis,
+    # kích thước theo số slot trong file tọa độ vừa tải
+    occupancy_bitmaps = {}
+    for i in range(len(VIDEO_SOURCES)):
+        num_slots = len(CoordinateStore.for_camera(i).slots)
+        occupancy_bitmaps[i] = OccupancyBitmap.create(num_slots)
+        if num_slots > MAX_SLOTS:
+            print(f"[INFO] Camera {i}: {num_slots} slots, occupancy bitmap sized for {occupancy_bitmaps[i].capacity}")
+    globals.occupancy_bitmaps = occupancy_bitmaps
+    # Tọa độ trên cloud thay đổi → ghi lại YAML, camera process tự hot-reload
+    start_watch_cloud_coordinates(PARKING_ID, range(len(VIDEO_SOURCES)), COORDINATES_SYNC_INTERVAL)
 
     num_cams = len(camera_configs)
 
-    # 1-indexed: index 0 bỏ trống
-    coords_by_cam = [manager.dict() for _ in range(num_cams)]
-    lock = manager.Lock()
+    set_start_method("spawn", force=True)
+
+    # Map ID toàn cục: IdentityStore (union-find) ở main process, key = "c{cam}_{track}" → canonicalID
+    # canonical_map là mirror cho camera process, identity_version tăng mỗi lần mirror thay đổi
+    # Index biển số ↔ global_id: ghi ở main process, camera đọc qua cache theo plate_version
+    plate_version = Value('q', 0)
+    plate_index = PlateIndex(shared_license_map, plate_version)
 
-    # Map ID toàn cục: key = "c{cam}_{track}" → canonicalID
     canonical_map = manager.dict()
-    
-    # Lưu canonical_map vào globals để có thể truy cập từ bên ngoài
+    identity_version = Value('q', 0)
+    identity = IdentityStore(canonical_map, identity_version, ttl=IDENTITY_TTL, on_relabel=plate_index.relabel,
+                             on_drop=plate_index.unbind)
+
+    # Lưu vào globals để có thể truy cập từ bên ngoài
     globals.canonical_map = canonical_map
+    globals.identity_store = identity
+    globals.plate_index = plate_index
 
-    # Counter cho canonical ID 
-    next_canonical = manager.Value('i', 1)
-
-    set_start_method("spawn", force=True)
+    # Merge ID giữa các camera: camera gửi sự kiện, 1 thread IdMerger ở main process cấp canonical ID
+    merge_events = Queue()
+    merger = IdMerger(merge_events, identity, time_tol=MERGE_TIME_TOL, stale=MERGE_STALE,
+                      on_new_canonical=lambda gid, ts: register_new_vehicle(gid, plate_index, ts))
+    merger.start()
 
     procs = []
 
+    # Backend model tracking (TRACK_MODEL_FORMAT): export 1 lần ở main process trước khi các camera load
+    model_path = export_detect_model(DETECT_MODEL_PATH)
+
+    # Chế độ inference server: 1 process giữ model và chạy batch cho tất cả camera
+    inference_server = None
+    request_queue = None
+    result_queues = []
+    if INFERENCE_SERVER:
+        request_queue = Queue()
+        result_queues = [Queue() for _ in range(num_cams)]
+        inference_server = Process(target=start_inference_server, args=(model_path, request_queue, result_queues))
+        inference_server.start()
+
     # Khởi tạo mỗi camera thành 1 process riêng
     for idx, (video_path, window_name, intersections_file, slot_file) in enumerate(camera_configs, start=0):
         p = Process(target=process_video, args=(
-            video_path, window_name, DETECT_MODEL_PATH, idx,
-            coords_by_cam, lock, canonical_map, next_canonical, intersections_file, slot_file, start_barrier,
-            shared_bbox_by_cam, shared_license_map, shared_search_vehicle, searched_vehicle_uploaded
+            video_path, window_name, model_path, idx,
+            merge_events, canonical_map, identity_version, intersections_file, slot_file, start_barrier,
+            detection_rings[idx].name, occupancy_bitmaps[idx].name, shared_license_map, plate_version,
+            shared_search_vehicle, searched_vehicle_uploaded,
+            (request_queue, result_queues[idx]) if INFERENCE_SERVER else None
         ))
         p.start()
         procs.append(p)
 
     # Bắt đầu kiểm tra slot (thread chạy trong main process, dùng shared dicts)
-    threading.Thread(target=check_occupied_slots, args=(canonical_map,), daemon=True).start()
+    threading.Thread(target=check_occupied_slots, args=(identity,), daemon=True).start()
     threading.Thread(target=check_parking_vehicle_valid, daemon=True).start()
     for p in procs:
         p.join()
 
-    cv2.destroyAllWindows()
\ No newline at end of file
+    merge_events.put(None)
+    if inference_server is not None:
+        request_queue.put(None)
+        inference_server.join()
+    for ring in detection_rings.values():
+        ring.close()
+    for bitmap in occupancy_bitmaps.values():
+        bitmap.close()
+    flush_outboxes()
+    get_parked_vehicle_sync().flush()
+    if not HEADLESS:
+        cv2.destroyAllWindows()
\ No newline at end of file
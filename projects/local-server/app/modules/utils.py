@@ -7,6 +7,7 @@ from gtts import gTTS
 import numpy as np
 import json
 from app.modules import globals
+from app.modules.parked_vehicle_store import get_parked_vehicle_store
 import datetime
 
 def tracking_objects2(tracker, image, detections):
@@ -150,33 +151,15 @@ def play_sound(file_name):
     player = vlc.MediaPlayer("app/resources/mp3/" + file_name)
     player.play()
 
+# Danh sách xe đang đỗ: lưu trong SQLite (parked_vehicle_store), giữ nguyên dạng dict cũ cho caller
 def get_parked_vehicles_from_file():
-    with open("app/resources/database/parked_vehicles.json", "r", encoding="utf-8") as f:
-        parked_vehicles = json.load(f)
-    return parked_vehicles
+    return get_parked_vehicle_store().get_all()
 
 def get_parked_vehicles_by_license_plate(license_plate):
-    parked_vehicles = get_parked_vehicles_from_file()
-    for vehicle in parked_vehicles['list']:
-        if vehicle['license_plate'] == license_plate:
-            return vehicle
-    return None
+    return get_parked_vehicle_store().get_by_license_plate(license_plate)
 
 def save_parked_vehicles_to_file(parked_vehicles):
-    with open("app/resources/database/parked_vehicles.json", "w", encoding="utf-8") as f:
-        json.dump(parked_vehicles, f, ensure_ascii=False, indent=4)
-
-def get_new_license_plate_from_file():
-    with open("app/resources/database/new_license.json", "r", encoding="utf-8") as f:
-        data = json.load(f)
-    return data["new_license"], data["user_id"]
-
-def save_new_license_plate_to_file(new_license_plate, user_id=""):
-    with open("app/resources/database/new_license.json", "w", encoding="utf-8") as f:
-        json.dump({
-            "new_license": new_license_plate,
-            "user_id": user_id
-        }, f, ensure_ascii=False, indent=4)
+    get_parked_vehicle_store().replace_all(parked_vehicles)
 
 def update_screen_display(occupied_list, available_list):
     """
@@ -267,41 +250,25 @@ def remove_vehicle_from_system(license_plate):
     
     # 1. Tìm global_id từ license_plate
     global_id_to_remove = None
-    for global_id, plate in dict(globals.global_id_license_plate_map).items():
-        if plate == license_plate:
-            global_id_to_remove = global_id
-            break
+    if globals.plate_index is not None:
+        global_id_to_remove = globals.plate_index.global_id_of(license_plate)
     
     if global_id_to_remove:
         result['global_id'] = global_id_to_remove
     
-    # 2. Xóa khỏi parked_vehicles.json
+    # 2. Xóa khỏi danh sách xe đang đỗ (xóa đúng 1 dòng theo biển số)
     try:
-        parked_vehicles = get_parked_vehicles_from_file()
-        original_count = len(parked_vehicles['list'])
-        
-        # Tìm và lưu thông tin xe trước khi xóa
-        vehicle_found = None
-        new_list = []
-        for vehicle in parked_vehicles['list']:
-            if vehicle['license_plate'] == license_plate:
-                vehicle_found = vehicle
-                result['vehicle_info'] = vehicle
-            else:
-                new_list.append(vehicle)
-        
-        parked_vehicles['list'] = new_list
-        save_parked_vehicles_to_file(parked_vehicles)
-        
-        removed_from_file = original_count > len(new_list)
+        vehicle_found = get_parked_vehicle_store().remove(license_plate)
+        result['vehicle_info'] = vehicle_found
+        removed_from_file = vehicle_found is not None
         
         if removed_from_file:
-            print(f"[REMOVE] Đã xóa xe {license_plate} khỏi parked_vehicles.json")
+            print(f"[REMOVE] Đã xóa xe {license_plate} khỏi parked_vehicles")
         else:
-            print(f"[INFO] Xe {license_plate} không tồn tại trong parked_vehicles.json")
+            print(f"[INFO] Xe {license_plate} không tồn tại trong parked_vehicles")
             
     except Exception as e:
-        print(f"[ERROR] Lỗi khi xóa khỏi parked_vehicles.json: {e}")
+        print(f"[ERROR] Lỗi khi xóa khỏi parked_vehicles: {e}")
         result['message'] = f"Lỗi xóa file: {e}"
         return result
     
@@ -309,30 +276,20 @@ def remove_vehicle_from_system(license_plate):
     removed_from_map = False
     if global_id_to_remove is not None:
         try:
-            if global_id_to_remove in globals.global_id_license_plate_map:
-                del globals.global_id_license_plate_map[global_id_to_remove]
+            if globals.plate_index.unbind(global_id_to_remove) is not None:
                 removed_from_map = True
                 print(f"[REMOVE] Đã xóa mapping: global_id {global_id_to_remove} -> {license_plate}")
             else:
                 print(f"[INFO] Global ID {global_id_to_remove} không tồn tại trong map")
             
-            # QUAN TRỌNG: Xóa TẤT CẢ keys trong canonical_map liên quan đến global_id này
-            # Để tránh global_id bị tái sử dụng nhầm cho xe khác
-            if globals.canonical_map is not None:
-                keys_to_remove = []
-                for key, gid in dict(globals.canonical_map).items():
-                    if gid == global_id_to_remove:
-                        keys_to_remove.append(key)
-                
-                for key in keys_to_remove:
-                    try:
-                        del globals.canonical_map[key]
-                        print(f"[REMOVE] Đã xóa canonical_map key: {key} -> {global_id_to_remove}")
-                    except Exception as e:
-                        print(f"[ERROR] Không thể xóa key {key}: {e}")
-                
-                if keys_to_remove:
-                    print(f"[REMOVE] Đã xóa {len(keys_to_remove)} keys từ canonical_map")
+            # QUAN TRỌNG: Xóa TẤT CẢ keys local (c{cam}_{tid}) thuộc global_id này
+            # Để tránh global_id bị tái sử dụng nhầm cho xe khác (IdentityStore giữ sẵn danh sách member)
+            if globals.identity_store is not None:
+                keys_removed = globals.identity_store.remove(global_id_to_remove)
+                for key in keys_removed:
+                    print(f"[REMOVE] Đã xóa canonical_map key: {key} -> {global_id_to_remove}")
+                if keys_removed:
+                    print(f"[REMOVE] Đã xóa {len(keys_removed)} keys từ canonical_map")
         except Exception as e:
             print(f"[ERROR] Lỗi khi xóa khỏi global_id_license_plate_map: {e}")
     else:
@@ -350,7 +307,8 @@ def remove_vehicle_from_system(license_plate):
     return result
 
 from app.modules.tracking_car import is_vehicle_being_tracked
-from app.modules.cloud_api import insert_history, update_parked_vehicle_list
+from app.modules.cloud_api import insert_history
+from app.modules.parked_vehicle_sync import sync_parked_vehicles
 from app.resources.print_bill.print_bill import printting, write_file_pdf
 import datetime
 def verify_car_out(license_plate):
@@ -406,13 +364,9 @@ def verify_car_out(license_plate):
                 'total_price': total_price
             })
             print(f"[VERIFY] Đã tạo history cho xe {license_plate}: {parking_time_hours}h, {total_price} VNĐ")
-            # Update parked_vehicles.json
-            parked_vehicles = get_parked_vehicles_from_file()
-            new_list = [v for v in parked_vehicles['list'] if v['license_plate'] != license_plate]
-            parked_vehicles['list'] = new_list
-            save_parked_vehicles_to_file(parked_vehicles)
-            update_parked_vehicle_list(parked_vehicles)
-            print(f"[VERIFY] Đã cập nhật parked_vehicles.json sau khi xe {license_plate} ra khỏi bãi.")
+            # Xe đã bị xóa khỏi store ở remove_vehicle_from_system → đồng bộ danh sách lên cloud
+            sync_parked_vehicles()
+            print(f"[VERIFY] Đã cập nhật parked_vehicles sau khi xe {license_plate} ra khỏi bãi.")
             # Print bill
             write_file_pdf(
                 date=time_out.strftime("%d/%m/%Y-%H:%M:%S"),
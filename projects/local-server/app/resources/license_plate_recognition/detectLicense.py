@@ -40,43 +40,31 @@ def detectLicense(id):
         # Sử dụng mô hình YOLO để phát hiện biển số xe trong khung hình
         plates = yolo_LP_detect(frame, size=640)
 
-        # Lấy danh sách các biển số xe được phát hiện (tọa độ bounding box)
-        list_plates = plates.pandas().xyxy[0].values.tolist()
+        # Lấy danh sách các biển số xe được phát hiện (tọa độ bounding box, tensor (N, 6) → list)
+        list_plates = plates.xyxy[0].tolist()
 
         # Tạo một tập hợp để lưu các biển số xe đã đọc
         list_read_plates = set()
 
-        # Lặp qua tất cả các biển số xe được phát hiện
+        # Cắt hình ảnh của tất cả biển số xe từ khung hình
+        crops = []
         for plate in list_plates:
-            flag = 0  # Cờ để kiểm tra xem biển số đã được nhận diện chưa
             x = int(plate[0]) # Lấy tọa độ xmin của bounding box
             y = int(plate[1]) # Lấy tọa độ ymin của bounding box
             w = int(plate[2] - plate[0]) # Tính toán chiều rộng của bounding box
             h = int(plate[3] - plate[1]) # Tính toán chiều cao của bounding box
+            crops.append(frame[y:y+h, x:x+w])
 
-            # Cắt hình ảnh của biển số xe từ khung hình
-            crop_img = frame[y:y+h, x:x+w]
-
-            lp = ""  # Biến để lưu biển số xe đã nhận diện
-                
-            # Thử deskew (cân chỉnh góc) biển số xe theo nhiều góc khác nhau để nhận diện
-            for cc in range(0, 2):  # Vòng lặp theo trục X
-                for ct in range(0, 2):  # Vòng lặp theo trục Y
-                    # Đọc biển số xe từ hình ảnh đã cân chỉnh góc
-                    lp = helper.read_plate(yolo_license_plate, utils_rotate.deskew(crop_img, cc, ct))
-                    # Nếu biển số được nhận diện không phải "unknown"
-                    if lp != "unknown":
-                        # Thêm biển số đã nhận diện vào danh sách
-                        list_read_plates.add(lp)
-                        
-                        # 
-                        if lp_temp != lp:
-                            lp_temp = lp
-                            print(lp)
-                            vid.release()
-                            return lp
-                        # Đặt cờ để dừng việc tiếp tục nhận diện
-                        flag = 1
-                        break
-                if flag == 1:
-                    break
\ No newline at end of file
+        # Thử deskew (cân chỉnh góc) theo 4 biến thể (cc, ct) cho mọi biển số,
+        # đọc tất cả trong 1 lần OCR (batch) thay vì lần lượt từng ảnh
+        variants = [utils_rotate.deskew(crop_img, cc, ct) for crop_img in crops for cc in range(0, 2) for ct in range(0, 2)]
+        for lp in helper.read_plates(yolo_license_plate, variants):
+            # Nếu biển số được nhận diện không phải "unknown"
+            if lp != "unknown":
+                # Thêm biển số đã nhận diện vào danh sách
+                list_read_plates.add(lp)
+                if lp_temp != lp:
+                    lp_temp = lp
+                    print(lp)
+                    vid.release()
+                    return lp
\ No newline at end of file
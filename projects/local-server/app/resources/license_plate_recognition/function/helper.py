@@ -1,4 +1,5 @@
 import math
+import numpy as np
 
 # license plate type classification helper function
 def linear_equation(x1, y1, x2, y2):
@@ -13,52 +14,49 @@ def check_point_linear(x, y, x1, y1, x2, y2):
 
 # detect character and number in license plate
 def read_plate(yolo_license_plate, im):
-    LP_type = "1"
     results = yolo_license_plate(im)
-    bb_list = results.pandas().xyxy[0].values.tolist()
-    if len(bb_list) == 0 or len(bb_list) < 7 or len(bb_list) > 10:
-        return "unknown"
-    center_list = []
-    y_mean = 0
-    y_sum = 0
-    for bb in bb_list:
-        x_c = (bb[0]+bb[2])/2
-        y_c = (bb[1]+bb[3])/2
-        y_sum += y_c
-        center_list.append([x_c,y_c,bb[-1]])
+    # xyxy[0]: tensor (N, 6) x1, y1, x2, y2, conf, cls - không đổi sang DataFrame
+    return plate_from_boxes(results.xyxy[0].cpu().numpy(), yolo_license_plate.names)
 
-    # find 2 point to draw line
-    l_point = center_list[0]
-    r_point = center_list[0]
-    for cp in center_list:
-        if cp[0] < l_point[0]:
-            l_point = cp
-        if cp[0] > r_point[0]:
-            r_point = cp
-    for ct in center_list:
-        if l_point[0] != r_point[0]:
-            if (check_point_linear(ct[0], ct[1], l_point[0], l_point[1], r_point[0], r_point[1]) == False):
-                LP_type = "2"
+def read_plates(yolo_license_plate, ims):
+    """Đọc nhiều ảnh biển số trong 1 lần forward: AutoShape letterbox cả list thành 1 batch."""
+    if len(ims) == 0:
+        return []
+    results = yolo_license_plate(list(ims))
+    return [plate_from_boxes(det.cpu().numpy(), yolo_license_plate.names) for det in results.xyxy]
+
+def plate_from_boxes(det, names):
+    """
+    Ghép ký tự từ box OCR (N, 6) thành chuỗi biển số, giống logic read_plate cũ nhưng trên NumPy:
+    biển 1 dòng sắp theo x; biển 2 dòng (có tâm ký tự lệch > 3px khỏi đường nối ký tự trái nhất -
+    phải nhất) tách theo y trung bình, nối 2 dòng bằng "-".
+    """
+    return decode_plate(det, names)[0]
 
-    y_mean = int(int(y_sum) / len(bb_list))
-    size = results.pandas().s
+def decode_plate(det, names):
+    """Như plate_from_boxes, kèm độ tự tin của từng ký tự theo đúng thứ tự chuỗi ("-" có độ tự tin 1.0)."""
+    if len(det) < 7 or len(det) > 10:
+        return "unknown", []
+    x_c = (det[:, 0] + det[:, 2]) / 2
+    y_c = (det[:, 1] + det[:, 3]) / 2
+    labels = [str(names[int(c)]) for c in det[:, 5]]
+    confs = det[:, 4].tolist()
+
+    # find 2 point to draw line
+    l, r = int(np.argmin(x_c)), int(np.argmax(x_c))
+    LP_type = "1"
+    if x_c[l] != x_c[r]:
+        y_pred = y_c[l] + (y_c[r] - y_c[l]) * (x_c - x_c[l]) / (x_c[r] - x_c[l])
+        if (np.abs(y_pred - y_c) > 3).any():
+            LP_type = "2"
 
     # 1 line plates and 2 line plates
-    line_1 = []
-    line_2 = []
-    license_plate = ""
+    order = np.argsort(x_c, kind="stable").tolist()
     if LP_type == "2":
-        for c in center_list:
-            if int(c[1]) > y_mean:
-                line_2.append(c)
-            else:
-                line_1.append(c)
-        for l1 in sorted(line_1, key = lambda x: x[0]):
-            license_plate += str(l1[2])
-        license_plate += "-"
-        for l2 in sorted(line_2, key = lambda x: x[0]):
-            license_plate += str(l2[2])
-    else:
-        for l in sorted(center_list, key = lambda x: x[0]):
-            license_plate += str(l[2])
-    return license_plate
\ No newline at end of file
+        y_mean = int(int(y_c.sum()) / len(det))
+        line_2 = y_c.astype(int) > y_mean
+        line_1 = [i for i in order if not line_2[i]]
+        line_2 = [i for i in order if line_2[i]]
+        return ("".join(labels[i] for i in line_1) + "-" + "".join(labels[i] for i in line_2),
+                [confs[i] for i in line_1] + [1.0] + [confs[i] for i in line_2])
+    return "".join(labels[i] for i in order), [confs[i] for i in order]
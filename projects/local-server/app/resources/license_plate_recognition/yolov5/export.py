@@ -54,6 +54,7 @@ from pathlib import Path
 
 import pandas as pd
 import torch
+import yaml
 from torch.utils.mobile_optimizer import optimize_for_mobile
 
 FILE = Path(__file__).resolve()
@@ -171,14 +172,20 @@ def export_onnx(model, im, file, opset, train, dynamic, simplify, prefix=colorst
 def export_openvino(model, im, file, half, prefix=colorstr('OpenVINO:')):
     # YOLOv5 OpenVINO export
     try:
-        check_requirements(('openvino-dev',))  # requires openvino-dev: https://pypi.org/project/openvino-dev/
-        import openvino.inference_engine as ie
+        # OpenVINO runtime API (openvino>=2023.1): bản openvino-dev cũ (mo + inference_engine) đã bị bỏ từ 2024
+        check_requirements(('openvino>=2023.1',))
+        import openvino as ov
 
-        LOGGER.info(f'\n{prefix} starting export with openvino {ie.__version__}...')
+        LOGGER.info(f'\n{prefix} starting export with openvino {ov.__version__}...')
         f = str(file).replace('.pt', '_openvino_model' + os.sep)
 
-        cmd = f"mo --input_model {file.with_suffix('.onnx')} --output_dir {f} --data_type {'FP16' if half else 'FP32'}"
-        subprocess.check_output(cmd, shell=True)
+        Path(f).mkdir(parents=True, exist_ok=True)
+        ov_model = ov.convert_model(str(file.with_suffix('.onnx')))
+        ov.save_model(ov_model, str(Path(f) / file.with_suffix('.xml').name), compress_to_fp16=half)
+        # IR không giữ metadata như ONNX → lưu stride / names cạnh file .xml cho DetectMultiBackend
+        names = model.names if isinstance(model.names, list) else [model.names[i] for i in sorted(model.names)]
+        with open(Path(f) / file.with_suffix('.yaml').name, 'w') as meta:
+            yaml.safe_dump({'stride': int(max(model.stride)), 'names': names}, meta)
 
         LOGGER.info(f'{prefix} export success, saved as {f} ({file_size(f):.1f} MB)')
         return f
@@ -297,6 +297,7 @@ class DetectMultiBackend(nn.Module):
         w = str(weights[0] if isinstance(weights, list) else weights)
         pt, jit, onnx, xml, engine, coreml, saved_model, pb, tflite, edgetpu, tfjs = self.model_type(w)  # get backend
         stride, names = 32, [f'class{i}' for i in range(1000)]  # assign defaults
+        dynamic = pt  # input H, W động: AutoShape letterbox theo ảnh (như pt) thay vì pad vuông size x size
         w = attempt_download(w)  # download if not local
         fp16 &= (pt or jit or onnx or engine) and device.type != 'cpu'  # FP16
         if data:  # data.yaml path (optional)
@@ -329,17 +330,25 @@ class DetectMultiBackend(nn.Module):
             providers = ['CUDAExecutionProvider', 'CPUExecutionProvider'] if cuda else ['CPUExecutionProvider']
             session = onnxruntime.InferenceSession(w, providers=providers)
             meta = session.get_modelmeta().custom_metadata_map  # metadata
+            dynamic = not isinstance(session.get_inputs()[0].shape[2], int)
             if 'stride' in meta:
                 stride, names = int(meta['stride']), eval(meta['names'])
         elif xml:  # OpenVINO
             LOGGER.info(f'Loading {w} for OpenVINO inference...')
-            check_requirements(('openvino-dev',))  # requires openvino-dev: https://pypi.org/project/openvino-dev/
-            import openvino.inference_engine as ie
-            core = ie.IECore()
+            check_requirements(('openvino>=2023.1',))  # OpenVINO runtime API (inference_engine đã bị bỏ từ 2024)
+            import openvino as ov
+            core = ov.Core()
             if not Path(w).is_file():  # if not *.xml
                 w = next(Path(w).glob('*.xml'))  # get *.xml file from *_openvino_model dir
-            network = core.read_network(model=w, weights=Path(w).with_suffix('.bin'))  # *.xml, *.bin paths
-            executable_network = core.load_network(network, device_name='CPU', num_requests=1)
+            network = core.read_model(model=w, weights=Path(w).with_suffix('.bin'))  # *.xml, *.bin paths
+            # CPU có AMX / AVX512-BF16 mặc định suy luận bf16 → lệch kết quả OCR so với pt; giữ FP32 như model export
+            executable_network = core.compile_model(network, device_name='CPU', config={'INFERENCE_PRECISION_HINT': 'f32'})
+            output_layer = executable_network.output(0)
+            dynamic = network.input(0).get_partial_shape()[2].is_dynamic
+            if Path(w).with_suffix('.yaml').exists():  # metadata ghi bởi export_openvino
+                with open(Path(w).with_suffix('.yaml'), errors='ignore') as f:
+                    d = yaml.safe_load(f)
+                stride, names = int(d['stride']), d['names']
         elif engine:  # TensorRT
             LOGGER.info(f'Loading {w} for TensorRT inference...')
             import tensorrt as trt  # https://developer.nvidia.com/nvidia-tensorrt-download
@@ -423,11 +432,7 @@ class DetectMultiBackend(nn.Module):
             y = self.session.run([self.session.get_outputs()[0].name], {self.session.get_inputs()[0].name: im})[0]
         elif self.xml:  # OpenVINO
             im = im.cpu().numpy()  # FP32
-            desc = self.ie.TensorDesc(precision='FP32', dims=im.shape, layout='NCHW')  # Tensor Description
-            request = self.executable_network.requests[0]  # inference request
-            request.set_blob(blob_name='images', blob=self.ie.Blob(desc, im))  # name=next(iter(request.input_blobs))
-            request.infer()
-            y = request.output_blobs['output'].buffer  # name=next(iter(request.output_blobs))
+            y = self.executable_network([im])[self.output_layer]
         elif self.engine:  # TensorRT
             assert im.shape == self.bindings['images'].shape, (im.shape, self.bindings['images'].shape)
             self.binding_addrs['images'] = int(im.data_ptr())
@@ -506,6 +511,7 @@ class AutoShape(nn.Module):
         copy_attr(self, model, include=('yaml', 'nc', 'hyp', 'names', 'stride', 'abc'), exclude=())  # copy attributes
         self.dmb = isinstance(model, DetectMultiBackend)  # DetectMultiBackend() instance
         self.pt = not self.dmb or model.pt  # PyTorch model
+        self.dynamic = not self.dmb or model.dynamic  # input H, W động (pt, ONNX / OpenVINO export --dynamic)
         self.model = model.eval()
 
     def _apply(self, fn):
@@ -556,7 +562,7 @@ class AutoShape(nn.Module):
             g = (size / max(s))  # gain
             shape1.append([y * g for y in s])
             imgs[i] = im if im.data.contiguous else np.ascontiguousarray(im)  # update
-        shape1 = [make_divisible(x, self.stride) if self.pt else size for x in np.array(shape1).max(0)]  # inf shape
+        shape1 = [make_divisible(x, self.stride) if self.dynamic else size for x in np.array(shape1).max(0)]  # inf shape
         x = [letterbox(im, shape1, auto=False)[0] for im in imgs]  # pad
         x = np.ascontiguousarray(np.array(x).transpose((0, 3, 1, 2)))  # stack and BHWC to BCHW
         x = torch.from_numpy(x).to(p.device).type_as(p) / 255  # uint8 to fp16/32
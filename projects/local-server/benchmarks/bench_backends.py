@@ -0,0 +1,162 @@
+"""
+So sánh backend CPU (ONNX Runtime / OpenVINO, FP32 / int8) với PyTorch trên cùng 1 thư mục ảnh:
+độ khớp kết quả (parity) và độ trễ.
+
+- LPR: biển số đọc được phải giống bản pt; box biển số khớp theo IoU.
+- Tracking model (--track-model): box xe khớp theo IoU với bản pt (predict, không tracker).
+Kết quả không đạt ngưỡng (--min-agree / --min-iou) in FAIL và trả exit code 1.
+
+Chạy từ thư mục projects/local-server:
+    python -m benchmarks.bench_backends --images path/to/gate_frames --formats onnx openvino --int8
+    python -m benchmarks.bench_backends --images path/to/lot_frames --track-model app/resources/models/car-yolo11n-640.pt --skip-lpr
+"""
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from app.modules.lpr_engine import LprEngine
+from app.modules.model_export import export_detect_model
+
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+def load_images(folder):
+    files = sorted(f for f in os.listdir(folder) if f.lower().endswith(IMAGE_EXTS))
+    images = [cv2.imread(os.path.join(folder, f)) for f in files]
+    return [im for im in images if im is not None]
+
+
+def box_iou(a, b):
+    """IoU (N, M) giữa 2 tập box xyxy."""
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((len(a), len(b)))
+    lt = np.maximum(a[:, None, :2], b[None, :, :2])
+    rb = np.minimum(a[:, None, 2:4], b[None, :, 2:4])
+    inter = np.clip(rb - lt, 0, None).prod(axis=2)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+def match_boxes(ref, other):
+    """Ghép tham lam theo IoU: trả về (IoU của các cặp ghép được, số box không ghép được ở 2 phía)."""
+    iou = box_iou(ref, other)
+    ious = []
+    while iou.size and iou.max() > 0.1:
+        i, j = np.unravel_index(iou.argmax(), iou.shape)
+        ious.append(iou[i, j])
+        iou[i, :] = 0
+        iou[:, j] = 0
+    return ious, len(ref) + len(other) - 2 * len(ious)
+
+
+def timed(fn, images, repeat):
+    outputs, times = [], []
+    for r in range(repeat):
+        for im in images:
+            start = time.perf_counter()
+            out = fn(im)
+            times.append((time.perf_counter() - start) * 1000)
+            if r == 0:
+                outputs.append(out)
+    return outputs, np.asarray(times)
+
+
+def report(name, times, ref_times, agree=None, ious=None, unmatched=None):
+    line = f"  {name:<16}: mean {times.mean():8.2f} ms  p95 {np.percentile(times, 95):8.2f} ms  ({ref_times.mean() / times.mean():4.2f}x)"
+    if agree is not None:
+        line += f"  plate agree {agree * 100:6.2f}%"
+    if ious is not None:
+        line += f"  box IoU {np.mean(ious) if ious else 0:5.3f}, unmatched {unmatched}"
+    print(line)
+
+
+def bench_lpr(images, formats, int8, repeat, min_agree, min_iou):
+    ok = True
+    variants = [("pt", False)] + [(f, False) for f in formats] + ([("onnx", True)] if int8 else [])
+    ref = ref_times = None
+    print("LPR (detector + OCR):")
+    for fmt, q in variants:
+        engine = LprEngine.load(fmt=fmt, int8=q)
+        outputs, times = timed(lambda im: [(r.plate, r.box[:4]) for r in engine.read(im)], images, repeat)
+        name = fmt + (" int8" if q else "")
+        if ref is None:
+            ref, ref_times = outputs, times
+            report(name, times, ref_times)
+            continue
+        agree = np.mean([sorted(lp for lp, _ in a) == sorted(lp for lp, _ in b) for a, b in zip(ref, outputs)])
+        ious, unmatched = [], 0
+        for a, b in zip(ref, outputs):
+            i, u = match_boxes(np.array([box for _, box in a]).reshape(-1, 4), np.array([box for _, box in b]).reshape(-1, 4))
+            ious += i
+            unmatched += u
+        report(name, times, ref_times, agree, ious, unmatched)
+        # int8 được phép lệch nhiều hơn FP32
+        if agree < (min_agree if not q else min_agree - 0.05) or (ious and np.mean(ious) < min_iou):
+            print(f"    FAIL: {name} lệch so với pt")
+            ok = False
+    return ok
+
+
+def bench_track(images, model_path, formats, int8, repeat, min_iou):
+    from ultralytics import YOLO
+
+    ok = True
+    variants = [("pt", False)] + [(f, False) for f in formats] + [(f, True) for f in formats if int8]
+    ref = ref_times = None
+    print(f"Tracking model {model_path}:")
+    for fmt, q in variants:
+        path = export_detect_model(model_path, fmt, q)
+        model = YOLO(path, task="detect", verbose=False)
+        outputs, times = timed(lambda im: model.predict(im, conf=0.5, verbose=False)[0].boxes.xyxy.cpu().numpy(),
+                               images, repeat)
+        name = fmt + (" int8" if q else "")
+        if ref is None:
+            ref, ref_times = outputs, times
+            report(name, times, ref_times)
+            continue
+        ious, unmatched = [], 0
+        for a, b in zip(ref, outputs):
+            i, u = match_boxes(a, b)
+            ious += i
+            unmatched += u
+        report(name, times, ref_times, ious=ious, unmatched=unmatched)
+        if ious and np.mean(ious) < (min_iou if not q else min_iou - 0.05):
+            print(f"    FAIL: {name} lệch so với pt")
+            ok = False
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--images", required=True)
+    parser.add_argument("--formats", nargs="+", default=["onnx", "openvino"], choices=["torchscript", "onnx", "openvino"])
+    parser.add_argument("--int8", action="store_true", help="thêm bản int8 (LPR: onnx; tracking: mọi format)")
+    parser.add_argument("--track-model", default=None, help="file .pt model tracking để so sánh thêm")
+    parser.add_argument("--skip-lpr", action="store_true")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--min-agree", type=float, default=0.95, help="tỉ lệ ảnh đọc ra cùng biển số tối thiểu")
+    parser.add_argument("--min-iou", type=float, default=0.9, help="IoU trung bình tối thiểu của box ghép được")
+    opt = parser.parse_args()
+
+    images = load_images(opt.images)
+    if not images:
+        print(f"Không có ảnh trong {opt.images}")
+        return
+    print(f"{len(images)} images × {opt.repeat}")
+    ok = True
+    if not opt.skip_lpr:
+        ok &= bench_lpr(images, opt.formats, opt.int8, opt.repeat, opt.min_agree, opt.min_iou)
+    if opt.track_model:
+        formats = [f for f in opt.formats if f != "torchscript"]
+        ok &= bench_track(images, opt.track_model, formats, opt.int8, opt.repeat, opt.min_iou)
+    print("PASS" if ok else "FAIL")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Micro-benchmark: chi phí IPC mỗi frame của camera process.
+
+So sánh 2 cách publish bbox từ camera process sang main process:
+  - before: manager.dict() (mỗi lần ghi/đọc là 1 round-trip pickle tới Manager server)
+  - after : DetectionRing trên shared memory
+
+Chạy từ thư mục projects/local-server:
+    python -m benchmarks.bench_detection_ring --frames 2000 --boxes 20 --cams 4
+"""
+import argparse
+import threading
+import time
+from multiprocessing import Manager, Process, Queue, set_start_method
+
+from app.modules.detection_ring import DetectionRing
+
+
+def make_frame(frame_idx, num_boxes):
+    ids = [frame_idx % 1000 + i for i in range(num_boxes)]
+    xyxy = [[10.0 * i, 20.0, 10.0 * i + 50.0, 120.0] for i in range(num_boxes)]
+    return ids, xyxy
+
+
+def manager_writer(bbox_shared, cam_id, frames, num_boxes, out):
+    start = time.perf_counter()
+    for f in range(frames):
+        ids, xyxy = make_frame(f, num_boxes)
+        now = time.time()
+        bbox_shared[cam_id] = [(int(ids[i]), [int(x) for x in xyxy[i]], now) for i in range(len(ids))]
+    out.put(frames / (time.perf_counter() - start))
+
+
+def ring_writer(ring_name, cam_id, frames, num_boxes, out):
+    ring = DetectionRing.attach(ring_name)
+    start = time.perf_counter()
+    for f in range(frames):
+        ids, xyxy = make_frame(f, num_boxes)
+        ring.write(ids, xyxy)
+    out.put(frames / (time.perf_counter() - start))
+    ring.close()
+
+
+def reader_loop(read_fn, cams, stop, counter):
+    # Giả lập check_occupied_slots / is_vehicle_being_tracked đọc liên tục
+    while not stop.is_set():
+        for cam in range(cams):
+            read_fn(cam)
+        counter[0] += 1
+
+
+def run(name, target, args_per_cam, read_fn, cams):
+    out = Queue()
+    stop = threading.Event()
+    counter = [0]
+    reader = threading.Thread(target=reader_loop, args=(read_fn, cams, stop, counter), daemon=True)
+    reader.start()
+    start = time.perf_counter()
+    procs = [Process(target=target, args=args_per_cam(cam) + (out,)) for cam in range(cams)]
+    for p in procs:
+        p.start()
+    fps = [out.get() for _ in procs]
+    for p in procs:
+        p.join()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    reader.join()
+    print(f"{name:>8}: {sum(fps) / len(fps):10.0f} frames/s per camera | "
+          f"{counter[0] * cams / elapsed:10.0f} reads/s (main) | {cams} cams")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=2000)
+    parser.add_argument("--boxes", type=int, default=20)
+    parser.add_argument("--cams", type=int, default=4)
+    opt = parser.parse_args()
+
+    set_start_method("spawn", force=True)
+
+    manager = Manager()
+    bbox_shared = manager.dict({cam: [] for cam in range(opt.cams)})
+    run("before", manager_writer,
+        lambda cam: (bbox_shared, cam, opt.frames, opt.boxes),
+        lambda cam: bbox_shared.get(cam, []), opt.cams)
+    manager.shutdown()
+
+    rings = [DetectionRing.create() for _ in range(opt.cams)]
+    run("after", ring_writer,
+        lambda cam: (rings[cam].name, cam, opt.frames, opt.boxes),
+        lambda cam: rings[cam].read_bboxes(), opt.cams)
+    for ring in rings:
+        ring.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Benchmark merge ID giữa camera: update_mappings_atomic (cũ) vs IdMerger (sự kiện qua Queue).
+
+- before: mỗi camera mỗi frame ghi coords_by_cam (Manager dict), copy toàn bộ coords_by_cam
+          của tất cả camera rồi giữ Manager lock để merge.
+- after : camera chỉ gọi CrossingReporter.cross (đẩy Queue), 1 thread IdMerger merge ở main process.
+
+Chạy từ thư mục projects/local-server:
+    python -m benchmarks.bench_id_merge --frames 300 --cams 4 --points 20
+"""
+import argparse
+import threading
+import time
+from multiprocessing import Manager, Process, Queue, set_start_method
+
+from app.modules.id_merger import CrossingReporter, IdMerger
+from app.modules.identity_store import IdentityStore
+
+
+def legacy_update_mappings(coords_by_cam, lock, canonical_map, next_canonical, time_tol=0.5, stale=1.0):
+    # Bản sao logic update_mappings_atomic cũ
+    now = time.time()
+    snapshots = {}
+    cams = range(0, len(coords_by_cam))
+    for cam in cams:
+        raw = dict(coords_by_cam[cam])
+        snapshots[cam] = {k: v for k, v in raw.items() if v and (now - v[1]) <= stale}
+    coord_ids = set()
+    for cam in cams:
+        coord_ids.update(snapshots[cam].keys())
+    with lock:
+        for cid in coord_ids:
+            obs = [(cam, int(snapshots[cam][cid][0]), snapshots[cam][cid][1])
+                   for cam in cams if cid in snapshots[cam] and snapshots[cam][cid][0] is not None]
+            if len(obs) < 2:
+                continue
+            times = [ts for (_, _, ts) in obs]
+            median_ts = sorted(times)[len(times) // 2]
+            close = [(cam, tid, ts) for (cam, tid, ts) in obs if abs(ts - median_ts) <= time_tol]
+            if len(close) < 2:
+                continue
+            existing = [int(c) for c in (canonical_map.get(f"c{cam}_{tid}") for cam, tid, _ in close) if c is not None]
+            if existing:
+                chosen = min(existing)
+            else:
+                chosen = int(next_canonical.value)
+                next_canonical.value += 1
+            for cam, tid, _ in close:
+                canonical_map[f"c{cam}_{tid}"] = chosen
+
+
+def crossings(cam, frame_idx, points):
+    # Mỗi frame: xe (track id theo camera) đang đè lên `points` điểm giao
+    tid = frame_idx // 50 + cam * 1000
+    return [(f"P{(frame_idx // 50 + p) % 100}", tid) for p in range(points)]
+
+
+def legacy_camera(cam, frames, points, coords_by_cam, lock, canonical_map, next_canonical, out):
+    start = time.perf_counter()
+    for f in range(frames):
+        now = time.time()
+        for cid, tid in crossings(cam, f, points):
+            coords_by_cam[cam][cid] = (tid, now)
+        legacy_update_mappings(coords_by_cam, lock, canonical_map, next_canonical)
+    out.put(frames / (time.perf_counter() - start))
+
+
+def merger_camera(cam, frames, points, merge_events, out):
+    reporter = CrossingReporter(cam, merge_events)
+    start = time.perf_counter()
+    for f in range(frames):
+        now = time.time()
+        for cid, tid in crossings(cam, f, points):
+            reporter.cross(cid, tid, now)
+    out.put(frames / (time.perf_counter() - start))
+
+
+def run(name, target, args_per_cam, cams):
+    out = Queue()
+    procs = [Process(target=target, args=args_per_cam(cam) + (out,)) for cam in range(cams)]
+    for p in procs:
+        p.start()
+    fps = [out.get() for _ in procs]
+    for p in procs:
+        p.join()
+    print(f"{name:>8}: {sum(fps) / len(fps):10.1f} frames/s per camera | {cams} cams")
+
+
+def groups(canonical_map):
+    merged = {}
+    for key, canon in canonical_map.items():
+        merged.setdefault(canon, set()).add(key)
+    return sorted(sorted(keys) for keys in merged.values())
+
+
+def parity_check(cams, points, vehicles=20):
+    # Cùng quan sát → cùng cách gom nhóm track giữa camera (mỗi xe đè lên nhóm điểm giao riêng)
+    legacy_map, identity = {}, IdentityStore()
+
+    class Counter:
+        value = 1
+
+    merger = IdMerger(None, identity)
+    lock = threading.Lock()
+    for v in range(vehicles):
+        now = time.time()
+        coords_by_cam = [{} for _ in range(cams)]
+        for cam in range(cams):
+            for p in range(points):
+                cid, tid = f"P{v * points + p}", v * 10 + cam
+                coords_by_cam[cam][cid] = (tid, now)
+                merger.handle(("cross", cam, cid, tid, now))
+        legacy_update_mappings(coords_by_cam, lock, legacy_map, Counter)
+    assert groups(legacy_map) == groups(identity.snapshot()), "merge result differs"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--cams", type=int, default=4)
+    parser.add_argument("--points", type=int, default=20)
+    opt = parser.parse_args()
+
+    set_start_method("spawn", force=True)
+    parity_check(opt.cams, opt.points)
+
+    manager = Manager()
+    coords_by_cam = [manager.dict() for _ in range(opt.cams)]
+    lock = manager.Lock()
+    canonical_map = manager.dict()
+    next_canonical = manager.Value('i', 1)
+    run("before", legacy_camera,
+        lambda cam: (cam, opt.frames, opt.points, coords_by_cam, lock, canonical_map, next_canonical),
+        opt.cams)
+
+    merge_events = Queue()
+    merger = IdMerger(merge_events, IdentityStore(manager.dict()))
+    merger_thread = merger.start()
+    run("after", merger_camera, lambda cam: (cam, opt.frames, opt.points, merge_events), opt.cams)
+    merge_events.put(None)
+    merger_thread.join()
+    manager.shutdown()
+
+
+if __name__ == "__main__":
+    main()
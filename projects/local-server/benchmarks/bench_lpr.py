@@ -0,0 +1,224 @@
+"""
+Benchmark LprEngine trên 1 thư mục ảnh: độ trễ từng stage (detect, crop, deskew, ocr, decode) và
+so với đường cũ đổi kết quả sang pandas (results.pandas().xyxy[0] + read_plate gọi pandas 2 lần).
+
+Chạy từ thư mục projects/local-server:
+    python -m benchmarks.bench_lpr --images path/to/frames --repeat 3
+    python -m benchmarks.bench_lpr --images path/to/plate_crops --crops   # ảnh đã là biển số, bỏ qua detect
+    python -m benchmarks.bench_lpr --images path/to/frames --variants 4  # 4 biến thể deskew / biển như detectLicense
+
+Dòng "ocr seq" / "ocr batch" là OCR từng ảnh một / cả frame 1 batch (stage ocr dùng cách theo LPR_BATCH_OCR),
+kèm độ khớp chuỗi biển số giữa 2 cách.
+
+Độ khớp: chuỗi biển số của LprEngine (tắt plate_grammar, trừ khi --grammar) so với đường cũ (pandas +
+read_plate gốc) trên cùng model, lần lặp đầu. --truth: tên ảnh dạng <stt>_<biển>.jpg (benchmarks.render_plates)
+→ thêm độ chính xác so với biển số đúng.
+    python -m benchmarks.render_plates --out /tmp/plates --count 200
+    python -m benchmarks.bench_lpr --images /tmp/plates --truth
+--hub: thời gian load qua torch.hub.load (force_reload, như trước LprEngine.load) và độ khớp biển số của model hub.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+import cv2
+import numpy as np
+import torch
+
+from app.modules.lpr_engine import (LprEngine, STAGES, DESKEW_VARIANTS, supports_batch, YOLOV5_PATH,
+                                    LP_DETECTOR_PATH, LP_OCR_PATH)
+from app.modules.plate_grammar import correct_plate
+import app.resources.license_plate_recognition.function.helper as helper
+import app.resources.license_plate_recognition.function.utils_rotate as utils_rotate
+
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+def load_images(folder):
+    files = sorted(f for f in os.listdir(folder) if f.lower().endswith(IMAGE_EXTS))
+    images = [(f, cv2.imread(os.path.join(folder, f))) for f in files]
+    return [(f, im) for f, im in images if im is not None]
+
+
+def legacy_read_plate(ocr, im):
+    # read_plate gốc (trước LprEngine): DataFrame box ký tự, gọi pandas 2 lần
+    results = ocr(im)
+    bb_list = results.pandas().xyxy[0].values.tolist()
+    results.pandas().s
+    if len(bb_list) < 7 or len(bb_list) > 10:
+        return "unknown"
+    center_list = [[(bb[0] + bb[2]) / 2, (bb[1] + bb[3]) / 2, bb[-1]] for bb in bb_list]
+    y_mean = int(int(sum(c[1] for c in center_list)) / len(bb_list))
+    l_point = min(center_list, key=lambda c: c[0])
+    r_point = max(center_list, key=lambda c: c[0])
+    LP_type = "1"
+    for ct in center_list:
+        if l_point[0] != r_point[0] and not helper.check_point_linear(ct[0], ct[1], *l_point[:2], *r_point[:2]):
+            LP_type = "2"
+    if LP_type == "2":
+        line_1 = sorted((c for c in center_list if int(c[1]) <= y_mean), key=lambda x: x[0])
+        line_2 = sorted((c for c in center_list if int(c[1]) > y_mean), key=lambda x: x[0])
+        return "".join(str(c[2]) for c in line_1) + "-" + "".join(str(c[2]) for c in line_2)
+    return "".join(str(c[2]) for c in sorted(center_list, key=lambda x: x[0]))
+
+
+def legacy_read(engine, frame, crops):
+    # Đường cũ của detect_license: DataFrame cho box biển số, read_plate cho từng biển
+    if crops:
+        list_plates = [[0, 0, frame.shape[1], frame.shape[0]]]
+    else:
+        list_plates = engine.detector(frame, size=engine.detect_size).pandas().xyxy[0].values.tolist()
+    out = []
+    for plate in list_plates:
+        x, y = int(plate[0]), int(plate[1])
+        w, h = int(plate[2] - plate[0]), int(plate[3] - plate[1])
+        out.append(legacy_read_plate(engine.ocr, utils_rotate.deskew(frame[y:y + h, x:x + w], 0, 0)))
+    return out
+
+
+def hub_load():
+    """Load 2 model như detect_license cũ (torch.hub, force_reload), trả về LprEngine."""
+    detector = torch.hub.load(YOLOV5_PATH, 'custom', path=LP_DETECTOR_PATH, force_reload=True, source='local')
+    ocr = torch.hub.load(YOLOV5_PATH, 'custom', path=LP_OCR_PATH, force_reload=True, source='local')
+    ocr.conf = 0.4
+    return LprEngine(detector, ocr)
+
+
+def cold_load_seconds(call):
+    """Thời gian (giây) `call` trong 1 process mới, tính cả import torch như lúc khởi động server."""
+    code = ("import time; t = time.perf_counter(); import benchmarks.bench_lpr as b; "
+            f"{call}; print(time.perf_counter() - t)")
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    return float(out.strip().splitlines()[-1])
+
+
+def truth_of(name):
+    """Biển số đúng từ tên ảnh của benchmarks.render_plates: 0012_29B1_12345.jpg → 29B1-12345."""
+    return os.path.splitext(name)[0].split("_", 1)[1].replace("_", "-")
+
+
+def agreement(label, pairs):
+    same = sum(a == b for a, b in pairs)
+    print(f"  {label:<28}: {same}/{len(pairs)} ({same / max(len(pairs), 1) * 100:.1f}%)")
+
+
+def summary(samples):
+    arr = np.asarray(samples)
+    return f"mean {arr.mean():8.2f}  p50 {np.percentile(arr, 50):8.2f}  p95 {np.percentile(arr, 95):8.2f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--images", required=True, help="thư mục ảnh frame cổng (hoặc ảnh biển số với --crops)")
+    parser.add_argument("--crops", action="store_true", help="ảnh đã là biển số cắt sẵn: bỏ qua stage detect")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--variants", type=int, default=1, choices=range(1, 5),
+                        help="số biến thể deskew / biển số (1 = như cổng, 4 = như detectLicense)")
+    parser.add_argument("--grammar", action="store_true", help="bật plate_grammar (mặc định tắt để so với đường cũ)")
+    parser.add_argument("--truth", action="store_true", help="tên ảnh chứa biển số đúng (benchmarks.render_plates)")
+    parser.add_argument("--hub", action="store_true", help="so thời gian load + biển số với model load qua torch.hub")
+    opt = parser.parse_args()
+
+    images = load_images(opt.images)
+    if not images:
+        print(f"Không có ảnh trong {opt.images}")
+        return
+    engine = LprEngine.load()
+    engine.grammar = opt.grammar
+    variants = DESKEW_VARIANTS[:opt.variants]
+
+    def run_engine(frame):
+        if opt.crops:
+            engine.timings = dict.fromkeys(STAGES, 0.0)
+            return engine.read_crops([frame], variants)
+        return engine.read(frame, variants)
+
+    def sequential_ocr(frame):
+        """(ms từng ảnh, ms 1 batch, [(chuỗi batch, chuỗi từng ảnh), ...] của mọi ảnh biển số + biến thể deskew)."""
+        crops = [frame] if opt.crops else [engine.crop(frame, box) for box in engine.detect_plates(frame)]
+        imgs = [utils_rotate.deskew(c, cc, ct) for c in crops if c.size for cc, ct in variants]
+        start = time.perf_counter()
+        single = [engine.ocr(im).xyxy[0].cpu().numpy() for im in imgs]
+        ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        batched = [det.cpu().numpy() for det in engine.ocr(imgs).xyxy] if imgs and can_batch else single
+        return ms, (time.perf_counter() - start) * 1000, [(helper.decode_plate(b, engine.names)[0], helper.decode_plate(c, engine.names)[0])
+                    for b, c in zip(batched, single)]
+
+    for _, frame in images[:opt.warmup]:
+        run_engine(frame)
+        legacy_read(engine, frame, opt.crops)
+
+    stages = {stage: [] for stage in STAGES}
+    can_batch = supports_batch(engine.ocr, "1")
+    total, legacy, sequential, batch = [], [], [], []
+    reads, legacy_reads, batch_pairs = {}, {}, {}
+    for _ in range(opt.repeat):
+        for name, frame in images:
+            start = time.perf_counter()
+            result = run_engine(frame)
+            total.append((time.perf_counter() - start) * 1000)
+            for stage in STAGES:
+                stages[stage].append(engine.timings[stage])
+            reads.setdefault(name, result)
+            ms, batch_ms, pairs = sequential_ocr(frame)
+            sequential.append(ms)
+            batch.append(batch_ms)
+            batch_pairs.setdefault(name, pairs)
+
+            start = time.perf_counter()
+            legacy_out = legacy_read(engine, frame, opt.crops)
+            legacy.append((time.perf_counter() - start) * 1000)
+            legacy_reads.setdefault(name, legacy_out)
+
+    read_ok = sum(any(r.plate != "unknown" for r in result) for result in reads.values())
+    print(f"{len(images)} images × {opt.repeat}, {read_ok} ảnh đọc được biển số")
+    for stage in STAGES:
+        if opt.crops and stage in ("detect", "crop"):
+            continue
+        print(f"  {stage:<8}: {summary(stages[stage])}")
+    print(f"  {'ocr seq':<8}: {summary(sequential)}  (từng ảnh 1 lần forward)")
+    if can_batch:
+        print(f"  {'ocr batch':<8}: {summary(batch)}  (1 batch / frame; stage ocr dùng batch: {engine.batch_ocr})")
+    print(f"  {'total':<8}: {summary(total)}")
+    print(f"  {'pandas':<8}: {summary(legacy)}  (đường cũ, cùng model)")
+
+    print("Độ khớp (lần lặp đầu):")
+    names = [name for name, _ in images]
+    # Batch letterbox theo ảnh lớn nhất nên ảnh nhỏ được pad khác khi chạy 1 mình
+    if can_batch:
+        agreement("batch vs từng ảnh", [p for n in names for p in batch_pairs[n]])
+        agreement("  frame > 1 ảnh biển số", [p for n in names if len(batch_pairs[n]) > 1 for p in batch_pairs[n]])
+    if opt.variants == 1:
+        # Cùng box biển số, cùng deskew → chuỗi phải giống hệt đường cũ (so theo thứ tự box)
+        agreement("engine vs pandas (biển)", [(r.plate, lp) for n in names for r, lp in zip(reads[n], legacy_reads[n])])
+        agreement("engine vs pandas (số biển)", [(len(reads[n]), len(legacy_reads[n])) for n in names])
+    if opt.truth:
+        def best(result):
+            plates = [r for r in result if r.plate != "unknown"]
+            return max(plates, key=lambda r: r.score).plate if plates else "unknown"
+        corrected = [max((correct_plate(r.plate, r.confs, enabled=True) for r in reads[n] if r.plate != "unknown"),
+                         key=lambda c: (c[3], c[2]), default=("unknown",))[0] for n in names]
+        agreement("pandas = biển đúng", [(next((lp for lp in legacy_reads[n] if lp != "unknown"), "unknown"), truth_of(n))
+                                        for n in names])
+        agreement("engine = biển đúng", [(best(reads[n]), truth_of(n)) for n in names])
+        agreement("engine + grammar = biển đúng", [(c, truth_of(n)) for c, n in zip(corrected, names)])
+    if opt.hub:
+        hub = hub_load()
+        hub.grammar, hub.batch_ocr = engine.grammar, engine.batch_ocr
+        # Load + đọc frame đầu tiên: với hub lần forward đầu chịu chi phí khởi tạo mà LprEngine đã warm-up trước
+        first = f"b.cv2.imread({os.path.join(opt.images, images[0][0])!r})"
+        first = f"read_crops([{first}])" if opt.crops else f"read({first})"
+        hub_s = [cold_load_seconds(f"b.hub_load().{first}") for _ in range(3)]
+        engine_s = [cold_load_seconds(f"b.LprEngine.load().{first}") for _ in range(3)]
+        print(f"Load + frame đầu (process mới, 3 lần): torch.hub {np.mean(hub_s):.2f}s (min {min(hub_s):.2f}s, không warm-up), "
+              f"LprEngine.load {np.mean(engine_s):.2f}s (min {min(engine_s):.2f}s, gồm warm-up)")
+        agreement("engine vs torch.hub (biển)", [(r.plate, h.plate) for n, frame in images
+                                                 for r, h in zip(reads[n], hub.read(frame, variants))])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Benchmark motion gate + adaptive stride trên cảnh bãi xe giả lập (nền nhiễu + xe chạy vào / ra slot).
+
+So với detect mọi frame: số lần chạy detection, chi phí MotionGate mỗi frame, và occupancy slot
+(SlotHysteresis) có giữ nguyên không. "Detector" là ground truth nên chênh lệch chỉ đến từ frame bị bỏ qua.
+
+Chạy từ thư mục projects/local-server:
+    python -m benchmarks.bench_motion_gate --frames 6000 --cars 6
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.modules.coordinate_store import CoordinateSet
+from app.modules.motion_gate import MotionGate, AdaptiveStride, motion_config
+from app.modules.slot_occupancy import SlotHysteresis
+
+WIDTH, HEIGHT, FPS = 1280, 720, 30.0
+CAR_W, CAR_H = 120, 200
+
+
+def make_slots(num_slots):
+    step = WIDTH // num_slots
+    return [{'id': f"S{i}", 'coordinate': [step * i + step // 2, HEIGHT // 2]} for i in range(num_slots)]
+
+
+def make_script(num_frames, num_cars, num_slots, rng):
+    """Mỗi xe: (id, slot, frame vào, frame ra) - 60 frame chạy từ mép dưới vào slot, đỗ, rồi chạy ra."""
+    script = []
+    for car in range(num_cars):
+        enter = int(rng.integers(0, num_frames - 400))
+        leave = int(rng.integers(enter + 200, num_frames + 300))
+        script.append((car + 1, car % num_slots, enter, leave))
+    return script
+
+
+def car_box(slot_x, progress):
+    # progress 0 → 1: từ mép dưới khung hình tới vị trí đỗ
+    y_park = HEIGHT // 2 - CAR_H // 2
+    y = int(HEIGHT + (y_park - HEIGHT) * progress)
+    x = slot_x - CAR_W // 2
+    return [x, y, x + CAR_W, y + CAR_H]
+
+
+def boxes_at(frame_idx, script, slots):
+    ids, xyxy = [], []
+    for car_id, slot, enter, leave in script:
+        if frame_idx < enter or frame_idx >= leave + 60:
+            continue
+        if frame_idx < enter + 60:
+            progress = (frame_idx - enter) / 60
+        elif frame_idx < leave:
+            progress = 1.0
+        else:
+            progress = 1.0 - (frame_idx - leave) / 60
+        ids.append(car_id)
+        xyxy.append(car_box(slots[slot]['coordinate'][0], progress))
+    return ids, xyxy
+
+
+def render(background, noise, ids, xyxy, frame_idx):
+    frame = background + noise[frame_idx % len(noise)]
+    for car_id, (x1, y1, x2, y2) in zip(ids, xyxy):
+        frame[max(y1, 0):min(y2, HEIGHT), max(x1, 0):min(x2, WIDTH)] = (40 * car_id) % 200 + 40
+    return frame
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=6000)
+    parser.add_argument("--cars", type=int, default=6)
+    parser.add_argument("--slots", type=int, default=8)
+    parser.add_argument("--max-stride", type=int, default=8, help="như MOTION_GATE_CAMERAS {cam: {'max_stride': k}}")
+    opt = parser.parse_args()
+    rng = np.random.default_rng(0)
+
+    slots = make_slots(opt.slots)
+    slot_set = CoordinateSet("__bench_missing__.yml")
+    slot_set.load(slots)
+    script = make_script(opt.frames, opt.cars, opt.slots, rng)
+    background = rng.integers(60, 120, size=(HEIGHT, WIDTH, 3), dtype=np.uint8)
+    # Nhiễu cảm biến 0..5 mức xám (background + noise vẫn nằm trong uint8)
+    noise = [rng.integers(0, 6, size=(HEIGHT, WIDTH, 3), dtype=np.uint8) for _ in range(8)]
+
+    # Mặc định .env tắt motion gate: đo như 1 camera được bật qua MOTION_GATE_CAMERAS
+    config = dict(motion_config(0), enabled=True, max_stride=opt.max_stride)
+    gate = MotionGate(config['width'], config['pixel_threshold'], config['min_ratio'], config['bg_alpha'])
+    stride = AdaptiveStride(config['max_stride'], config['idle_frames'], stats_interval=0)
+    full, gated = SlotHysteresis(), SlotHysteresis()
+
+    gate_time = 0.0
+    agree = 0
+    ids_g, xyxy_g = [], []
+    for frame_idx in range(opt.frames):
+        ts = frame_idx / FPS
+        ids, xyxy = boxes_at(frame_idx, script, slots)
+        frame = render(background, noise, ids, xyxy, frame_idx)
+
+        start = time.perf_counter()
+        detect = stride.should_detect(gate.moving(frame))
+        gate_time += time.perf_counter() - start
+        if detect:
+            previous = ids_g
+            ids_g, xyxy_g = ids, xyxy
+            if set(ids_g) != set(previous):
+                stride.tracks_changed()
+
+        occ_full, _ = full.update(slot_set.match(np.array(xyxy).reshape(-1, 4)), ids, now=ts)
+        occ_gated, _ = gated.update(slot_set.match(np.array(xyxy_g).reshape(-1, 4)), ids_g, now=ts)
+        agree += bool(np.array_equal(occ_full, occ_gated))
+
+    s = stride.stats()
+    print(f"{opt.frames} frames {WIDTH}x{HEIGHT}, {opt.cars} cars, {opt.slots} slots, max stride {stride.max_stride}")
+    print(f"  detections run          : {s['detected']} / {opt.frames} ({s['skip_ratio'] * 100:.1f}% skipped)")
+    print(f"  motion gate             : {gate_time / opt.frames * 1000:8.3f} ms/frame")
+    print(f"  occupancy agreement     : {agree / opt.frames * 100:.2f}% frames")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""
+Chạy lại chuỗi kết quả OCR theo thời gian để so sánh các cách xác nhận biển số ở cổng:
+    - legacy   : 5 lần đọc liên tiếp giống hệt lần trước (delay >= 5, đọc khác thì reset)
+    - consensus: PlateConsensus (bỏ phiếu từng ký tự có trọng số độ tự tin trong cửa sổ thời gian)
+    - grammar  : legacy / consensus trên chuỗi đã sửa theo cấu trúc biển số (plate_grammar.correct_plate)
+Đo thời gian từ lúc xe tới cổng đến lúc xác nhận, số lần xác nhận sai và số xe không xác nhận được.
+Có ground truth (--synthetic): tỉ lệ xác nhận sai của consensus vượt --max-wrong → in FAIL, exit code 1.
+
+Nguồn dữ liệu:
+    --synthetic: xe giả lập, OCR đọc nhầm ký tự dễ lẫn (0/D, 8/B, 5/S...), thiếu ký tự, mất frame
+    --record   : file .jsonl ghi bởi detect_license (LPR_RECORD), tách phiên xe theo khoảng trống thời gian;
+                 không có ground truth nên chỉ so thời gian xác nhận và độ khớp giữa 2 cách
+
+Chạy từ thư mục projects/local-server:
+    python -m benchmarks.bench_plate_consensus --synthetic --sessions 2000 --char-error 0.08
+    python -m benchmarks.bench_plate_consensus --record lpr_record.jsonl
+"""
+import argparse
+import json
+import sys
+
+import numpy as np
+
+from app.modules.plate_consensus import PlateConsensus
+from app.modules.plate_grammar import correct_plate
+
+DIGITS = "0123456789"
+LETTERS = "ABCDEFGHKLMNPSTUVXYZ"
+# Cặp ký tự OCR hay đọc nhầm trên biển số
+CONFUSIONS = {"0": "D", "D": "0", "8": "B", "B": "8", "5": "S", "S": "5", "1": "7", "7": "1",
+              "2": "Z", "Z": "2", "6": "G", "G": "6", "4": "A", "A": "4", "3": "8", "9": "0"}
+LEGACY_THRESHOLD = 5
+
+
+def random_plate(rng):
+    """Biển số dạng VN: 2 số tỉnh + seri; 1 dòng (30G49341) hoặc 2 dòng (29B1-23456)."""
+    province = "".join(rng.choice(list(DIGITS), 2))
+    if rng.random() < 0.5:
+        return province + rng.choice(list(LETTERS)) + "".join(rng.choice(list(DIGITS), 5))
+    return (province + rng.choice(list(LETTERS)) + rng.choice(list(DIGITS)) + "-" +
+            "".join(rng.choice(list(DIGITS), 5)))
+
+
+def noisy_read(plate, rng, char_error, drop_rate, miss_rate):
+    """1 frame OCR: None (không đọc được / nhiều biển), hoặc (chuỗi, độ tự tin từng ký tự)."""
+    if rng.random() < miss_rate:
+        return None
+    chars, confs = [], []
+    for c in plate:
+        if c == "-":
+            chars.append(c)
+            confs.append(1.0)
+        elif rng.random() < char_error:
+            chars.append(CONFUSIONS.get(c) or rng.choice(list(DIGITS + LETTERS)))
+            confs.append(float(rng.uniform(0.4, 0.75)))
+        else:
+            chars.append(c)
+            confs.append(float(rng.uniform(0.6, 0.98)))
+    if rng.random() < drop_rate:
+        # Mất 1 ký tự (box ký tự bị NMS gộp / dưới ngưỡng)
+        i = int(rng.integers(0, len(chars)))
+        if chars[i] != "-":
+            del chars[i], confs[i]
+    return "".join(chars), confs
+
+
+def synthetic_sessions(opt, rng):
+    for _ in range(opt.sessions):
+        plate = random_plate(rng)
+        frames = []
+        for k in range(int(opt.duration * opt.fps)):
+            read = noisy_read(plate, rng, opt.char_error, opt.drop_rate, opt.miss_rate)
+            frames.append((k / opt.fps, [read] if read else []))
+        yield plate, frames
+
+
+def recorded_sessions(path, gap):
+    """Tách file ghi thành phiên: 2 frame cách nhau > gap giây là 2 xe khác nhau."""
+    frames = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                rec = json.loads(line)
+                frames.append((rec["ts"], [(p["plate"], p["confs"]) for p in rec["plates"]]))
+    session = []
+    for ts, reads in frames:
+        if session and ts - session[-1][0] > gap:
+            yield None, session
+            session = []
+        session.append((ts, reads))
+    if session:
+        yield None, session
+
+
+def run_legacy(frames):
+    # Logic cũ của detect_license: chỉ xét frame có đúng 1 biển số
+    lp_temp, delay = "", 0
+    for ts, reads in frames:
+        if len(reads) != 1:
+            continue
+        if reads[0][0] == lp_temp:
+            delay += 1
+        else:
+            delay = 0
+            lp_temp = reads[0][0]
+        if delay >= LEGACY_THRESHOLD:
+            return lp_temp, ts - frames[0][0]
+    return None, None
+
+
+def run_consensus(frames, consensus):
+    consensus.reset()
+    for ts, reads in frames:
+        if len(reads) == 1:
+            confirmed = consensus.update(reads[0][0], reads[0][1], now=ts)
+        else:
+            confirmed = consensus.update(None, now=ts)
+        if confirmed:
+            return confirmed, ts - frames[0][0]
+    return None, None
+
+
+def with_grammar(frames):
+    out = []
+    for ts, reads in frames:
+        reads = [correct_plate(plate, confs, enabled=True) for plate, confs in reads]
+        out.append((ts, [(plate, confs) for plate, confs, _, _, _ in reads]))
+    return out
+
+
+def report(name, results, truths):
+    """In 1 dòng kết quả, trả về tỉ lệ xác nhận sai (None nếu không có ground truth)."""
+    times = np.array([t for _, t in results if t is not None])
+    confirmed = sum(p is not None for p, _ in results)
+    line = f"  {name:<11}: confirmed {confirmed}/{len(results)}"
+    if len(times):
+        line += f", time to confirm mean {times.mean():5.2f}s  p50 {np.percentile(times, 50):5.2f}s  p95 {np.percentile(times, 95):5.2f}s"
+    if truths[0] is not None:
+        wrong = sum(p is not None and p != t for (p, _), t in zip(results, truths))
+        line += f", wrong {wrong} ({wrong / max(confirmed, 1) * 100:.2f}%)"
+    print(line)
+    return wrong / max(confirmed, 1) if truths[0] is not None else None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--record", default=None, help="file .jsonl ghi bởi detect_license (LPR_RECORD)")
+    parser.add_argument("--gap", type=float, default=5.0, help="khoảng trống (giây) tách 2 phiên xe trong file ghi")
+    parser.add_argument("--synthetic", action="store_true")
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--duration", type=float, default=10.0, help="giây xe đứng trước camera")
+    parser.add_argument("--fps", type=float, default=8.0, help="số frame OCR mỗi giây")
+    parser.add_argument("--char-error", type=float, default=0.08, help="xác suất đọc nhầm mỗi ký tự")
+    parser.add_argument("--drop-rate", type=float, default=0.05, help="xác suất mất 1 ký tự mỗi frame")
+    parser.add_argument("--miss-rate", type=float, default=0.1, help="xác suất frame không đọc được biển")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-wrong", type=float, default=0.0, help="tỉ lệ xác nhận sai tối đa của consensus")
+    opt = parser.parse_args()
+
+    if opt.record:
+        sessions = list(recorded_sessions(opt.record, opt.gap))
+    else:
+        sessions = list(synthetic_sessions(opt, np.random.default_rng(opt.seed)))
+    truths = [truth for truth, _ in sessions]
+    consensus = PlateConsensus()
+    legacy = [run_legacy(frames) for _, frames in sessions]
+    voted = [run_consensus(frames, consensus) for _, frames in sessions]
+    legacy_grammar = [run_legacy(with_grammar(frames)) for _, frames in sessions]
+    grammar = [run_consensus(with_grammar(frames), consensus) for _, frames in sessions]
+
+    print(f"{len(sessions)} sessions, window {consensus.window}s, threshold {consensus.threshold}, "
+          f"min reads {consensus.min_reads}")
+    report("legacy", legacy, truths)
+    wrong = [report("consensus", voted, truths)]
+    report("legacy+gram", legacy_grammar, truths)
+    wrong.append(report("cons+gram", grammar, truths))
+    if truths[0] is None:
+        both = [(a, b) for (a, _), (b, _) in zip(legacy, voted) if a is not None and b is not None]
+        agree = sum(a == b for a, b in both)
+        print(f"  cả 2 cùng xác nhận {len(both)} phiên, cùng biển số {agree}")
+        return
+    # Biển xác nhận sai ở barrier tệ hơn xác nhận chậm: chặn mọi thay đổi làm tăng tỉ lệ sai
+    ok = max(wrong) <= opt.max_wrong
+    print("PASS" if ok else f"FAIL: consensus xác nhận sai > {opt.max_wrong * 100:.2f}%")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Benchmark ROI_CROP trên cảnh bãi xe giả lập: so occupancy slot và độ liền mạch track id khi model chạy
+trên cả frame (full), 1 hình chữ nhật bao (crop, như camera anchor) và mosaic các tile.
+
+Cảnh: 2 cụm slot ở 2 bên khung hình, 1 điểm giao ReID ở đường vào phía dưới; xe đi từ mép dưới lên
+làn giữa (không có slot nào) rồi rẽ ngang vào slot, đỗ, đi ra theo đường cũ.
+"Detector" thấy xe khi tâm bbox nằm trong 1 tile (bbox cắt theo biên tile, như model chỉ thấy phần ảnh
+đó), tracker IoU đơn giản chạy trên tọa độ ảnh đưa vào model (như BoT-SORT), mất quá TRACK_BUFFER frame
+thì xe xuất hiện lại nhận track id mới. Trên camera anchor mỗi track id mới là 1 global_id mới →
+biển số gắn lúc vào cổng bị mất.
+
+Chạy từ thư mục projects/local-server:
+    python -m benchmarks.bench_roi --frames 6000 --cars 6
+"""
+import argparse
+
+import numpy as np
+
+from app.modules.coordinate_store import CoordinateSet
+from app.modules.frame_roi import FrameRoi
+from app.modules.slot_occupancy import SlotHysteresis
+
+WIDTH, HEIGHT, FPS = 1280, 720, 30.0
+CAR_W, CAR_H = 90, 150
+LANE_X, LANE_Y = WIDTH // 2, 250
+SLOT_XS = (100, 200, 300, 980, 1080, 1180)
+REID_POINT = (LANE_X, 600)
+TRACK_BUFFER = 30  # frame giữ track đã mất (track_buffer của BoT-SORT)
+IOU_MATCH = 0.3
+
+
+class _Coords:
+    """Giống CoordinateStore đủ cho FrameRoi.set_coordinates."""
+
+    def __init__(self, slots, reid):
+        self.slots = slots
+        self.reid = reid
+
+
+def make_coords():
+    slots = CoordinateSet("__bench_missing__.yml")
+    slots.load([{'id': f"S{i}", 'coordinate': [x, LANE_Y]} for i, x in enumerate(SLOT_XS)])
+    reid = CoordinateSet("__bench_missing__.yml")
+    reid.load([{'id': "R0", 'coordinate': list(REID_POINT)}])
+    return _Coords(slots, reid)
+
+
+def path_point(slot_x, t):
+    """Tâm xe tại t ∈ [0, 1]: 0..0.5 đi từ mép dưới lên làn giữa, 0.5..1 rẽ ngang tới slot."""
+    if t < 0.5:
+        return LANE_X, HEIGHT + CAR_H / 2 + (LANE_Y - HEIGHT - CAR_H / 2) * t / 0.5
+    return LANE_X + (slot_x - LANE_X) * (t - 0.5) / 0.5, LANE_Y
+
+
+def make_script(num_frames, num_cars, rng, drive=150):
+    """Mỗi xe: (id, slot, frame vào, frame ra) - `drive` frame chạy vào slot, đỗ, rồi chạy ra theo đường cũ."""
+    script = []
+    for car in range(num_cars):
+        enter = int(rng.integers(0, num_frames - 2 * drive - 200))
+        leave = int(rng.integers(enter + drive + 200, num_frames + drive))
+        script.append((car + 1, car % len(SLOT_XS), enter, leave))
+    return script
+
+
+def boxes_at(frame_idx, script, drive=150):
+    cars, xyxy = [], []
+    for car_id, slot, enter, leave in script:
+        if frame_idx < enter or frame_idx >= leave + drive:
+            continue
+        if frame_idx < enter + drive:
+            t = (frame_idx - enter) / drive
+        elif frame_idx < leave:
+            t = 1.0
+        else:
+            t = 1.0 - (frame_idx - leave) / drive
+        cx, cy = path_point(SLOT_XS[slot], t)
+        cars.append(car_id)
+        xyxy.append([cx - CAR_W / 2, cy - CAR_H / 2, cx + CAR_W / 2, cy + CAR_H / 2])
+    return cars, xyxy
+
+
+def detect(roi, cars, xyxy):
+    """Bbox (tọa độ ảnh đưa vào model) của các xe có tâm nằm trong 1 tile, kèm id xe thật."""
+    seen, boxes = [], []
+    for car_id, (x1, y1, x2, y2) in zip(cars, xyxy):
+        cx, cy = (x1 + x2) / 2, (y1 + y2) / 2
+        for (tx1, ty1, tx2, ty2), (ox, oy) in zip(roi.tiles, roi.origins):
+            if tx1 <= cx < tx2 and ty1 <= cy < ty2:
+                box = np.clip([x1, y1, x2, y2], [tx1, ty1, tx1, ty1], [tx2, ty2, tx2, ty2])
+                seen.append(car_id)
+                boxes.append((box - [tx1, ty1, tx1, ty1] + [ox, oy, ox, oy]).tolist())
+                break
+    return seen, boxes
+
+
+def iou(a, b):
+    w = min(a[2], b[2]) - max(a[0], b[0])
+    h = min(a[3], b[3]) - max(a[1], b[1])
+    if w <= 0 or h <= 0:
+        return 0.0
+    inter = w * h
+    return inter / ((a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter)
+
+
+class IouTracker:
+    """Ghép tham lam theo IoU với track còn sống (mất ≤ TRACK_BUFFER frame), không ghép được → id mới."""
+
+    def __init__(self):
+        self.tracks = {}  # id -> (box, frame cuối thấy)
+        self._next = 1
+
+    def update(self, boxes, frame_idx):
+        self.tracks = {t: v for t, v in self.tracks.items() if frame_idx - v[1] <= TRACK_BUFFER}
+        free = dict(self.tracks)
+        ids = []
+        for box in boxes:
+            best = max(free, key=lambda t: iou(free[t][0], box), default=None)
+            if best is None or iou(free[best][0], box) < IOU_MATCH:
+                best = self._next
+                self._next += 1
+            else:
+                free.pop(best)
+            self.tracks[best] = (box, frame_idx)
+            ids.append(best)
+        return ids
+
+
+def run(mode, coords, script, frames):
+    """(occupancy mỗi frame, {xe: [track id theo thứ tự xuất hiện]}, tỉ lệ pixel)."""
+    roi = None
+    if mode != "full":
+        roi = FrameRoi(name=f"bench {mode}", mosaic=mode == "mosaic")
+        roi.set_coordinates(coords)
+        roi.apply(np.zeros((HEIGHT, WIDTH, 3), dtype=np.uint8))
+    tracker, hysteresis = IouTracker(), SlotHysteresis()
+    occupancy, tracks = [], {}
+    for frame_idx in range(frames):
+        cars, xyxy = boxes_at(frame_idx, script)
+        if roi is None:
+            seen, boxes = cars, xyxy
+        else:
+            seen, boxes = detect(roi, cars, xyxy)
+        ids = tracker.update(boxes, frame_idx)
+        if roi is not None:
+            ids_frame, boxes = roi.to_frame(ids, boxes)
+            # to_frame giữ thứ tự; bbox bị bỏ (tâm ngoài tile) thì bỏ id xe thật tương ứng
+            seen = [car for car, track_id in zip(seen, ids) if track_id in set(ids_frame)]
+            ids = ids_frame
+        for car, track_id in zip(seen, ids):
+            history = tracks.setdefault(car, [])
+            if not history or history[-1] != track_id:
+                history.append(track_id)
+        occ, _ = hysteresis.update(coords.slots.match(np.array(boxes).reshape(-1, 4)), ids, now=frame_idx / FPS)
+        occupancy.append(occ.copy())
+    return occupancy, tracks, 1.0 if roi is None else roi.pixel_ratio, "full" if roi is None else roi.mode
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=6000)
+    parser.add_argument("--cars", type=int, default=6)
+    parser.add_argument("--seed", type=int, default=0)
+    opt = parser.parse_args()
+
+    coords = make_coords()
+    script = make_script(opt.frames, opt.cars, np.random.default_rng(opt.seed))
+    ref_occ, ref_tracks, _, _ = run("full", coords, script, opt.frames)
+    print(f"{opt.frames} frames {WIDTH}x{HEIGHT}, {opt.cars} cars, {len(SLOT_XS)} slots, 1 ReID point")
+    for mode in ("full", "crop", "mosaic"):
+        occ, tracks, ratio, planned = run(mode, coords, script, opt.frames)
+        agree = np.mean([np.array_equal(a, b) for a, b in zip(ref_occ, occ)])
+        # 1 xe giữ đúng 1 track id từ lúc vào tới lúc ra = global_id (và biển số) của anchor không đổi
+        # (xe 2 chiều cùng làn có thể đổi id ngay cả với full → so thêm với full)
+        kept = sum(len(tracks.get(car, [])) == 1 for car, *_ in script)
+        fragments = np.mean([len(tracks.get(car, [])) for car, *_ in script])
+        extra = sum(len(tracks.get(car, [])) > len(ref_tracks.get(car, [])) for car, *_ in script)
+        print(f"  {mode:<7} ({planned:<6} {ratio * 100:5.1f}% pixel): occupancy agreement {agree * 100:6.2f}% frames, "
+              f"xe giữ 1 track id {kept}/{len(script)}, track id / xe {fragments:.2f}, "
+              f"xe thêm track id so với full {extra}/{len(script)}")
+
+
+if __name__ == "__main__":
+    main()
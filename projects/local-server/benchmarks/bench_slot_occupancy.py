@@ -0,0 +1,94 @@
+"""
+Benchmark check_occupied_slots: vòng lặp Python slot × bbox (cũ) vs CoordinateSet (NumPy broadcast).
+
+Chạy từ thư mục projects/local-server:
+    python -m benchmarks.bench_slot_occupancy --boxes 30 --repeat 200
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import yaml
+
+from app.modules.coordinate_store import CoordinateSet
+
+
+def make_slots(num_slots, rng):
+    return [{'id': f"S{i}", 'coordinate': [int(x), int(y)]}
+            for i, (x, y) in enumerate(rng.integers(0, 1920, size=(num_slots, 2)))]
+
+
+def make_bboxes(num_boxes, rng):
+    xy = rng.integers(0, 1800, size=(num_boxes, 2))
+    wh = rng.integers(40, 200, size=(num_boxes, 2))
+    return [(i, [int(x), int(y), int(x + w), int(y + h)], time.time())
+            for i, ((x, y), (w, h)) in enumerate(zip(xy, wh))]
+
+
+def legacy_occupancy(slots, bboxes):
+    # Giống logic cũ: đọc slot, lặp từng slot × bbox, break ở bbox đầu tiên chứa slot
+    occupied = {}
+    for s in slots:
+        sx, sy = s["coordinate"]
+        for bbox_data in bboxes:
+            if len(bbox_data) == 2:
+                obj_id, box = bbox_data
+            elif len(bbox_data) == 3:
+                obj_id, box, timestamp = bbox_data
+            else:
+                continue
+            x1, y1, x2, y2 = map(int, box)
+            if x1 <= sx <= x2 and y1 <= sy <= y2:
+                occupied[s["id"]] = obj_id
+                break
+    return occupied
+
+
+def vectorized_occupancy(slot_index, ids, boxes):
+    owner = slot_index.match(boxes)
+    return {slot_index.ids[p]: int(ids[owner[p]]) for p in np.flatnonzero(owner >= 0)}
+
+
+def timeit(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--boxes", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=200)
+    opt = parser.parse_args()
+    rng = np.random.default_rng(0)
+
+    print(f"{'slots':>6} | {'legacy (ms)':>12} | {'legacy+yaml (ms)':>16} | {'numpy (ms)':>10} | speedup")
+    for num_slots in (50, 500, 5000):
+        slots = make_slots(num_slots, rng)
+        bboxes = make_bboxes(opt.boxes, rng)
+        ids = np.array([b[0] for b in bboxes], dtype=np.int32)
+        boxes = np.array([b[1] for b in bboxes], dtype=np.int32)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "0.yml")
+            with open(path, "w") as f:
+                yaml.dump(slots, f)
+            slot_index = CoordinateSet(path)
+            assert legacy_occupancy(slots, bboxes) == vectorized_occupancy(slot_index, ids, boxes)
+
+            def legacy_with_yaml():
+                with open(path) as f:
+                    legacy_occupancy(yaml.safe_load(f), bboxes)
+
+            repeat = max(opt.repeat // (num_slots // 50), 5)
+            t_legacy = timeit(lambda: legacy_occupancy(slots, bboxes), repeat)
+            t_yaml = timeit(legacy_with_yaml, max(repeat // 10, 3))
+            t_numpy = timeit(lambda: (slot_index.refresh(), vectorized_occupancy(slot_index, ids, boxes)), repeat)
+        print(f"{num_slots:>6} | {t_legacy:>12.3f} | {t_yaml:>16.3f} | {t_numpy:>10.3f} | {t_yaml / t_numpy:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
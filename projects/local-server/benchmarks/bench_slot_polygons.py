@@ -0,0 +1,91 @@
+"""
+Benchmark occupancy slot polygon mỗi frame: duyệt mọi polygon × bbox (không index) vs GridIndex của CoordinateSet.
+Kèm slot điểm (point-in-box broadcast) để so sánh.
+
+Chạy từ thư mục projects/local-server:
+    python -m benchmarks.bench_slot_polygons --slots 1000 --boxes 40 --repeat 100
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.modules.coordinate_store import CoordinateSet
+from app.modules.slot_geometry import box_overlap_area, polygon_area
+
+
+def make_slots(num_slots, rng, width=1920, height=1080):
+    # Lưới slot hình bình hành (camera nhìn xiên), xếp kín khung hình
+    cols = int(np.ceil(np.sqrt(num_slots * width / height)))
+    rows = int(np.ceil(num_slots / cols))
+    w, h = width / cols, height / rows
+    slots = []
+    for i in range(num_slots):
+        r, c = divmod(i, cols)
+        x, y = c * w, r * h
+        skew = w * 0.2
+        polygon = [[int(x + skew), int(y)], [int(x + w), int(y)], [int(x + w - skew), int(y + h)], [int(x), int(y + h)]]
+        slots.append({'id': f"S{i}", 'polygon': polygon})
+    return slots
+
+
+def make_boxes(num_boxes, rng, width=1920, height=1080):
+    xy = rng.integers(0, [width - 200, height - 150], size=(num_boxes, 2))
+    wh = rng.integers(60, 200, size=(num_boxes, 2))
+    return np.hstack([xy, xy + wh]).astype(np.int32)
+
+
+def brute_force(slot_set, boxes, ratio):
+    # Không index: mọi polygon × mọi bbox đều cắt đa giác
+    result = np.full(len(slot_set), -1, dtype=np.int64)
+    for i, poly in enumerate(slot_set.polygons):
+        area = polygon_area(poly)
+        best = 0.0
+        for b, box in enumerate(boxes.tolist()):
+            r = box_overlap_area(poly, box) / area
+            if r >= ratio and r > best:
+                best = r
+                result[i] = b
+    return result
+
+
+def timeit(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--slots", type=int, default=1000)
+    parser.add_argument("--boxes", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=100)
+    opt = parser.parse_args()
+    rng = np.random.default_rng(0)
+
+    slots = make_slots(opt.slots, rng)
+    slot_set = CoordinateSet("__bench_missing__.yml")
+    slot_set.load(slots)
+    point_set = CoordinateSet("__bench_missing__.yml")
+    point_set.load([{'id': s['id'], 'coordinate': p.tolist()} for s, p in zip(slots, slot_set.points)])
+    boxes = make_boxes(opt.boxes, rng)
+
+    t_build = timeit(lambda: CoordinateSet("__bench_missing__.yml").load(slots), 5)
+    assert np.array_equal(brute_force(slot_set, boxes, slot_set.overlap_ratio), slot_set.match(boxes))
+
+    t_brute = timeit(lambda: brute_force(slot_set, boxes, slot_set.overlap_ratio), max(opt.repeat // 20, 3))
+    t_grid = timeit(lambda: slot_set.match(boxes), opt.repeat)
+    t_point = timeit(lambda: point_set.match(boxes), opt.repeat)
+
+    occupied = int((slot_set.match(boxes) >= 0).sum())
+    print(f"{opt.slots} slots, {opt.boxes} boxes, grid cell {slot_set.grid_cell}px, "
+          f"{len(slot_set._grid)} cells, {occupied} slots occupied")
+    print(f"  build index (load)      : {t_build:8.3f} ms (1 lần mỗi lần reload tọa độ)")
+    print(f"  polygon, no index       : {t_brute:8.3f} ms/frame")
+    print(f"  polygon, grid index     : {t_grid:8.3f} ms/frame  ({t_brute / t_grid:.1f}x)")
+    print(f"  point-in-box (centroid) : {t_point:8.3f} ms/frame")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Sinh ảnh frame cổng có biển số VN giả lập (1 dòng 51G-123.45 / 2 dòng 29-B1 + 123.45) để chạy
+bench_lpr / bench_backends khi chưa có ảnh camera thật. Biển được vẽ bằng font Hershey, nghiêng phối
+cảnh, dán lên ảnh nền có sẵn trong repo, thêm blur + nhiễu.
+
+Tên file chứa biển số đúng (<stt>_<biển, "-" thay bằng "_">.jpg) → bench_lpr --truth tính độ chính xác.
+Đây KHÔNG thay được ảnh camera thật: font, ánh sáng, góc chụp khác cổng thật, chỉ dùng để so các đường
+chạy với nhau (parity, độ trễ) và phát hiện lỗi pipeline.
+
+Chạy từ thư mục projects/local-server:
+    python -m benchmarks.render_plates --out /tmp/plates --count 200
+"""
+import argparse
+import os
+
+import cv2
+import numpy as np
+
+DIGITS = "0123456789"
+LETTERS = "ABCDEFGHKLMNPSTUVXYZ"
+BACKGROUNDS = (
+    "../windows-app/app/resources/coordinates/data/frame/0.jpg",
+    "../windows-app/app/resources/coordinates/data/frame/1.jpg",
+    "app/resources/license_plate_recognition/yolov5/data/images/bus.jpg",
+)
+FRAME_W, FRAME_H = 1280, 720
+
+
+def draw_plate(lines, w, h):
+    """Nền trắng, viền đen, mỗi dòng chữ căn giữa và co giãn vừa khung."""
+    plate = np.full((h, w, 3), 235, np.uint8)
+    cv2.rectangle(plate, (3, 3), (w - 4, h - 4), (20, 20, 20), 3)
+    font = cv2.FONT_HERSHEY_DUPLEX
+    for i, text in enumerate(lines):
+        (tw, th), _ = cv2.getTextSize(text, font, 1.0, 4)
+        scale = min((w - 24) / tw, (h / len(lines) - 16) / th)
+        (tw, th), _ = cv2.getTextSize(text, font, scale, 4)
+        org = ((w - tw) // 2, int((i + 0.5) * h / len(lines) + th / 2))
+        cv2.putText(plate, text, org, font, scale, (15, 15, 15), max(2, int(scale * 2.2)), cv2.LINE_AA)
+    return plate
+
+
+def random_plate(rng):
+    """(chuỗi biển số như decode_plate trả về, ảnh biển số)."""
+    province = "".join(rng.choice(list(DIGITS), 2))
+    series = rng.choice(list(LETTERS))
+    number = "".join(rng.choice(list(DIGITS), 5))
+    if rng.random() < 0.5:
+        return province + series + number, draw_plate([f"{province}{series}-{number[:3]}.{number[3:]}"], 470, 110)
+    series += rng.choice(list(DIGITS))
+    return (province + series + "-" + number,
+            draw_plate([f"{province}-{series}", f"{number[:3]}.{number[3:]}"], 280, 200))
+
+
+def paste(frame, plate, rng):
+    """Dán biển số lên frame với phối cảnh ngẫu nhiên (4 góc lệch tới 6% bề rộng)."""
+    ph, pw = plate.shape[:2]
+    scale = rng.uniform(0.35, 0.6)
+    w, h = int(pw * scale), int(ph * scale)
+    x0, y0 = int(rng.integers(50, FRAME_W - w - 50)), int(rng.integers(50, FRAME_H - h - 50))
+    corners = np.float32([[x0, y0], [x0 + w, y0], [x0 + w, y0 + h], [x0, y0 + h]])
+    corners += rng.uniform(-0.06, 0.06, corners.shape).astype(np.float32) * w
+    M = cv2.getPerspectiveTransform(np.float32([[0, 0], [pw, 0], [pw, ph], [0, ph]]), corners)
+    warped = cv2.warpPerspective(plate, M, (FRAME_W, FRAME_H))
+    mask = cv2.warpPerspective(np.full((ph, pw), 255, np.uint8), M, (FRAME_W, FRAME_H)) > 0
+    frame[mask] = warped[mask]
+    return frame
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--count", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    opt = parser.parse_args()
+
+    rng = np.random.default_rng(opt.seed)
+    backgrounds = [cv2.resize(im, (FRAME_W, FRAME_H)) for im in map(cv2.imread, BACKGROUNDS) if im is not None]
+    if not backgrounds:
+        backgrounds = [np.full((FRAME_H, FRAME_W, 3), 90, np.uint8)]
+    os.makedirs(opt.out, exist_ok=True)
+    for k in range(opt.count):
+        text, plate = random_plate(rng)
+        frame = paste(backgrounds[k % len(backgrounds)].copy(), plate, rng)
+        frame = cv2.GaussianBlur(frame, (3, 3), rng.uniform(0.3, 1.0))
+        frame = np.clip(frame.astype(np.int16) + rng.normal(0, 6, frame.shape), 0, 255).astype(np.uint8)
+        cv2.imwrite(os.path.join(opt.out, f"{k:04d}_{text.replace('-', '_')}.jpg"), frame,
+                    [cv2.IMWRITE_JPEG_QUALITY, 90])
+    print(f"{opt.count} ảnh → {opt.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,8 @@ import cv2
 import time
 import requests
 from app.modules.cloud_api import get_coordinates, update_coordinates, insert_coordinates
-from app.modules.utils import write_yaml_file
+from app.modules.coordinate_store import save_coordinates
+from app.modules.frame_grabber import FrameGrabber
 import os
 import dotenv
 dotenv.load_dotenv()
@@ -12,16 +13,15 @@ CAMS = ast.literal_eval(os.getenv("TRACKING_CAMERA"))
 PARKING_ID = os.getenv("PARKING_ID")
 CLOUDINARY_UPLOAD_PRESET = os.getenv("UPLOAD_PRESET")
 CLOUDINARY_UPLOAD_URL = os.getenv("CLOUDINARY_UPLOAD_URL")
-SLOT_COORDS_PATH = "app/resources/coordinates/slot-data/"
-REID_COORDS_PATH = "app/resources/coordinates/reid-data/"
 for i,cam_id in enumerate(CAMS):
     print(f"Xử lý camera {i} với cam_id: {cam_id}")
-    cap = cv2.VideoCapture(cam_id)
-    # cap.set(cv2.CAP_PROP_POS_FRAMES, 30)
-    time.sleep(1)
-    ret, frame = cap.read()
-    time.sleep(1)
-    ret, frame = cap.read()
+    grabber = FrameGrabber(cam_id, name=f"Camera {i}", stats_interval=0)
+    ret, frame = False, None
+    if grabber.start():
+        # Bỏ qua frame đầu (camera đang tự chỉnh sáng), lấy frame mới nhất sau 2s
+        time.sleep(2)
+        ret, frame, _ = grabber.read()
+        grabber.release()
     if ret:
         _, buffer = cv2.imencode('.jpg', frame)
         img_bytes = buffer.tobytes()
@@ -45,13 +45,13 @@ for i,cam_id in enumerate(CAMS):
                 # Download coordinates from cloud server
                 if cam.get('coordinates_list') is not None:
                     coordinates_data = cam.get('coordinates_list')
-                    write_yaml_file(SLOT_COORDS_PATH + str(i) + '.yml', coordinates_data)
+                    save_coordinates(i, slot_data=coordinates_data)
                     print(f"Đã tải tọa độ từ cam {i} lên Cloud Server\n")
                 else:
                     print("Không có tọa độ nào trên Cloud Server")
                 if cam.get('coordinates_reid_list') is not None:
                     reid_coordinates_data = cam.get('coordinates_reid_list')
-                    write_yaml_file(REID_COORDS_PATH + str(i) + '.yml', reid_coordinates_data)
+                    save_coordinates(i, reid_data=reid_coordinates_data)
                     print(f"Đã tải tọa độ ReID từ cam {i} lên Cloud Server\n")   
         else:
             print("Lỗi khi tải hình ảnh lên Cloudinary:", response.status_code)
\ No newline at end of file
@@ -2,7 +2,8 @@ import threading
 from multiprocessing import Manager
 from app.modules.utils import play_sound, save_regisstered_vehicles_to_file
 from app.modules import mqtt_topic, tracking_car, detect_license, connect_bgm220, connect_xg26, globals
-from app.modules.cloud_api import get_registered_vehicles
+from app.modules.cloud_api import get_registered_vehicles, start_durable_outbox
+from app.modules.parked_vehicle_sync import get_parked_vehicle_sync
 
 def main():
     # Khởi tạo shared memory cho search_vehicle để child processes có thể đọc
@@ -12,6 +13,8 @@ def main():
     globals.search_vehicle_shared = search_vehicle_shared
     
     threading.Thread(target=play_sound, args=("start-program.mp3",)).start()
+    start_durable_outbox()
+    get_parked_vehicle_sync().start()  # full resync danh sách xe đậu lúc khởi động, sau đó gửi delta
     threading.Thread(target=save_regisstered_vehicles_to_file, args=(get_registered_vehicles(),)).start()
     threading.Thread(target=tracking_car.start_tracking_car, daemon=True).start()
     threading.Thread(target=detect_license.start_detect_license, daemon=True).start()
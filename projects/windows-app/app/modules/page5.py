@@ -2,6 +2,7 @@ from PyQt5.QtWidgets import QApplication, QVBoxLayout, QHBoxLayout, QWidget, QPu
 from PyQt5.QtCore import Qt
 import sys
 import cv2
+import numpy as np
 import os
 import glob
 from PyQt5.QtGui import QImage, QPixmap, QFont
@@ -254,6 +255,8 @@ class CoordinatesSetup(QWidget):
             for item in coordinates_data:
                 coord = item['coordinate']
                 x, y = coord
+                if item.get('polygon'):
+                    cv2.polylines(frame, [np.array(item['polygon'], dtype=np.int32)], True, (0, 255, 0), 2)
                 cv2.circle(frame, (x, y), 5, (0, 255, 0), -1)  
                 cv2.putText(frame, str(item['id']), (x - 5, y - 10),
                             cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 1)
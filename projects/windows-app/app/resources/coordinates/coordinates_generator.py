@@ -23,16 +23,22 @@ class CoordinatesGenerator:
         self.coordinate = (0,0)
         self.coordinates = []
         self.titles = []
+        self.polygons = []      # polygon của từng ô (None = ô chỉ là 1 điểm)
+        self.polygon = []       # các đỉnh polygon đang vẽ (chuột phải), Space để chốt
 
         open_cv.namedWindow(self.caption, open_cv.WINDOW_GUI_EXPANDED)
         open_cv.setMouseCallback(self.caption, self.__mouse_callback)
         
     def regain(self):
         for item in self.coordinates_data:
+            polygon = item.get("polygon")
+            if polygon:
+                open_cv.polylines(self.image, [np.array(polygon, dtype=np.int32)], True, (0, 255, 0), 2)
             open_cv.circle(self.image, item["coordinate"], 5, (0, 255, 0), -1)     
             open_cv.putText(self.image,str(item["id"]), (item["coordinate"][0]-10,item["coordinate"][1]-10), open_cv.FONT_HERSHEY_SIMPLEX, 0.5, COLOR_BLUE, 2)
             self.titles.append(str(item["id"]))
             self.coordinates.append(item["coordinate"])
+            self.polygons.append(polygon or None)
             
     def generate(self):
         keys = ""
@@ -49,8 +55,12 @@ class CoordinatesGenerator:
                 self.image = self.image_copy.copy()
                 self.titles.clear()
                 self.coordinates.clear()
+                self.polygons.clear()
+                self.polygon = []
                 self.ids = 0
                 keys = ""
+            elif key == ord(' '):# space: chốt polygon đang vẽ thành 1 ô
+                self.__handle_polygon_done()
             elif key == ord('\r'):# enter
                 break
             elif key >= 48 and key <=57:# chọn số cho ô
@@ -66,31 +76,30 @@ class CoordinatesGenerator:
         open_cv.destroyWindow(self.caption)
         
     def undo(self):# ham quay lai net truoc do   
-        if len(self.coordinates) == 0:
+        if len(self.coordinates) == 0 and not self.polygon:
             return
         
         self.image = self.image_copy.copy()
-        if self.ids > 0:
-            self.ids -=1 # quay lai id truoc do
-        
-        self.coordinates.pop()
-        self.titles.pop() 
-
-        # Đọc và cập nhật lại nội dung file YAML
-        self.output.seek(0)  # Di chuyển con trỏ về đầu file
-        lines = self.output.readlines()  # Đọc tất cả dòng
+        if self.polygon:
+            # Đang vẽ polygon: chỉ bỏ polygon dở
+            self.polygon = []
+        else:
+            if self.ids > 0:
+                self.ids -=1 # quay lai id truoc do
+            self.coordinates.pop()
+            self.titles.pop() 
+            self.polygons.pop()
 
-        # Loại bỏ bản ghi cuối cùng (giả sử mỗi bản ghi là 2 dòng: id và coordinate)
-        if len(lines) >= 2:
-            lines = lines[:-2]  # Bỏ 2 dòng cuối cùng
-
-        # Ghi lại nội dung vào file
+        # Ghi lại toàn bộ các ô còn lại vào file YAML (ô polygon có thêm dòng polygon)
         self.output.seek(0)  # Quay lại đầu file
         self.output.truncate(0)  # Xóa toàn bộ nội dung cũ
-        self.output.writelines(lines)  # Ghi lại các dòng còn lại
+        for title, coordinate, polygon in zip(self.titles, self.coordinates, self.polygons):
+            self.output.write(self.__record(title, coordinate, polygon))
                     
         # Vẽ lại tất cả các điểm còn lại
         for stt, coordinate in enumerate(self.coordinates):
+            if self.polygons[stt]:
+                open_cv.polylines(self.image, [np.array(self.polygons[stt], dtype=np.int32)], True, (0, 255, 0), 2)
             open_cv.circle(self.image, coordinate, 5, (0, 255, 0), -1)
             open_cv.putText(
                 self.image, 
@@ -107,16 +116,43 @@ class CoordinatesGenerator:
         if event == open_cv.EVENT_LBUTTONDOWN:
             self.coordinate=(x, y)
             self.coordinates.append(self.coordinate)
+            self.polygons.append(None)
             self.__handle_done()
+        elif event == open_cv.EVENT_RBUTTONDOWN:
+            # Thêm 1 đỉnh polygon của ô đang vẽ
+            if self.polygon:
+                open_cv.line(self.image, self.polygon[-1], (x, y), (0, 255, 0), 1)
+            self.polygon.append((x, y))
+            open_cv.circle(self.image, (x, y), 3, (0, 255, 0), -1)
 
         open_cv.imshow(self.caption, self.image)
 
+    @staticmethod
+    def __record(title, coordinate, polygon=None):
+        record = "- id: " + str(title) + "\n  coordinate: [" + str(coordinate[0]) + ", " + str(coordinate[1]) + "]\n"
+        if polygon:
+            record += "  polygon: [" + ", ".join("[" + str(px) + ", " + str(py) + "]" for px, py in polygon) + "]\n"
+        return record
+
+    def __handle_polygon_done(self):
+        # Cần ít nhất 3 đỉnh; điểm đại diện (coordinate) của ô = trọng tâm polygon
+        if len(self.polygon) < 3:
+            return
+        polygon = self.polygon
+        self.polygon = []
+        open_cv.polylines(self.image, [np.array(polygon, dtype=np.int32)], True, (0, 255, 0), 2)
+        self.coordinate = (int(round(sum(p[0] for p in polygon) / len(polygon))),
+                           int(round(sum(p[1] for p in polygon) / len(polygon))))
+        self.coordinates.append(self.coordinate)
+        self.polygons.append([list(p) for p in polygon])
+        self.__handle_done()
+        open_cv.imshow(self.caption, self.image)
+
     def __handle_done(self):
         # Vẽ dấu chấm
         open_cv.circle(self.image, self.coordinate, 5, (0, 255, 0), -1)
         # Lưu vào file yml
-        self.output.write("- id: " + str(self.spaceName + str(self.ids)) + "\n  coordinate: [" +
-                           str(self.coordinate[0]) +", "+str(self.coordinate[1])+ "]\n")
+        self.output.write(self.__record(self.spaceName + str(self.ids), self.coordinate, self.polygons[-1]))
         # Vẽ tên
         open_cv.putText(self.image, str(self.spaceName+str(self.ids)), (self.coordinate[0]-10,self.coordinate[1]-10), open_cv.FONT_HERSHEY_SIMPLEX, 0.5, COLOR_BLUE, 2)
         if self.spaceName == "":